@@ -0,0 +1,251 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from ultralytics import YOLO
+from ultralytics.engine.results import ResultsSink
+from video_pipeline import VideoPipeline
+
+
+@dataclass
+class ImageResult:
+    """单张图片（或单帧）的结构化检测结果"""
+    path: str
+    names: dict
+    orig_shape: tuple
+    cls: np.ndarray  # (n,) 类别 id
+    conf: np.ndarray  # (n,) 置信度
+    xyxy: np.ndarray  # (n, 4) 像素坐标
+    xywhn: np.ndarray  # (n, 4) 归一化 xywh
+    speed: dict = field(default_factory=dict)
+    plotted: Optional[np.ndarray] = None  # 标注后的 BGR 图像（批量任务不保留，节省内存）
+
+    @classmethod
+    def from_results(cls, r, plot=False):
+        """由 ultralytics Results 构建，只保留 numpy 数组，不持有原图"""
+        boxes = r.boxes.cpu().numpy()
+        return cls(path=str(r.path),
+                   names=r.names,
+                   orig_shape=tuple(r.orig_shape),
+                   cls=boxes.cls.astype(np.int64),
+                   conf=boxes.conf.astype(np.float32),
+                   xyxy=boxes.xyxy.astype(np.float32),
+                   xywhn=np.asarray(boxes.xywhn, dtype=np.float32),
+                   speed=dict(r.speed),
+                   plotted=r.plot() if plot else None)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+@dataclass
+class JobResult:
+    """一个推理任务的汇总结果"""
+    kind: str
+    images: list
+    save_dir: Optional[Path] = None
+    elapsed: float = 0.0
+    columns: Optional[dict] = None  # 批量任务：results.npz 中的列式检测结果（paths/shapes/im/cls/conf/xyxy/xywhn）
+    stats: Optional[dict] = None  # 视频任务：流水线各阶段 FPS 与丢帧数
+
+
+@dataclass
+class InferenceJob:
+    """提交给推理服务的任务：image / batch / video"""
+    kind: str
+    model_path: str
+    source: str
+    conf: float = 0.25
+    project: str = 'runs/detect'
+    name: str = 'exp'
+    batch: int = 1  # 目录源每次前向推理的图片数
+    prefetch: int = 4  # 图片/视频文件源后台预读解码的批次数（0 关闭）
+    save_txt: bool = False  # 额外保存逐图 labels/*.txt（报告不再依赖它）
+    on_frame: Optional[Callable] = None  # 仅 video：每帧回调（流水线输出线程中调用），参数为 ImageResult
+    on_stats: Optional[Callable] = None  # 仅 video：每秒回调一次各阶段 FPS
+    stop_event: Optional[threading.Event] = None  # 仅 video：置位后停止
+    future: Future = field(default_factory=Future)
+
+
+class InferenceServer:
+    """
+    常驻进程内推理服务
+
+    单个后台线程独占所有模型，按权重路径缓存已加载并预热的 YOLO 模型，
+    各选项卡通过队列提交任务，结果以 Future 形式返回结构化对象。
+    所有任务都以生成器形式由后台线程轮流推进：视频任务每步推理至多一帧，单图/批量任务每步处理一个结果，
+    批量任务运行期间视频也不会卡住。单图/批量任务共用 model.predictor，同一时刻只运行一个，其余排队等待；
+    视频任务由 VideoPipeline 在独立线程中完成采集/预处理/渲染/输出，并使用各自独立的 predictor（共享权重），
+    预处理线程不会与其他任务改写的 predictor 状态冲突。
+    """
+
+    def __init__(self, log=print, warmup=True):
+        self.log = log
+        self.warmup = warmup
+        self._models = {}  # abspath -> (mtime, YOLO)
+        self._jobs = queue.Queue()
+        self._streams = []  # 正在进行的任务 [(job, generator)]
+        self._waiting = []  # 已取出、等待 model.predictor 空闲的单图/批量任务
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    # ------------------ 对外接口 ------------------
+
+    def submit(self, kind, model_path, source, **kwargs):
+        """提交任务，返回 concurrent.futures.Future，结果为 JobResult"""
+        if not self._running:
+            raise RuntimeError('推理服务已关闭')
+        job = InferenceJob(kind=kind, model_path=str(model_path), source=str(source), **kwargs)
+        self._jobs.put(job)
+        return job.future
+
+    def shutdown(self, timeout=5):
+        """停止后台线程并释放所有视频任务"""
+        self._running = False
+        self._jobs.put(None)  # 唤醒阻塞中的 get
+        self._thread.join(timeout=timeout)
+        self._models.clear()
+
+    def get_model(self, model_path):
+        """按权重路径返回缓存的模型，权重文件被更新（如重新训练）时自动重新加载"""
+        key = os.path.abspath(model_path)
+        mtime = os.path.getmtime(key) if os.path.exists(key) else None
+        cached = self._models.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        self.log(f"🔮 加载模型: {model_path}")
+        model = YOLO(model_path, cache=True)  # 缓存按文件内容哈希区分，权重更新后自动重建
+        if self.warmup:  # 预先构建 predictor 并完成 warmup，首个任务不再付出该开销
+            model.predict(np.zeros((64, 64, 3), dtype=np.uint8), save=False, save_txt=False, save_npz=False,
+                          verbose=False)
+        self._models[key] = (mtime, model)
+        return model
+
+    # ------------------ 后台线程 ------------------
+
+    def _loop(self):
+        while self._running:
+            block = not self._streams  # 有视频任务时不阻塞，逐帧推进
+            try:
+                job = self._jobs.get(block=block, timeout=0.1 if block else None)
+            except queue.Empty:
+                job = None
+            if job is not None:
+                self._waiting.append(job)
+            self._admit()
+            for stream in list(self._streams):
+                self._step(stream)
+
+        for job, gen in self._streams:
+            gen.close()
+            job.future.set_result(JobResult(kind=job.kind, images=[]))
+        self._streams.clear()
+        for job in self._waiting:
+            job.future.cancel()
+        self._waiting.clear()
+
+    def _admit(self):
+        """视频任务立即开始；单图/批量任务共用 model.predictor，须等上一个结束后才开始"""
+        for job in list(self._waiting):
+            if job.kind == 'video' or not any(j.kind != 'video' for j, _ in self._streams):
+                self._waiting.remove(job)
+                self._start(job)
+
+    def _start(self, job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            model = self.get_model(job.model_path)
+            if job.kind == 'video':
+                self._streams.append((job, self._iter_video(job, model)))
+            elif job.kind in ('image', 'batch'):
+                self._streams.append((job, self._iter_predict(job, model)))
+            else:
+                raise ValueError(f"未知任务类型 '{job.kind}'")
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _step(self, stream):
+        job, gen = stream
+        try:
+            next(gen)
+        except StopIteration as e:
+            self._streams.remove(stream)
+            job.future.set_result(e.value)
+        except Exception as e:
+            self._streams.remove(stream)
+            job.future.set_exception(e)
+
+    # ------------------ 任务实现 ------------------
+
+    @staticmethod
+    def _iter_predict(job, model):
+        """
+        单图/批量任务生成器：每次 next() 处理一个结果，结果图片照常落盘，返回值为 JobResult
+        单图返回 ImageResult；批量任务不逐图累积，由 predictor 写出列式 results.npz 后整体读回
+        """
+        t0 = time.time()
+        single = job.kind == 'image'
+        images = []
+        for r in model.predict(source=job.source,
+                               stream=True,
+                               conf=job.conf,
+                               batch=job.batch,
+                               prefetch=job.prefetch,
+                               project=job.project,
+                               name=job.name,
+                               save=True,
+                               save_txt=job.save_txt,
+                               save_conf=True,
+                               save_npz=not single,
+                               save_queue=64,  # 结果图片/标签后台写盘
+                               exist_ok=True,
+                               verbose=False):
+            if single:
+                images.append(ImageResult.from_results(r, plot=True))
+            yield
+        sink = model.predictor.results_sink
+        return JobResult(kind=job.kind,
+                         images=images,
+                         save_dir=Path(model.predictor.save_dir),
+                         elapsed=time.time() - t0,
+                         columns=None if single else ResultsSink.load(sink.file))
+
+    @staticmethod
+    def _iter_video(job, model):
+        """视频任务生成器：每次 next() 在后台线程推理至多一帧，返回值为 JobResult（帧结果不累积）"""
+        t0 = time.time()
+        pipe = VideoPipeline(job.source,
+                             InferenceServer._video_predictor(job, model),
+                             conf=job.conf,
+                             render=lambda r: ImageResult.from_results(r, plot=True),
+                             on_frame=job.on_frame,
+                             on_stats=job.on_stats,
+                             stop_event=job.stop_event)
+        pipe.start()
+        try:
+            while pipe.infer_step(timeout=0.01):  # 短超时，避免阻塞队列中的其他任务
+                yield
+            stats = pipe.join()
+        finally:
+            pipe.stop()
+        return JobResult(kind=job.kind, images=[], elapsed=time.time() - t0, stats=stats)
+
+    @staticmethod
+    def _video_predictor(job, model):
+        """为视频任务构建独立的 predictor，与模型共享权重，不受单图/批量任务改写 model.predictor 的影响"""
+        args = {**model.overrides, 'conf': job.conf, 'save': False, 'save_txt': False, 'save_npz': False,
+                'verbose': False, 'mode': 'predict'}
+        predictor = model._smart_load('predictor')(overrides=args, _callbacks=model.callbacks)
+        predictor.setup_model(model=model.model, verbose=False)
+        predictor(source=np.zeros((64, 64, 3), dtype=np.uint8))  # 确定 imgsz 并完成 warmup
+        return predictor
@@ -0,0 +1,132 @@
+"""
+纯 NumPy 实现的 YOLOv8 预处理/后处理（letterbox、xywh2xyxy、NMS、scale_boxes）
+
+不依赖 torch / torchvision / ultralytics，配合 onnx_predict.py 在只安装了 numpy + opencv + onnxruntime 的产线电脑上运行。
+数值行为与 ultralytics.data.augment.LetterBox、ultralytics.utils.ops.non_max_suppression / scale_boxes 保持一致。
+"""
+import cv2
+import numpy as np
+
+
+def letterbox(im, new_shape=(640, 640), auto=False, stride=32, color=(114, 114, 114)):
+    """
+    等比例缩放并居中填充到 new_shape，与 ultralytics LetterBox(center=True, scaleup=True) 一致
+    auto=True 时只填充到 stride 的整数倍（最小矩形）
+    """
+    shape = im.shape[:2]  # 当前 [高, 宽]
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+    dw, dh = dw / 2, dh / 2
+    if shape[::-1] != new_unpad:
+        im = cv2.resize(im, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(im, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+
+
+def xywh2xyxy(x):
+    """中心点 xywh -> 左上右下 xyxy，返回新数组"""
+    y = np.empty_like(x)
+    dw, dh = x[..., 2] / 2, x[..., 3] / 2
+    y[..., 0] = x[..., 0] - dw
+    y[..., 1] = x[..., 1] - dh
+    y[..., 2] = x[..., 0] + dw
+    y[..., 3] = x[..., 1] + dh
+    return y
+
+
+def clip_boxes(boxes, shape):
+    """将 xyxy 框裁剪到图像范围内（原地修改），shape 为 (高, 宽)"""
+    boxes[..., [0, 2]] = boxes[..., [0, 2]].clip(0, shape[1])
+    boxes[..., [1, 3]] = boxes[..., [1, 3]].clip(0, shape[0])
+    return boxes
+
+
+def scale_boxes(img1_shape, boxes, img0_shape):
+    """将 letterbox 后图像 img1_shape 上的 xyxy 框映射回原图 img0_shape（原地修改）"""
+    gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])
+    pad = (round((img1_shape[1] - img0_shape[1] * gain) / 2 - 0.1),
+           round((img1_shape[0] - img0_shape[0] * gain) / 2 - 0.1))
+    boxes[..., [0, 2]] -= pad[0]
+    boxes[..., [1, 3]] -= pad[1]
+    boxes[..., :4] /= gain
+    return clip_boxes(boxes, img0_shape)
+
+
+def nms(boxes, scores, iou_thres):
+    """
+    贪心 NMS，与 torchvision.ops.nms 相同：按分数降序保留，IoU > iou_thres 的框被抑制
+    返回保留框的下标（按分数降序）
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def non_max_suppression(prediction,
+                        conf_thres=0.25,
+                        iou_thres=0.45,
+                        classes=None,
+                        agnostic=False,
+                        multi_label=False,
+                        max_det=300,
+                        nc=0,
+                        max_nms=30000):
+    """
+    YOLOv8 检测头输出的 NMS，参数与返回格式同 ultralytics.utils.ops.non_max_suppression
+
+    prediction: (batch, 4 + nc + nm, anchors) 模型原始输出
+    返回长度为 batch 的列表，每个元素为 (n, 6 + nm) 数组：x1, y1, x2, y2, conf, cls, mask...
+    """
+    if isinstance(prediction, (list, tuple)):
+        prediction = prediction[0]
+    bs = prediction.shape[0]
+    nc = nc or (prediction.shape[1] - 4)
+    nm = prediction.shape[1] - nc - 4
+    mi = 4 + nc
+    multi_label &= nc > 1
+    xc = prediction[:, 4:mi].max(1) > conf_thres  # 候选框
+
+    prediction = prediction.transpose(0, 2, 1).astype(np.float32, copy=False)  # (batch, anchors, 4 + nc + nm)
+    output = [np.zeros((0, 6 + nm), dtype=np.float32) for _ in range(bs)]
+    for xi, x in enumerate(prediction):
+        x = x[xc[xi]]
+        if not x.shape[0]:
+            continue
+        box, cls, mask = xywh2xyxy(x[:, :4]), x[:, 4:mi], x[:, mi:]
+        if multi_label:
+            i, j = np.nonzero(cls > conf_thres)
+            x = np.concatenate((box[i], cls[i, j, None], j[:, None].astype(np.float32), mask[i]), 1)
+        else:
+            j = cls.argmax(1)
+            conf = cls[np.arange(len(j)), j]
+            keep = conf > conf_thres
+            x = np.concatenate((box, conf[:, None], j[:, None].astype(np.float32), mask), 1)[keep]
+        if classes is not None:
+            x = x[np.isin(x[:, 5], classes)]
+        if not x.shape[0]:
+            continue
+        if x.shape[0] > max_nms:
+            x = x[np.argsort(-x[:, 4], kind='stable')[:max_nms]]
+
+        # 按类别偏移坐标后一次 NMS（float64 保证偏移后的精度）
+        boxes = x[:, :4].astype(np.float64)
+        if not agnostic:
+            boxes += (x[:, 5:6] * (boxes.max() + 1))
+        output[xi] = x[nms(boxes, x[:, 4].astype(np.float64), iou_thres)[:max_det]]
+    return output
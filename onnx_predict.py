@@ -0,0 +1,171 @@
+"""
+轻量级 ONNX 推理入口：只依赖 numpy + opencv + onnxruntime，不导入 torch / ultralytics
+
+用于产线电脑部署导出的 ONNX 模型（yolo export format=onnx），预处理与 NMS 由 np_ops.py 完成，
+启动无需加载 torch 全栈，检测结果与 ultralytics 的 predict 保持一致。
+也可通过 --providers 选择 onnxruntime 的 OpenVINO / CUDA 等执行后端。
+"""
+import argparse
+import ast
+import glob
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from np_ops import letterbox, non_max_suppression, scale_boxes
+
+IMG_FORMATS = ('.bmp', '.jpeg', '.jpg', '.png', '.tif', '.tiff', '.webp')
+
+
+class OnnxPredictor:
+    """
+    ONNX Runtime 目标检测推理器
+
+    类别名、stride、输入尺寸从导出时写入的模型元数据读取；
+    固定 batch 的模型逐批推理，动态 batch 的模型一次推理整批图片。
+    """
+
+    def __init__(self, model, conf=0.25, iou=0.7, imgsz=None, max_det=300, classes=None, providers=None):
+        self.conf, self.iou, self.max_det, self.classes = conf, iou, max_det, classes
+        self.session = ort.InferenceSession(str(model), providers=providers or ort.get_available_providers())
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta['names']) if 'names' in meta else {}
+        self.stride = int(meta.get('stride', 32))
+        self.task = meta.get('task', 'detect')
+        if self.task != 'detect':
+            raise ValueError(f"仅支持检测模型，当前模型任务为 '{self.task}'")
+
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.fp16 = inp.type == 'tensor(float16)'
+        fixed = all(isinstance(d, int) for d in inp.shape[2:])
+        if fixed:  # 静态输入尺寸以模型为准
+            self.imgsz = tuple(inp.shape[2:])
+        else:
+            size = imgsz or ast.literal_eval(meta.get('imgsz', '[640, 640]'))
+            self.imgsz = (size, size) if isinstance(size, int) else tuple(size)
+        self.batch = inp.shape[0] if isinstance(inp.shape[0], int) else None  # None 表示动态 batch
+
+    def preprocess(self, images):
+        """BGR 图片列表 -> (n, 3, h, w) 的 float 输入"""
+        x = np.stack([letterbox(im, self.imgsz, stride=self.stride) for im in images])
+        x = x[..., ::-1].transpose(0, 3, 1, 2)  # BGR -> RGB, BHWC -> BCHW
+        x = np.ascontiguousarray(x, dtype=np.float16 if self.fp16 else np.float32)
+        x /= 255
+        return x
+
+    def infer(self, x):
+        """运行模型，固定 batch 的模型按其 batch 大小分块推理"""
+        if self.batch is None or len(x) == self.batch:
+            return self.session.run(None, {self.input_name: x})[0]
+        outs = []
+        for i in range(0, len(x), self.batch):
+            xi = x[i:i + self.batch]
+            n = len(xi)
+            if n < self.batch:  # 末尾不足一批时补零
+                xi = np.concatenate((xi, np.zeros((self.batch - n, *xi.shape[1:]), dtype=xi.dtype)))
+            outs.append(self.session.run(None, {self.input_name: xi})[0][:n])
+        return np.concatenate(outs)
+
+    def postprocess(self, preds, images):
+        """NMS 并把框映射回原图，返回每张图的 (n, 6) 数组：x1, y1, x2, y2, conf, cls"""
+        dets = non_max_suppression(preds.astype(np.float32, copy=False),
+                                   self.conf,
+                                   self.iou,
+                                   classes=self.classes,
+                                   max_det=self.max_det,
+                                   nc=len(self.names))
+        for d, im in zip(dets, images):
+            scale_boxes(self.imgsz, d[:, :4], im.shape[:2])
+        return dets
+
+    def __call__(self, images):
+        """对单张或多张 BGR 图片推理"""
+        images = images if isinstance(images, list) else [images]
+        return self.postprocess(self.infer(self.preprocess(images)), images)
+
+    def draw(self, im, det, line_width=2):
+        """在图片上绘制检测框与标签（原地修改）"""
+        for *xyxy, conf, c in det:
+            p1, p2 = (int(xyxy[0]), int(xyxy[1])), (int(xyxy[2]), int(xyxy[3]))
+            color = COLORS[int(c) % len(COLORS)]
+            cv2.rectangle(im, p1, p2, color, line_width, cv2.LINE_AA)
+            label = f'{self.names.get(int(c), int(c))} {conf:.2f}'
+            (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+            outside = p1[1] - h - 3 >= 0
+            p2 = p1[0] + w, p1[1] - h - 3 if outside else p1[1] + h + 3
+            cv2.rectangle(im, p1, p2, color, -1, cv2.LINE_AA)
+            cv2.putText(im, label, (p1[0], p1[1] - 2 if outside else p1[1] + h + 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                        (255, 255, 255), 1, cv2.LINE_AA)
+        return im
+
+
+COLORS = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207), (10, 249, 72)]  # BGR
+
+
+def list_images(source):
+    """图片文件、目录或通配符 -> 排序后的图片路径列表"""
+    if os.path.isdir(source):
+        files = glob.glob(os.path.join(source, '*'))
+    elif '*' in source:
+        files = glob.glob(source)
+    else:
+        files = [source]
+    return sorted(f for f in files if Path(f).suffix.lower() in IMG_FORMATS)
+
+
+def read_image(file):
+    """读取 BGR 图片，无法读取时抛出 FileNotFoundError"""
+    im = cv2.imread(file)
+    if im is None:
+        raise FileNotFoundError(f"无法读取图片: {file}")
+    return im
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', type=str, required=True, help='ONNX 模型路径')
+    parser.add_argument('--source', type=str, required=True, help='图片/目录/通配符')
+    parser.add_argument('--conf', type=float, default=0.25, help='置信度阈值')
+    parser.add_argument('--iou', type=float, default=0.7, help='NMS IoU 阈值')
+    parser.add_argument('--imgsz', type=int, default=None, help='动态输入尺寸模型的推理尺寸（默认取导出尺寸）')
+    parser.add_argument('--batch', type=int, default=1, help='每次推理的图片数')
+    parser.add_argument('--providers', type=str, nargs='+', default=None, help='onnxruntime 执行后端，默认全部可用后端')
+    parser.add_argument('--project', type=str, default='runs/detect', help='保存根目录')
+    parser.add_argument('--name', type=str, default='onnx', help='实验名称')
+    parser.add_argument('--save_txt', action='store_true', help='保存标签（cls xywhn conf）')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    t0 = time.time()
+    predictor = OnnxPredictor(args.model, conf=args.conf, iou=args.iou, imgsz=args.imgsz, providers=args.providers)
+    print(f"🔮 加载模型: {args.model}（{time.time() - t0:.2f}s，输入 {predictor.imgsz}）")
+
+    save_dir = Path(args.project) / args.name
+    (save_dir / 'labels' if args.save_txt else save_dir).mkdir(parents=True, exist_ok=True)
+    files = list_images(args.source)
+    t0, n = time.time(), 0
+    for i in range(0, len(files), args.batch):
+        paths = files[i:i + args.batch]
+        images = [read_image(f) for f in paths]
+        for f, im, det in zip(paths, images, predictor(images)):
+            n += len(det)
+            cv2.imwrite(str(save_dir / Path(f).name), predictor.draw(im, det))
+            if args.save_txt:
+                h, w = im.shape[:2]
+                xywh = np.concatenate(((det[:, :2] + det[:, 2:4]) / 2, det[:, 2:4] - det[:, :2]), 1) / [w, h, w, h]
+                with open(save_dir / 'labels' / f'{Path(f).stem}.txt', 'w') as fp:
+                    fp.writelines(f'{int(c)} {" ".join(f"{v:.6g}" for v in b)} {s:.6g}\n'
+                                  for b, s, c in zip(xywh, det[:, 4], det[:, 5]))
+    print(f"✅ 预测完成：{len(files)} 张图片，{n} 个目标，耗时 {time.time() - t0:.2f}s")
+    print(f"📂 结果已保存至: {save_dir.absolute()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,8 +10,11 @@ def parse_args():
     parser.add_argument('--model', type=str, required=True, help='模型路径')
     parser.add_argument('--source', type=str, required=True, help='图片/视频源')
     parser.add_argument('--conf', type=float, default=0.25, help='置信度阈值')
+    parser.add_argument('--batch', type=int, default=1, help='目录源每次前向推理的图片数')
+    parser.add_argument('--prefetch', type=int, default=4, help='后台线程预读解码的批次数（0 关闭）')
     parser.add_argument('--project', type=str, default='runs/detect', help='保存根目录')
     parser.add_argument('--name', type=str, default='exp', help='实验名称')
+    parser.add_argument('--no-cache', action='store_true', help='不使用预融合的推理权重缓存，直接加载原始 .pt')
     # 兼容性参数（虽然YOLOv8默认有，但显式声明防止报错）
     parser.add_argument('--save', action='store_true', help='保存图片')
     parser.add_argument('--save_txt', action='store_true', help='保存标签')
@@ -28,10 +31,10 @@ def main():
     # 2. 加载模型
     try:
         print(f"🔮 加载模型: {args.model}")
-        model = YOLO(args.model)
+        model = YOLO(args.model, cache=not args.no_cache)  # 首次加载生成融合后的推理缓存，之后 mmap 直接读取
 
         # 3. 执行预测
-        # UI 需要读取 labels 下的 txt 文件，且需要置信度，所以必须强制 save_txt=True, save_conf=True
+        # 统计报告读取列式 results.npz（save_npz=True），逐图 txt 仅在 --save_txt 时输出
         print(f"🖼️正在处理: {args.source}")
         start_t = time.time()
 
@@ -40,9 +43,13 @@ def main():
             project=args.project,
             name=args.name,
             conf=args.conf,
+            batch=args.batch,  # 目录源按批推理
+            prefetch=args.prefetch,  # 后台预读解码，与推理重叠
             save=True,  # 强制保存图片
-            save_txt=True,  # 强制保存TXT（UI生成报告需要）
-            save_conf=True,  # 强制保存置信度（UI生成图表需要）
+            save_txt=args.save_txt,  # 按需保存逐图TXT
+            save_conf=True,  # TXT 中附带置信度
+            save_npz=True,  # 保存列式检测结果（生成报告与图表使用）
+            save_queue=64,  # 图片/TXT 由后台线程写盘，不阻塞推理
             exist_ok=True,  # 允许覆盖
             verbose=False  # 减少控制台刷屏
         )
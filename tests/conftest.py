@@ -0,0 +1,33 @@
+# Ultralytics YOLO 🚀, AGPL-3.0 license
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def make_prediction():
+    """
+    Factory of seeded raw detection outputs (bs, 4 + nc + nm, n) as float32 NumPy arrays, with boxes clustered around
+    a few centers so that NMS suppresses many of them.
+
+    Args of the returned function:
+        bs (int): Batch size.
+        nc (int): Number of classes.
+        nm (int): Number of mask coefficients.
+        n (int): Number of anchors.
+        crowded (bool): Give class 0 a confident score on every anchor, i.e. thousands of candidates.
+        seed (int): Random seed.
+    """
+
+    def make(bs=2, nc=5, nm=0, n=2000, crowded=False, seed=0):
+        rng = np.random.default_rng(seed)
+        centers = rng.uniform(50, 590, (bs, 40, 2))
+        xy = centers[np.arange(bs)[:, None], rng.integers(0, 40, (bs, n))] + rng.normal(0, 8, (bs, n, 2))
+        wh = rng.uniform(20, 120, (bs, n, 2))
+        scores = rng.uniform(0, 1, (bs, n, nc)) ** 4  # mostly low scores
+        if crowded:
+            scores[..., 0] = rng.uniform(0.3, 0.8, (bs, n))
+        masks = rng.normal(0, 1, (bs, n, nm))
+        return np.concatenate((xy, wh, scores, masks), 2).transpose(0, 2, 1).astype(np.float32)
+
+    return make
@@ -0,0 +1,54 @@
+# Ultralytics YOLO 🚀, AGPL-3.0 license
+"""Numeric parity of the torch-free np_ops.py post-processing with ultralytics.utils.ops."""
+
+import numpy as np
+import pytest
+import torch
+
+import np_ops
+from ultralytics.data.augment import LetterBox
+from ultralytics.utils import ops
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(),
+    dict(multi_label=True, conf_thres=0.1),
+    dict(agnostic=True),
+    dict(classes=[0, 3]),
+    dict(nm=32, nc=5), ])
+def test_non_max_suppression_parity(make_prediction, kwargs):
+    """Test np_ops.non_max_suppression against ops.non_max_suppression, also with mask coefficients."""
+    kwargs = {'conf_thres': 0.25, 'iou_thres': 0.7, **kwargs}
+    nm = kwargs.pop('nm', 0)
+    prediction = make_prediction(nm=nm)
+    expected = ops.non_max_suppression(torch.from_numpy(prediction.copy()), **kwargs)  # converts boxes in place
+    output = np_ops.non_max_suppression(prediction, **kwargs)
+    assert len(output) == len(expected)
+    for x, y in zip(output, expected):
+        assert len(x) > 0
+        np.testing.assert_allclose(x, y.numpy(), rtol=1e-5, atol=1e-3)
+
+
+def test_non_max_suppression_empty(make_prediction):
+    """Test that every image gets its own empty result when no box passes conf_thres."""
+    output = np_ops.non_max_suppression(make_prediction() * 0, conf_thres=0.25)
+    assert len(output) == 2 and all(x.shape == (0, 6) for x in output)
+    assert output[0] is not output[1]
+
+
+@pytest.mark.parametrize('shape', [(200, 1600), (480, 640), (640, 480), (1000, 1000), (37, 53)])
+@pytest.mark.parametrize('auto', [False, True])
+def test_letterbox_parity(shape, auto):
+    """Test np_ops.letterbox against ultralytics LetterBox, including upscaling and minimum rectangle padding."""
+    im = np.random.default_rng(0).integers(0, 255, (*shape, 3), dtype=np.uint8)
+    expected = LetterBox((640, 640), auto=auto, stride=32)(image=im)
+    np.testing.assert_array_equal(np_ops.letterbox(im, (640, 640), auto=auto, stride=32), expected)
+
+
+@pytest.mark.parametrize('shape', [(200, 1600), (480, 640), (1000, 1000)])
+def test_scale_boxes_parity(shape):
+    """Test np_ops.scale_boxes against ops.scale_boxes, including clipping to the original image."""
+    boxes = np.random.default_rng(0).uniform(-20, 660, (100, 4)).astype(np.float32)
+    boxes[:, 2:] += boxes[:, :2]  # x2, y2 beyond x1, y1
+    expected = ops.scale_boxes((640, 640), torch.from_numpy(boxes.copy()), shape)
+    np.testing.assert_allclose(np_ops.scale_boxes((640, 640), boxes.copy(), shape), expected.numpy(), atol=1e-4)
@@ -0,0 +1,96 @@
+# Ultralytics YOLO 🚀, AGPL-3.0 license
+
+import pytest
+import torch
+import torchvision
+
+from ultralytics.utils.ops import (SUPPRESSION_METHODS, batched_suppression, non_max_suppression, soft_nms,
+                                   weighted_boxes_fusion)
+
+
+@pytest.mark.parametrize('method', SUPPRESSION_METHODS)
+def test_batched_suppression_empty(method):
+    """Test that every suppression method returns no boxes for empty input, e.g. a tile without detections."""
+    boxes, scores, idxs = torch.zeros((0, 4)), torch.zeros(0), torch.zeros(0, dtype=torch.long)
+    keep, boxes_out, scores_out = batched_suppression(boxes, scores, idxs, 0.7, method)
+    assert keep.shape == (0, ) and keep.dtype == torch.long
+    assert boxes_out.shape == (0, 4) and scores_out.shape == (0, )
+
+
+@pytest.mark.parametrize('method', SUPPRESSION_METHODS)
+def test_non_max_suppression_no_candidates(method):
+    """Test that non_max_suppression returns an empty (0, 6) tensor per image when no box passes conf_thres."""
+    prediction = torch.rand(2, 4 + 3, 100) * 0.5
+    output = non_max_suppression(prediction, conf_thres=0.9, method=method)
+    assert len(output) == 2 and all(x.shape == (0, 6) for x in output)
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(),
+    dict(conf_thres=0.001, multi_label=True),
+    dict(agnostic=True),
+    dict(conf_thres=0.001, multi_label=True, agnostic=True), ])
+def test_non_max_suppression_topk(make_prediction, kwargs):
+    """Test that the per-class top-k pre-filter (validation nms_topk=300) keeps exactly the boxes of topk=0."""
+    kwargs = {'conf_thres': 0.25, 'iou_thres': 0.7, 'max_det': 300, **kwargs}
+    prediction = torch.from_numpy(make_prediction(nc=6, n=8400, crowded=True))
+    assert ((prediction[:, 4] > kwargs['conf_thres']).sum(1) > 300).all()  # a class with more than topk candidates
+    expected = non_max_suppression(prediction.clone(), topk=0, **kwargs)  # filters scores in place
+    output = non_max_suppression(prediction.clone(), topk=300, **kwargs)
+    for x, y in zip(output, expected):
+        assert len(y) > 0
+        torch.testing.assert_close(x, y)
+
+
+def make_groups(n=3000, seed=0):
+    """Seeded overlapping boxes (n, 4), scores (n,) and groups (n,), one group large enough to be split in blocks."""
+    g = torch.Generator().manual_seed(seed)
+    centers = torch.rand(50, 2, generator=g) * 600
+    xy = centers[torch.randint(0, 50, (n, ), generator=g)] + torch.randn(n, 2, generator=g) * 10
+    wh = torch.rand(n, 2, generator=g) * 80 + 20
+    boxes = torch.cat((xy - wh / 2, xy + wh / 2), 1)
+    idxs = torch.where(torch.arange(n) < 2500, 0, torch.randint(1, 10, (n, ), generator=g))
+    return boxes, torch.rand(n, generator=g), idxs
+
+
+def test_soft_nms_dense_reference():
+    """Test the blocked matrix soft-NMS against a dense per-group computation of the same decay."""
+    boxes, scores, idxs = make_groups()
+    sigma = 0.5
+    expected = torch.empty_like(scores)
+    for c in idxs.unique():
+        i = torch.nonzero(idxs == c).view(-1)
+        i = i[scores[i].argsort(descending=True)]
+        iou = torchvision.ops.box_iou(boxes[i].double(), boxes[i].double()).triu(1)  # iou[k, j] with k above j
+        comp = iou.amax(0)  # max IoU of each box with a higher scoring box
+        decay = torch.exp((comp[:, None] ** 2 - iou ** 2) / sigma).where(iou > 0, torch.ones_like(iou)).amin(0)
+        expected[i] = scores[i] * decay.clamp(max=1).float()
+    torch.testing.assert_close(soft_nms(boxes, scores, idxs, sigma), expected)
+
+
+def test_weighted_boxes_fusion_dense_reference():
+    """Test blocked weighted box fusion against per-group NMS heads and score-weighted cluster means."""
+    boxes, scores, idxs = make_groups()
+    iou_thres = 0.55
+    keep, fused = weighted_boxes_fusion(boxes, scores, idxs, iou_thres)
+    expected = boxes.clone()
+    for c in idxs.unique():
+        i = torch.nonzero(idxs == c).view(-1)
+        heads = i[torchvision.ops.nms(boxes[i], scores[i], iou_thres)]
+        assert torch.equal(keep[idxs[keep] == c], heads)  # same heads in the same order
+        iou, j = torchvision.ops.box_iou(boxes[heads].double(), boxes[i].double()).max(0)  # best head of each box
+        for k, h in enumerate(heads):
+            m = i[(j == k) & (iou > iou_thres)]
+            expected[h] = (boxes[m] * scores[m, None]).sum(0) / scores[m].sum()
+    torch.testing.assert_close(fused, expected)
+
+
+@pytest.mark.parametrize('method', ['soft', 'wbf'])
+def test_non_max_suppression_method_masks(make_prediction, method):
+    """Test that soft-NMS and WBF keep the mask coefficients of their source rows, as used by segment models."""
+    prediction = torch.from_numpy(make_prediction(nm=32))
+    masks = prediction[:, -32:].transpose(1, 2)  # (bs, n, 32)
+    output = non_max_suppression(prediction.clone(), conf_thres=0.25, nc=5, method=method)
+    for x, m in zip(output, masks):
+        assert len(x) and x.shape[1] == 6 + 32
+        assert (x[:, None, 6:] == m[None]).all(2).any(1).all()  # every row carries an input row's coefficients
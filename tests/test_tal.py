@@ -0,0 +1,35 @@
+# Ultralytics YOLO 🚀, AGPL-3.0 license
+
+import torch
+
+from ultralytics.utils.tal import TaskAlignedAssigner, make_anchors
+
+
+def test_task_aligned_assigner_chunked():
+    """Test that assigning ground truths in chunks of gt_chunk gives exactly the dense assignment."""
+    imgsz, nc, n = 320, 6, 100
+    g = torch.Generator().manual_seed(0)
+    strides = torch.tensor([8., 16., 32.])
+    anc_points, stride_tensor = make_anchors([torch.zeros(1, 1, imgsz // s, imgsz // s) for s in (8, 16, 32)], strides)
+    anc_points = anc_points * stride_tensor
+    na = len(anc_points)
+
+    counts = torch.tensor([n, 5, 0])  # more than gt_chunk boxes, sparse and empty image
+    bs = len(counts)
+    xy = torch.rand(bs, n, 2, generator=g) * imgsz
+    wh = torch.rand(bs, n, 2, generator=g) * imgsz / 8 + 4
+    mask_gt = (torch.arange(n)[None] < counts[:, None]).float()[..., None]
+    gt_bboxes = torch.cat((xy - wh / 2, xy + wh / 2), -1).clamp(0, imgsz) * mask_gt
+    gt_labels = torch.randint(0, nc, (bs, n, 1), generator=g).float() * mask_gt
+    pd_scores = torch.rand(bs, na, nc, generator=g)
+    pd_xy = anc_points + torch.randn(bs, na, 2, generator=g) * 16
+    pd_wh = torch.rand(bs, na, 2, generator=g) * imgsz / 8 + 4
+    pd_bboxes = torch.cat((pd_xy - pd_wh / 2, pd_xy + pd_wh / 2), -1)
+    args = pd_scores, pd_bboxes, anc_points, gt_labels, gt_bboxes, mask_gt
+
+    dense = TaskAlignedAssigner(topk=10, num_classes=nc, alpha=0.5, beta=6.0, gt_chunk=0)(*args)
+    chunked = TaskAlignedAssigner(topk=10, num_classes=nc, alpha=0.5, beta=6.0, gt_chunk=32)(*args)
+    assert dense[3][0].any() and dense[3][1].any() and not dense[3][2].any()  # foreground in the non-empty images
+    assert len(chunked) == len(dense) == 5
+    for x, y in zip(chunked, dense):  # target_labels, target_bboxes, target_scores, fg_mask, target_gt_idx
+        assert torch.equal(x, y)
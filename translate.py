@@ -1,78 +1,217 @@
-import xml.etree.ElementTree as ET
+"""
+VOC XML 标注 → YOLO TXT 批量转换工具
+
+按数据划分（train / val / test）遍历 images/<split> 下的图片，用多进程解析 annotations/ 中同名的 XML，
+坐标换算整批向量化完成，标签文件由各子进程成批写出到 labels/<split>。
+加 --cache 时子进程同时按 YOLODataset 的规则校验每对图片/标签，并直接生成 ultralytics 的列式标签缓存
+labels/<split>.cache，训练时 YOLODataset 无需再逐张扫描校验新入库的产线图片。
+
+用法:
+    python translate.py --root datasets/NEU-DET --splits train val test --cache
+"""
+import argparse
+import glob
 import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+
+import numpy as np
 from tqdm import tqdm
 
 # 定义数据集类别
 CLASSES = ["crazing", "inclusion", "patches", "pitted_surface", "rolled-in_scale", "scratches"]
+CLASS_IDS = {c: i for i, c in enumerate(CLASSES)}
+IMG_FORMATS = ('bmp', 'dng', 'jpeg', 'jpg', 'mpo', 'png', 'tif', 'tiff', 'webp', 'pfm')  # 与 ultralytics 一致
 
 
-def convert_box(size, box):
-    """转换坐标为 YOLO xywh 格式"""
-    dw = 1. / size[0]
-    dh = 1. / size[1]
-    x = (box[0] + box[1]) / 2.0
-    y = (box[2] + box[3]) / 2.0
-    w = box[1] - box[0]
-    h = box[3] - box[2]
-    return (x * dw, y * dh, w * dw, h * dh)
-
-
-def convert_xml_to_txt(image_id, root_dir):
-    in_file = root_dir / 'annotations' / f'{image_id}.xml'
-    out_file_path = root_dir / 'labels' / 'train' / f'{image_id}.txt'
-
-    # 确保父目录存在
-    out_file_path.parent.mkdir(parents=True, exist_ok=True)
-
+def parse_xml(xml_file):
+    """解析单个 VOC XML，返回 (宽, 高, [(cls, xmin, ymin, xmax, ymax), ...])，文件不存在返回 None"""
     try:
-        tree = ET.parse(in_file)
-        root = tree.getroot()
-        size = root.find('size')
-        w = int(size.find('width').text)
-        h = int(size.find('height').text)
-
-        with open(out_file_path, 'w') as out_file:
-            for obj in root.iter('object'):
-                difficult = obj.find('difficult').text
-                cls = obj.find('name').text
-                if cls not in CLASSES or int(difficult) == 1:
-                    continue
-
-                cls_id = CLASSES.index(cls)
-                xmlbox = obj.find('bndbox')
-                b = (float(xmlbox.find('xmin').text),
-                     float(xmlbox.find('xmax').text),
-                     float(xmlbox.find('ymin').text),
-                     float(xmlbox.find('ymax').text))
-
-                bb = convert_box((w, h), b)
-                out_file.write(str(cls_id) + " " + " ".join([str(a) for a in bb]) + '\n')
+        root = ET.parse(xml_file).getroot()
     except FileNotFoundError:
-        print(f"Warning: Missing file {in_file}")
-
-
-if __name__ == "__main__":
-    # 配置你的数据集根目录
-    ROOT_DIR = Path('datasets/NEU-DET')
-
-    if not ROOT_DIR.exists():
-        print(f"错误: 找不到目录 {ROOT_DIR}，请确保在正确的位置运行脚本。")
+        return None
+    size = root.find('size')
+    w, h = int(size.find('width').text), int(size.find('height').text)
+    objs = []
+    for obj in root.iter('object'):
+        cls_id = CLASS_IDS.get(obj.find('name').text)
+        difficult = obj.find('difficult')
+        if cls_id is None or (difficult is not None and int(difficult.text) == 1):
+            continue
+        b = obj.find('bndbox')
+        objs.append((cls_id, float(b.find('xmin').text), float(b.find('ymin').text), float(b.find('xmax').text),
+                     float(b.find('ymax').text)))
+    return w, h, objs
+
+
+def xyxy2xywhn(objs, wh):
+    """(n, 5) [cls, xmin, ymin, xmax, ymax] 像素坐标 -> [cls, x, y, w, h] 归一化坐标，wh 为每行所属图片的 (n, 2) 宽高"""
+    gain = np.tile(wh, 2)
+    xyxy = objs[:, 1:].clip(0, gain) / gain  # 裁剪到图像范围内
+    xywh = np.concatenate(((xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]), 1)
+    return np.concatenate((objs[:, :1], xywh), 1)
+
+
+def convert_chunk(items, check=False):
+    """
+    子进程：解析一批 XML，整批换算坐标后写出 TXT
+
+    返回目标数（缺少 XML 为 -1），check=True 时另返回 check_chunk() 的校验结果
+    """
+    shapes, counts, objs, wh = np.zeros((len(items), 2), dtype=np.int64), [], [], []
+    for i, (xml_file, _, _) in enumerate(items):
+        ann = parse_xml(xml_file)
+        if ann is None:
+            counts.append(-1)
+            continue
+        w, h, o = ann
+        if len(set(o)) < len(o):  # 去除重复框，与 ultralytics 标签校验的处理一致（按行排序去重）
+            o = sorted(set(o))
+        shapes[i] = h, w
+        counts.append(len(o))
+        objs += o
+        wh += [(w, h)] * len(o)
+    lb = xyxy2xywhn(np.array(objs, dtype=np.float64).reshape(-1, 5), np.array(wh, dtype=np.float64).reshape(-1, 2))
+
+    rows, j = lb.tolist(), 0
+    for (_, txt_file, _), n in zip(items, counts):
+        if n < 0:
+            continue
+        with open(txt_file, 'w') as f:
+            f.writelines(f"{int(c)} {x} {y} {w} {h}\n" for c, x, y, w, h in rows[j:j + n])
+        j += n
+    counts = np.array(counts, dtype=np.int64)
+    return (counts, check_chunk(items, shapes, counts)) if check else (counts, None)
+
+
+def check_chunk(items, xml_shapes, counts):
+    """
+    用 ultralytics 的 verify_image_label 校验刚写出的图片/标签对（PIL 校验、EXIF 尺寸、JPEG 损坏修复等），
+    与 YOLODataset 扫描时的检查完全相同；XML 中的 <size> 与图片实际尺寸不符的样本同样视为损坏
+
+    返回 (shapes, status, nlabels, labels, msgs)：图片 (高, 宽)、状态（0 有目标, 1 空标签, 2 缺少标签, -1 损坏）、
+    每张图的标签数、整批拼接的 (N, 5) float32 标签以及 {图片: 警告}
+    """
+    from ultralytics.data.utils import verify_image_label
+
+    n = len(items)
+    shapes, status, nlabels = np.zeros((n, 2), dtype=np.int64), np.full(n, -1, dtype=np.int8), np.zeros(n, np.int64)
+    labels, msgs = [], {}
+    for i, (_, txt_file, im_file) in enumerate(items):
+        im, lb, shape, _, _, nm, _, ne, _, msg = verify_image_label((im_file, txt_file, '', False, len(CLASSES), 0, 0))
+        if im and counts[i] >= 0 and tuple(xml_shapes[i]) != tuple(shape):
+            msg = f'WARNING ⚠️ {im_file}: XML 尺寸 {tuple(xml_shapes[i].tolist())} 与图片尺寸 {tuple(shape)} 不符，按损坏处理'
+            im = None
+        if msg:
+            msgs[im_file] = msg
+        if im:
+            shapes[i], status[i], nlabels[i] = shape, 2 if nm else ne, len(lb)
+            labels.append(lb)
+    return shapes, status, nlabels, np.concatenate(labels or [np.zeros((0, 5), np.float32)]), msgs
+
+
+def img2label_paths(img_paths):
+    """图片路径 -> 标签路径（/images/ 换成 /labels/，后缀换成 .txt），与 ultralytics 一致"""
+    sa, sb = f'{os.sep}images{os.sep}', f'{os.sep}labels{os.sep}'
+    return [sb.join(x.rsplit(sa, 1)).rsplit('.', 1)[0] + '.txt' for x in img_paths]
+
+
+def write_cache(im_files, label_files, shapes, status, nlabels, lb, msgs):
+    """
+    直接生成 YOLODataset 的标签缓存 labels/<split>.cache，训练时跳过逐张扫描
+    损坏的样本与 YOLODataset 一样记入 corrupt（连同文件戳），文件未变化时不会再被读入训练
+    """
+    from ultralytics.data.dataset import save_label_cache_file
+    from ultralytics.data.utils import LabelStore, get_file_stamps
+
+    stamps = np.concatenate((get_file_stamps(im_files), get_file_stamps(label_files)), 1)  # 校验（含 JPEG 修复）之后
+    ok = status >= 0
+    corrupt = {f: s.tolist() for f, s, k in zip(im_files, stamps, ok) if not k}
+    offsets = np.zeros(int(ok.sum()) + 1, dtype=np.int64)
+    np.cumsum(nlabels[ok], out=offsets[1:])
+    store = LabelStore(im_files=[f for f, k in zip(im_files, ok) if k],
+                       shapes=shapes[ok].astype(np.int32),
+                       offsets=offsets,
+                       cls=lb[:, :1],
+                       bboxes=lb[:, 1:],
+                       seg_offsets=np.zeros(len(lb) + 1, dtype=np.int64),
+                       seg_points=np.zeros((0, 2), dtype=np.float32),
+                       stamps=stamps[ok],
+                       status=status[ok])
+    nm, ne = int((status == 2).sum()), int((status == 1).sum())
+    nf = int((status == 0).sum()) + ne
+    x = {'labels': store, 'corrupt': corrupt, 'results': (nf, nm, ne, len(corrupt), len(im_files)), 'msgs': msgs}
+    save_label_cache_file('', Path(label_files[0]).parent.with_suffix('.cache'), x)
+    return len(corrupt)
+
+
+def convert_split(root, split, workers, chunk=1024, cache=False):
+    """转换一个数据划分，返回图片数量；图片目录不存在时返回 0"""
+    img_dir = (root / 'images' / split).resolve()
+    if not img_dir.is_dir():
+        return 0
+    files = glob.glob(str(img_dir / '**' / '*.*'), recursive=True)
+    im_files = sorted(x.replace('/', os.sep) for x in files if x.split('.')[-1].lower() in IMG_FORMATS)
+    if not im_files:
+        return 0
+    label_files = img2label_paths(im_files)
+    for d in {os.path.dirname(f) for f in label_files}:
+        os.makedirs(d, exist_ok=True)
+    ann_dir = root.resolve() / 'annotations'
+    items = [(str(ann_dir / f'{Path(f).stem}.xml'), t, f) for f, t in zip(im_files, label_files)]
+    chunks = [items[i:i + chunk] for i in range(0, len(items), chunk)]
+
+    fn = partial(convert_chunk, check=cache)
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(tqdm(pool.map(fn, chunks), total=len(chunks), desc=split, unit='批'))
+    else:  # 单进程时直接在主进程转换，省去子进程启动与结果序列化
+        results = [fn(c) for c in tqdm(chunks, desc=split, unit='批')]
+    counts = np.concatenate([c for c, _ in results])
+    missing = int((counts < 0).sum())
+    if missing:
+        print(f"⚠️ {split}: {missing} 张图片缺少 XML 标注，按背景图处理")
+    if cache:
+        shapes, status, nlabels, lb, msgs = zip(*(r for _, r in results))
+        msgs = {k: v for m in msgs for k, v in m.items()}
+        if msgs:
+            print('\n'.join(msgs.values()))
+        corrupt = write_cache(im_files, label_files, *(np.concatenate(x) for x in (shapes, status, nlabels, lb)), msgs)
+        if corrupt:
+            print(f"⚠️ {split}: {corrupt} 张图片/标签损坏，已记入缓存，训练时忽略")
+    return len(im_files)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--root', type=str, default='datasets/NEU-DET', help='数据集根目录')
+    parser.add_argument('--splits', type=str, nargs='+', default=['train', 'val', 'test'], help='要转换的数据划分')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='解析 XML 的进程数')
+    parser.add_argument('--cache', action='store_true', help='同时生成 YOLODataset 标签缓存，训练时免扫描')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    root = Path(args.root)
+    if not root.exists():
+        print(f"错误: 找不到目录 {root}，请确保在正确的位置运行脚本。")
         exit(1)
 
-    # 假设 images/train 下存放图片
-    img_dir = ROOT_DIR / 'images' / 'train'
-    if not img_dir.exists():
-        print(f"错误: 图片目录不存在 {img_dir}")
+    t0, total = time.time(), 0
+    for split in args.splits:
+        n = convert_split(root, split, args.workers, cache=args.cache)
+        if n:
+            print(f"• {split}: {n} 个样本 → {root / 'labels' / split}")
+        total += n
+    if not total:
+        print(f"错误: {root / 'images'} 下没有找到 {'/'.join(args.splits)} 图片目录")
         exit(1)
+    print(f"✅ 转换完成！共 {total} 个样本，耗时 {time.time() - t0:.1f}s")
 
-    image_ids = [f.stem for f in img_dir.iterdir() if f.suffix in ['.jpg', '.xml']]
-    # 去重
-    image_ids = list(set(image_ids))
 
-    print(f"找到 {len(image_ids)} 个样本，开始转换...")
-
-    for image_id in tqdm(image_ids):
-        convert_xml_to_txt(image_id, ROOT_DIR)
-
-    print("✅ 转换完成！")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,6 @@ import subprocess
 import re
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
 
 import tkinter as tk
 from tkinter import filedialog
@@ -32,8 +31,8 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from PIL import Image, ImageTk, ImageOps, ImageDraw, ImageFont
 
-# 引入YOLO
-from ultralytics import YOLO
+# 常驻推理服务（模型只加载一次）
+from inference_server import InferenceServer
 
 # ==================== 配色常量 ====================
 COLORS = {
@@ -58,6 +57,9 @@ COLORS = {
     'header_gradient_end': '#7c4dff',
 }
 
+# NEU-DET 类别中文名
+CLASS_MAP = {0: "龟裂", 1: "夹杂", 2: "斑块", 3: "麻点", 4: "氧化铁皮", 5: "划痕"}
+
 
 class YOLOv8_GUI:
     def __init__(self, master):
@@ -76,6 +78,9 @@ class YOLOv8_GUI:
         self.log_queue = queue.Queue()
         self.process_log_queue()
 
+        # 推理服务（预测 / 批量 / 视频 选项卡共用，模型按路径缓存）
+        self.inference_server = InferenceServer(log=self.log)
+
         # 关闭协议
         self.master.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -112,7 +117,7 @@ class YOLOv8_GUI:
         self.video_source = ttk.StringVar()
 
         # 状态控制
-        self.video_loop_running = False
+        self.video_stop = threading.Event()
         self.original_img = None
         self.current_theme = 'superhero'
 
@@ -665,6 +670,22 @@ class YOLOv8_GUI:
 
         threading.Thread(target=thread_target, daemon=True).start()
 
+    def submit_job(self, kind, model_path, source, on_result, err_prefix="推理任务异常", **kwargs):
+        """向常驻推理服务提交任务，完成后在主线程回调 on_result(JobResult)，返回任务 Future"""
+
+        def on_done(future):
+            try:
+                res = future.result()
+            except Exception as e:
+                self.log(f"{err_prefix}: {e}", "ERROR")
+                self.master.after(0, lambda: self.update_status(f"❌ {err_prefix}", "danger"))
+                return
+            self.master.after(0, lambda: on_result(res))
+
+        future = self.inference_server.submit(kind, model_path, source, **kwargs)
+        future.add_done_callback(on_done)
+        return future
+
     # --- 训练逻辑 ---
     def start_training(self):
         if not self.train_model.get() or not self.train_data.get():
@@ -754,47 +775,41 @@ class YOLOv8_GUI:
         if not self.predict_model.get() or not self.predict_source.get():
             Messagebox.show_error("请选择模型和图片")
             return
+        try:
+            conf = float(self.predict_conf.get())
+        except ValueError:
+            Messagebox.show_error("置信度必须为数字")
+            return
         self.update_status("🔮 检测进行中...", "info")
         exp_name = f"single_{datetime.now().strftime('%H%M%S')}"
-        cmd = [sys.executable, "predict.py",
-               "--model", self.predict_model.get(),
-               "--source", self.predict_source.get(),
-               "--conf", self.predict_conf.get(),
-               "--name", exp_name, "--save", "--project", "runs/detect"]
-
-        def on_predict_finish():
-            save_dir = Path("runs/detect") / exp_name
-            found_imgs = list(save_dir.glob("*.jpg")) + list(save_dir.glob("*.png")) + list(save_dir.glob("*.jpeg"))
-            if found_imgs:
-                res_path = found_imgs[0]
-                self.show_image_on_canvas(res_path, self.predict_canvas)
-                txt_path = save_dir / "labels" / f"{Path(self.predict_source.get()).stem}.txt"
-                report_text = f"✅ 检测完成\n\n"
-                report_text += f"📂 保存路径:\n{res_path}\n\n"
-                report_text += f"━━━━━━━━━━━━━━━\n\n"
-                if txt_path.exists():
-                    with open(txt_path, 'r') as f:
-                        lines = f.readlines()
-                        report_text += f"📊 发现目标数量: {len(lines)}\n\n"
-                        class_map = {0: "龟裂", 1: "夹杂", 2: "斑块", 3: "麻点", 4: "氧化铁皮", 5: "划痕"}
-                        report_text += "📋 详细检测结果:\n\n"
-                        for line in lines:
-                            parts = line.split()
-                            cls_id = int(parts[0])
-                            cls_name = class_map.get(cls_id, f"Class {cls_id}")
-                            conf = float(parts[-1]) if len(parts) > 5 else 0.0
-                            report_text += f"  • {cls_name}: {conf:.1%}\n"
-                else:
-                    report_text += "⚠️ 未检测到明显缺陷"
-
-                self.predict_report.delete(1.0, tk.END)
-                self.predict_report.insert(tk.END, report_text)
-                self.update_status("✅ 单图检测完成", "success")
-                self.show_toast("检测成功", "结果已更新", bootstyle="success")
-            else:
+
+        def on_predict_finish(res):
+            if not res.images:
                 self.log("未找到结果图片", "WARNING")
+                return
+            r = res.images[0]
+            res_path = res.save_dir / Path(r.path).name
+            self.show_image_on_canvas(Image.fromarray(cv2.cvtColor(r.plotted, cv2.COLOR_BGR2RGB)),
+                                      self.predict_canvas)
+            report_text = f"✅ 检测完成 ({res.elapsed:.2f}s)\n\n"
+            report_text += f"📂 保存路径:\n{res_path}\n\n"
+            report_text += f"━━━━━━━━━━━━━━━\n\n"
+            if len(r):
+                report_text += f"📊 发现目标数量: {len(r)}\n\n"
+                report_text += "📋 详细检测结果:\n\n"
+                for cls_id, c in zip(r.cls.tolist(), r.conf.tolist()):
+                    cls_name = CLASS_MAP.get(cls_id, f"Class {cls_id}")
+                    report_text += f"  • {cls_name}: {c:.1%}\n"
+            else:
+                report_text += "⚠️ 未检测到明显缺陷"
+
+            self.predict_report.delete(1.0, tk.END)
+            self.predict_report.insert(tk.END, report_text)
+            self.update_status("✅ 单图检测完成", "success")
+            self.show_toast("检测成功", "结果已更新", bootstyle="success")
 
-        self.run_subprocess(cmd, finish_callback=on_predict_finish)
+        self.submit_job("image", self.predict_model.get(), self.predict_source.get(), on_predict_finish,
+                        err_prefix="预测发生错误", conf=conf, name=exp_name)
 
     # --- 批量预测逻辑 ---
     def start_batch_prediction(self):
@@ -803,58 +818,40 @@ class YOLOv8_GUI:
             return
         self.update_status("🚀 批量处理进行中...", "info")
         exp_name = f"batch_{datetime.now().strftime('%H%M%S')}"
-        cmd = [sys.executable, "predict.py",
-               "--model", self.batch_model.get(),
-               "--source", self.batch_data.get(),
-               "--name", exp_name, "--save", "--save_txt", "--project", "runs/detect"]
-
-        def on_batch_finish():
-            self.log("批量处理完成，开始生成分析报告...")
-            save_dir = Path("runs/detect") / exp_name / "labels"
-            if save_dir.exists():
-                self.analyze_and_report_batch(save_dir, str(Path("runs/detect") / exp_name))
-                self.update_status("✅ 批量处理完成，报告已生成", "success")
-                self.show_toast("批量完成", "报告与图表已生成", bootstyle="success")
-            else:
-                self.log("未找到标签目录，可能未检测到任何目标", "WARNING")
 
-        self.run_subprocess(cmd, finish_callback=on_batch_finish)
+        def on_batch_finish(res):
+            self.log(f"批量处理完成 ({len(res.columns['paths'])} 张, {res.elapsed:.2f}s)，开始生成分析报告...")
+            self.analyze_and_report_batch(res.columns, str(res.save_dir))
+            self.update_status("✅ 批量处理完成，报告已生成", "success")
+            self.show_toast("批量完成", "报告与图表已生成", bootstyle="success")
 
-    def analyze_and_report_batch(self, label_dir, output_path):
-        """生成详细报告并绘制图表"""
+        self.submit_job("batch", self.batch_model.get(), self.batch_data.get(), on_batch_finish,
+                        err_prefix="批量处理错误", name=exp_name, batch=16)
+
+    def analyze_and_report_batch(self, columns, output_path):
+        """生成详细报告并绘制图表（基于 results.npz 列式结果，全部为向量化统计）"""
         for widget in self.chart_pie_frame.winfo_children(): widget.destroy()
         for widget in self.chart_hist_frame.winfo_children(): widget.destroy()
 
+        cls, confs, xywhn = columns['cls'], columns['conf'], columns['xywhn']
+        counts = np.bincount(cls, minlength=len(CLASS_MAP))
         stats = {
-            'total_files': len(list(label_dir.glob("*.txt"))),
-            'total_defects': 0,
-            'classes': defaultdict(int),
-            'confidences': [],
-            'areas': []
+            'total_images': len(columns['paths']),
+            'total_files': int(np.unique(columns['im']).size),
+            'total_defects': int(cls.size),
+            'classes': {CLASS_MAP.get(i, str(i)): int(n) for i, n in enumerate(counts) if n},
+            'confidences': confs,
+            'conf_hist': np.histogram(confs, bins=10, range=(0, 1)),
+            'areas': xywhn[:, 2] * xywhn[:, 3]
         }
 
-        class_map = {0: "龟裂", 1: "夹杂", 2: "斑块", 3: "麻点", 4: "氧化铁皮", 5: "划痕"}
-
-        for label_file in label_dir.glob("*.txt"):
-            with open(label_file, 'r') as f:
-                for line in f:
-                    parts = line.split()
-                    if len(parts) >= 1:
-                        cls_id = int(parts[0])
-                        stats['classes'][class_map.get(cls_id, str(cls_id))] += 1
-                        stats['total_defects'] += 1
-                    if len(parts) >= 6:
-                        stats['confidences'].append(float(parts[5]))
-                    if len(parts) >= 5:
-                        w, h = float(parts[3]), float(parts[4])
-                        stats['areas'].append(w * h)
-
         # 文本报告
-        avg_conf = sum(stats['confidences']) / len(stats['confidences']) if stats['confidences'] else 0
+        avg_conf = float(stats['confidences'].mean()) if stats['confidences'].size else 0
 
         report_text = f"📋 批量检测分析报告\n"
         report_text += f"{'━' * 24}\n\n"
         report_text += f"📂 输出目录:\n{output_path}\n\n"
+        report_text += f"🖼️ 处理图片数: {stats['total_images']}\n"
         report_text += f"🖼️ 包含缺陷文件数: {stats['total_files']}\n"
         report_text += f"⚠️ 检出缺陷总数: {stats['total_defects']}\n"
         report_text += f"🎯 平均置信度: {avg_conf:.2%}\n\n"
@@ -868,10 +865,10 @@ class YOLOv8_GUI:
 
         report_text += f"\n{'━' * 24}\n\n"
         report_text += f"📏 缺陷尺寸分析:\n\n"
-        if stats['areas']:
-            report_text += f"  最大: {max(stats['areas']):.4f}\n"
-            report_text += f"  最小: {min(stats['areas']):.4f}\n"
-            large_count = sum(1 for a in stats['areas'] if a > 0.1)
+        if stats['areas'].size:
+            report_text += f"  最大: {stats['areas'].max():.4f}\n"
+            report_text += f"  最小: {stats['areas'].min():.4f}\n"
+            large_count = int((stats['areas'] > 0.1).sum())
             report_text += f"  大型缺陷(>10%): {large_count}个\n"
         else:
             report_text += "  暂无尺寸数据\n"
@@ -897,7 +894,7 @@ class YOLOv8_GUI:
             fig1.patch.set_facecolor('#0d1117')
             ax1.set_facecolor('#0d1117')
             colors = ['#00adb5', '#7c4dff', '#ff9800', '#00e676', '#ff5252', '#448aff']
-            ax1.pie(stats['classes'].values(), labels=stats['classes'].keys(),
+            ax1.pie(list(stats['classes'].values()), labels=list(stats['classes'].keys()),
                     autopct='%1.1f%%', startangle=90,
                     colors=colors[:len(stats['classes'])],
                     textprops={'fontsize': 9, 'color': 'white'})
@@ -909,11 +906,12 @@ class YOLOv8_GUI:
             canvas1.get_tk_widget().pack(fill=BOTH, expand=YES)
 
         # 直方图
-        if stats['confidences']:
+        if stats['confidences'].size:
             fig2, ax2 = plt.subplots(figsize=(5, 3), dpi=100)
             fig2.patch.set_facecolor('#0d1117')
             ax2.set_facecolor('#0d1117')
-            ax2.hist(stats['confidences'], bins=10, color='#00adb5', alpha=0.85,
+            hist, edges = stats['conf_hist']
+            ax2.hist(edges[:-1], bins=edges, weights=hist, color='#00adb5', alpha=0.85,
                      edgecolor='#1a1a2e', linewidth=1.5)
             ax2.set_title("置信度分布", fontsize=11, color='white', pad=10)
             ax2.set_xlabel("Confidence", fontsize=9, color='#a0a0b0')
@@ -941,36 +939,69 @@ class YOLOv8_GUI:
         if not self.video_model.get():
             Messagebox.show_error("请选择模型")
             return
-        self.video_loop_running = True
+        self.video_stop.set()  # 停止可能仍在运行的上一个视频任务
+        self.video_stop = stop = threading.Event()
         self.video_status.config(text="🔥 正在推理中...", bootstyle="danger")
         self.update_status("📹 视频推理进行中...", "danger")
 
-        def video_thread():
-            try:
-                model = YOLO(self.video_model.get())
-                cap = cv2.VideoCapture(int(source) if source == "0" else source)
-                while self.video_loop_running and cap.isOpened():
-                    ret, frame = cap.read()
-                    if not ret: break
-                    results = model(frame, verbose=False)
-                    res_plotted = results[0].plot()
-                    img_rgb = cv2.cvtColor(res_plotted, cv2.COLOR_BGR2RGB)
-                    img_pil = Image.fromarray(img_rgb)
-                    self.master.after(0, lambda i=img_pil: self.show_image_on_canvas(i, self.video_canvas))
-                cap.release()
-                self.master.after(0, lambda: self.video_status.config(text="⏸️ 已停止", bootstyle="secondary"))
-                self.master.after(0, lambda: self.update_status("✅ 视频处理完成", "success"))
-            except Exception as e:
-                self.log(f"视频流错误: {e}", "ERROR")
+        frames = queue.Queue(maxsize=1)  # 最新帧槽：新帧挤掉未显示的旧帧，画面不落后于视频源
+        size = [600, 400]  # 画布尺寸，由主线程 poll 刷新
 
-        threading.Thread(target=video_thread, daemon=True).start()
+        def on_frame(r):  # 流水线输出线程：缩放到画布尺寸并转为 PIL，主线程只需创建 PhotoImage
+            img = r.plotted
+            ratio = min(size[0] / img.shape[1], size[1] / img.shape[0])
+            new_size = (max(int(img.shape[1] * ratio), 1), max(int(img.shape[0] * ratio), 1))
+            img = cv2.resize(img, new_size, interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+            img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                pass
+            frames.put_nowait(img_pil)
+
+        def on_stats(s):
+            text = (f"🔥 推理中 | FPS 采集 {s['capture']} · 预处理 {s['preprocess']} · 推理 {s['infer']} · "
+                    f"渲染 {s['render']} · 显示 {s['output']} | 丢帧 {s['dropped']}")
+            self.master.after(0, lambda: stop.is_set() or self.video_status.config(text=text))
+
+        def poll():
+            w, h = self.video_canvas.winfo_width(), self.video_canvas.winfo_height()
+            if w >= 10:
+                size[:] = w, h
+            try:
+                self.show_video_frame(frames.get_nowait())
+            except queue.Empty:
+                pass
+            if not future.done():
+                self.master.after(15, poll)
+
+        def on_video_finish(res):
+            self.video_status.config(text="⏸️ 已停止", bootstyle="secondary")
+            self.update_status("✅ 视频处理完成", "success")
+            if res.stats:
+                self.log(f"📹 视频处理 {res.stats['frames']} 帧，耗时 {res.elapsed:.1f}s，丢帧 {res.stats['dropped']}")
+
+        future = self.submit_job("video", self.video_model.get(), source, on_video_finish, err_prefix="视频流错误",
+                                 on_frame=on_frame, on_stats=on_stats, stop_event=stop)
+        poll()
+
+    def show_video_frame(self, pil_img):
+        """显示流水线输出的视频帧（已缩放到画布尺寸）"""
+        canvas = self.video_canvas
+        canvas_w, canvas_h = canvas.winfo_width(), canvas.winfo_height()
+        if canvas_w < 10: canvas_w, canvas_h = 600, 400
+        tk_img = ImageTk.PhotoImage(pil_img)
+        canvas.delete("all")
+        canvas.create_image(canvas_w // 2, canvas_h // 2, anchor=tk.CENTER, image=tk_img)
+        canvas.image = tk_img
 
     def stop_video_prediction(self):
-        self.video_loop_running = False
+        self.video_stop.set()
         self.video_status.config(text="⏸️ 正在停止...", bootstyle="warning")
 
     def on_close(self):
-        self.video_loop_running = False
+        self.video_stop.set()
+        self.inference_server.shutdown(timeout=1)
         self.master.destroy()
 
 
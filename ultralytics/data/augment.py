@@ -7,6 +7,7 @@ from copy import deepcopy
 import cv2
 import numpy as np
 import torch
+import torch.nn.functional as F
 import torchvision.transforms as T
 
 from ultralytics.utils import LOGGER, colorstr
@@ -470,6 +471,199 @@ class RandomPerspective:
         return (w2 > wh_thr) & (h2 > wh_thr) & (w2 * h2 / (w1 * h1 + eps) > area_thr) & (ar < ar_thr)  # candidates
 
 
+class MosaicCanvas:
+    """
+    Worker-side stand-in for RandomPerspective when the geometric warp runs per batch in BatchAugment.
+
+    Mosaic outputs are passed through at their 2*imgsz size. Other samples are letterboxed by `pre_transform` and,
+    while mosaic is enabled, padded to the center of a canvas of the same size, so every sample of a batch stacks and
+    the batch warp maps each canvas center to the output center like RandomPerspective does.
+    """
+
+    def __init__(self, imgsz=640, mosaic=True, pre_transform=None):
+        self.size = imgsz * 2 if mosaic else None
+        self.pre_transform = pre_transform
+
+    def __call__(self, labels):
+        """Letterbox non-mosaic samples and pad them to the mosaic canvas, instances become xyxy pixels."""
+        if self.pre_transform and 'mosaic_border' not in labels:
+            labels = self.pre_transform(labels)
+        labels.pop('ratio_pad', None)
+        labels.pop('mosaic_border', None)
+        img = labels['img']
+        h, w = img.shape[:2]
+        instances = labels['instances']
+        instances.convert_bbox(format='xyxy')
+        instances.denormalize(w, h)
+        if self.size and (h, w) != (self.size, self.size):
+            top, left = (self.size - h) // 2, (self.size - w) // 2
+            img = cv2.copyMakeBorder(img,
+                                     top,
+                                     self.size - h - top,
+                                     left,
+                                     self.size - w - left,
+                                     cv2.BORDER_CONSTANT,
+                                     value=(114, 114, 114))
+            instances.add_padding(left, top)
+        labels['img'] = img
+        labels['resized_shape'] = img.shape[:2]
+        return labels
+
+
+class BatchAugment:
+    """
+    Applies the RandomPerspective, RandomHSV and RandomFlip augmentations to a whole collated batch as tensor ops.
+
+    Dataloader workers only assemble mosaics (see MosaicCanvas) and leave images HWC BGR (Format(channels_last=True)),
+    the per-sample OpenCV warp, HSV jitter, flips and the CHW RGB conversion run here on the training device. Box and
+    keypoint transforms are vectorized over all instances of the batch.
+
+    Attributes:
+        imgsz (int): Output size of mosaic canvases, smaller (letterboxed or rect) batches keep their size.
+        flip_idx (list, optional): Keypoint index permutation for horizontal flips.
+    """
+
+    def __init__(self, imgsz=640, hyp=None, flip_idx=None):
+        """Reads the augmentation gains from `hyp`, the same hyperparameters v8_transforms uses."""
+        self.imgsz = imgsz
+        self.degrees, self.translate, self.scale = hyp.degrees, hyp.translate, hyp.scale
+        self.shear, self.perspective = hyp.shear, hyp.perspective
+        self.hsv_gains = (hyp.hsv_h, hyp.hsv_s, hyp.hsv_v)
+        self.flipud, self.fliplr = hyp.flipud, hyp.fliplr
+        self.flip_idx = flip_idx or None
+
+    def __call__(self, batch):
+        """
+        Augment a batch in place.
+
+        Args:
+            batch (dict): Collated batch, `img` a float (b, h, w, 3) BGR tensor in 0-1, `bboxes` normalized xywh.
+
+        Returns:
+            (dict): The batch with augmented images and instances.
+        """
+        img = batch['img'].permute(0, 3, 1, 2)  # BHWC to BCHW view, channels stay BGR until the end
+        b, _, h, w = img.shape
+        size = min(w, self.imgsz), min(h, self.imgsz)  # output w, h
+        M, s = self.affine_matrices(b, (w, h), size)
+        if size != (w, h) or not torch.equal(M, torch.eye(3).expand_as(M)):
+            img = self.warp(img, M.to(img.device), size)
+        self.apply_instances(batch, M, s, (w, h), size)
+        if any(self.hsv_gains):
+            img = self.hsv(img)
+        for p, dim in ((self.flipud, 2), (self.fliplr, 3)):
+            if p:
+                img = self.flip(batch, img, torch.rand(b) < p, dim)
+        batch['img'] = img.flip(1).contiguous()  # BGR to RGB
+        batch['resized_shape'] = [size[::-1]] * b
+        return batch
+
+    def affine_matrices(self, b, shape, size):
+        """Random (b, 3, 3) perspective matrices from canvas `shape` to output `size`, and the per-image scale gains."""
+        def uniform(lo, hi):
+            return torch.rand(b) * (hi - lo) + lo
+
+        C, P, R, S, T = torch.eye(3).repeat(5, b, 1, 1)
+        C[:, 0, 2], C[:, 1, 2] = -shape[0] / 2, -shape[1] / 2  # center
+        P[:, 2, 0] = uniform(-self.perspective, self.perspective)  # perspective
+        P[:, 2, 1] = uniform(-self.perspective, self.perspective)
+        a = uniform(-self.degrees, self.degrees) * math.pi / 180  # rotation and scale, as cv2.getRotationMatrix2D
+        s = uniform(1 - self.scale, 1 + self.scale)
+        R[:, 0, 0] = R[:, 1, 1] = s * a.cos()
+        R[:, 0, 1], R[:, 1, 0] = s * a.sin(), -s * a.sin()
+        S[:, 0, 1] = (uniform(-self.shear, self.shear) * math.pi / 180).tan()  # shear
+        S[:, 1, 0] = (uniform(-self.shear, self.shear) * math.pi / 180).tan()
+        T[:, 0, 2] = uniform(0.5 - self.translate, 0.5 + self.translate) * size[0]  # translation
+        T[:, 1, 2] = uniform(0.5 - self.translate, 0.5 + self.translate) * size[1]
+        return T @ S @ R @ P @ C, s
+
+    @staticmethod
+    def warp(img, M, size):
+        """Warp (b, 3, h, w) images to `size` with bilinear sampling and 114 gray borders, like cv2.warpPerspective."""
+        b, _, h, w = img.shape
+        y, x = torch.meshgrid(torch.arange(size[1], device=img.device, dtype=M.dtype),
+                              torch.arange(size[0], device=img.device, dtype=M.dtype),
+                              indexing='ij')
+        xy = torch.stack((x, y, torch.ones_like(x)), -1).view(-1, 3)
+        src = xy @ torch.linalg.inv(M).transpose(1, 2)  # output pixel -> canvas pixel, (b, n, 3)
+        src = src[..., :2] / src[..., 2:]
+        grid = (src * 2 + 1) / src.new_tensor((w, h)) - 1  # pixel centers to align_corners=False coordinates
+        pad = 114 / 255
+        out = F.grid_sample(img - pad, grid.view(b, size[1], size[0], 2).to(img.dtype), align_corners=False)
+        return out.add_(pad)
+
+    def apply_instances(self, batch, M, s, shape, size):
+        """Transform boxes and keypoints of all images at once, then drop the candidates RandomPerspective drops."""
+        bboxes = batch['bboxes']
+        if not len(bboxes):
+            return
+        i = batch['batch_idx'].long()
+        M, s = M.to(bboxes.device)[i], s.to(bboxes.device)[i]
+        wh = bboxes.new_tensor(shape)
+        xy, bwh = bboxes[:, :2] * wh, bboxes[:, 2:] * wh
+        box1 = torch.cat((xy - bwh / 2, xy + bwh / 2), 1)  # xyxy pixels
+        corners = box1[:, [0, 1, 2, 3, 0, 3, 2, 1]].view(-1, 4, 2)  # x1y1, x2y2, x1y2, x2y1
+        corners = self.transform_points(corners, M, perspective=bool(self.perspective))
+        out = bboxes.new_tensor(size)
+        box2 = torch.cat((corners.amin(1), corners.amax(1)), 1)
+        box2 = torch.min(box2.clamp(0), out.repeat(2))  # clip
+        keep = self.box_candidates(box1 * s[:, None], box2)
+        box2 = box2[keep]
+        batch['bboxes'] = torch.cat(((box2[:, :2] + box2[:, 2:]) / 2, box2[:, 2:] - box2[:, :2]), 1) / out.repeat(2)
+        batch['cls'], batch['batch_idx'] = batch['cls'][keep], batch['batch_idx'][keep]
+        if 'keypoints' in batch:
+            kpts = batch['keypoints'][keep]
+            xy = self.transform_points(kpts[..., :2] * wh, M[keep])
+            if kpts.shape[-1] == 3:  # zero the visibility of keypoints warped out of the image
+                kpts[..., 2][((xy < 0) | (xy > out)).any(-1)] = 0
+            kpts[..., :2] = torch.min(xy.clamp(0), out) / out
+            batch['keypoints'] = kpts
+
+    @staticmethod
+    def box_candidates(box1, box2, wh_thr=2, ar_thr=100, area_thr=0.1, eps=1e-16):
+        """RandomPerspective.box_candidates() for (n, 4) xyxy tensors, box1 before and box2 after the warp."""
+        w1, h1 = box1[:, 2] - box1[:, 0], box1[:, 3] - box1[:, 1]
+        w2, h2 = box2[:, 2] - box2[:, 0], box2[:, 3] - box2[:, 1]
+        ar = torch.max(w2 / (h2 + eps), h2 / (w2 + eps))  # aspect ratio
+        return (w2 > wh_thr) & (h2 > wh_thr) & (w2 * h2 / (w1 * h1 + eps) > area_thr) & (ar < ar_thr)
+
+    @staticmethod
+    def transform_points(xy, M, perspective=True):
+        """Apply per-row (n, 3, 3) matrices to (n, k, 2) points."""
+        xy = torch.cat((xy, torch.ones_like(xy[..., :1])), -1) @ M.transpose(1, 2)
+        return xy[..., :2] / xy[..., 2:] if perspective else xy[..., :2]
+
+    def hsv(self, img):
+        """Random per-image hue, saturation and value gains on BGR images, the tensor equivalent of RandomHSV."""
+        r = (torch.rand(len(img), 3, device=img.device) * 2 - 1) * img.new_tensor(self.hsv_gains) + 1
+        r = r[..., None, None]
+        v, i = img.max(1)
+        d = (v - img.amin(1)).clamp_(min=1E-6)
+        blue, green, red = img.unbind(1)
+        hue = torch.where(i == 2, ((green - blue) / d) % 6, torch.where(i == 1, (blue - red) / d + 2,
+                                                                        (red - green) / d + 4))
+        hue = (hue * r[:, 0]) % 6  # hue in 0-6 sectors
+        sat = (d / v.clamp(min=1E-6) * r[:, 1]).clamp_(0, 1)
+        v = (v * r[:, 2]).clamp_(0, 1)
+        k = (hue[:, None] + img.new_tensor((1, 3, 5)).view(1, 3, 1, 1)) % 6  # BGR
+        return v[:, None] - (v * sat)[:, None] * torch.min(k, 4 - k).clamp_(0, 1)
+
+    def flip(self, batch, img, mask, dim):
+        """Flip the images selected by the (b,) `mask` along `dim` (2 up-down, 3 left-right) with their instances."""
+        if not mask.any():
+            return img
+        img = torch.where(mask.to(img.device)[:, None, None, None], img.flip(dim), img)
+        j = mask[batch['batch_idx'].long().cpu()].to(batch['bboxes'].device)  # instances of flipped images
+        c = 0 if dim == 3 else 1  # x or y column
+        batch['bboxes'][j, c] = 1 - batch['bboxes'][j, c]
+        if 'keypoints' in batch:
+            kpts = batch['keypoints']
+            kpts[j, :, c] = 1 - kpts[j, :, c]
+            if dim == 3 and self.flip_idx is not None:
+                kpts[j] = kpts[j][:, self.flip_idx]
+        return img
+
+
 class RandomHSV:
 
     def __init__(self, hgain=0.5, sgain=0.5, vgain=0.5) -> None:
@@ -698,7 +892,8 @@ class Format:
                  return_keypoint=False,
                  mask_ratio=4,
                  mask_overlap=True,
-                 batch_idx=True):
+                 batch_idx=True,
+                 channels_last=False):
         self.bbox_format = bbox_format
         self.normalize = normalize
         self.return_mask = return_mask  # set False when training detection only
@@ -706,6 +901,7 @@ class Format:
         self.mask_ratio = mask_ratio
         self.mask_overlap = mask_overlap
         self.batch_idx = batch_idx  # keep the batch indexes
+        self.channels_last = channels_last  # keep HWC BGR images, BatchAugment converts them on the training device
 
     def __call__(self, labels):
         """Return formatted image, classes, bounding boxes & keypoints to be used by 'collate_fn'."""
@@ -741,6 +937,8 @@ class Format:
         """Format the image for YOLOv5 from Numpy array to PyTorch tensor."""
         if len(img.shape) < 3:
             img = np.expand_dims(img, -1)
+        if self.channels_last:
+            return torch.from_numpy(np.ascontiguousarray(img))
         img = np.ascontiguousarray(img.transpose(2, 0, 1)[::-1])
         img = torch.from_numpy(img)
         return img
@@ -759,18 +957,24 @@ class Format:
         return masks, instances, cls
 
 
-def v8_transforms(dataset, imgsz, hyp, stretch=False):
-    """Convert images to a size suitable for YOLOv8 training."""
+def v8_transforms(dataset, imgsz, hyp, stretch=False, batch_aug=False):
+    """
+    Convert images to a size suitable for YOLOv8 training.
+
+    With `batch_aug=True` the returned transforms stop after mosaic assembly, mixup and albumentations, and the warp,
+    HSV and flip augmentations are left to BatchAugment on the collated batch.
+    """
+    letterbox = None if stretch else LetterBox(new_shape=(imgsz, imgsz))
     pre_transform = Compose([
         Mosaic(dataset, imgsz=imgsz, p=hyp.mosaic),
         CopyPaste(p=hyp.copy_paste),
-        RandomPerspective(
+        MosaicCanvas(imgsz, mosaic=hyp.mosaic > 0, pre_transform=letterbox) if batch_aug else RandomPerspective(
             degrees=hyp.degrees,
             translate=hyp.translate,
             scale=hyp.scale,
             shear=hyp.shear,
             perspective=hyp.perspective,
-            pre_transform=None if stretch else LetterBox(new_shape=(imgsz, imgsz)),
+            pre_transform=letterbox,
         )])
     flip_idx = dataset.data.get('flip_idx', [])  # for keypoints augmentation
     if dataset.use_keypoints:
@@ -781,6 +985,8 @@ def v8_transforms(dataset, imgsz, hyp, stretch=False):
         elif flip_idx and (len(flip_idx) != kpt_shape[0]):
             raise ValueError(f'data.yaml flip_idx={flip_idx} length must be equal to kpt_shape[0]={kpt_shape[0]}')
 
+    if batch_aug:
+        return Compose([pre_transform, MixUp(dataset, pre_transform=pre_transform, p=hyp.mixup), Albumentations(p=1.0)])
     return Compose([
         pre_transform,
         MixUp(dataset, pre_transform=pre_transform, p=hyp.mixup),
@@ -1,10 +1,15 @@
 # Ultralytics YOLO 🚀, AGPL-3.0 license
 
+import atexit
+import contextlib
 import glob
+import hashlib
 import math
 import os
 import random
+import shutil
 from copy import deepcopy
+from multiprocessing import resource_tracker, shared_memory
 from multiprocessing.pool import ThreadPool
 from pathlib import Path
 from typing import Optional
@@ -14,9 +19,34 @@ import numpy as np
 import psutil
 from torch.utils.data import Dataset
 
-from ultralytics.utils import DEFAULT_CFG, LOCAL_RANK, LOGGER, NUM_THREADS, TQDM
+from ultralytics.utils import DEFAULT_CFG, LOCAL_RANK, LOGGER, NUM_THREADS, TQDM, is_dir_writeable
 
-from .utils import HELP_URL, IMG_FORMATS
+from .utils import HELP_URL, IMG_FORMATS, LabelStore, get_hash
+
+
+SHARED_CACHES = {}  # shared memory RAM caches created or attached by this process, kept open for its lifetime
+
+
+def _unlink_shared_memory(shm, pid):
+    """Unlink a shared memory block when its creating process exits."""
+    if os.getpid() == pid:
+        with contextlib.suppress(FileNotFoundError):
+            shm.unlink()
+
+
+def _pid_alive(pid):
+    """Returns False if no process `pid` exists, on POSIX only, where shared memory blocks outlive their creator."""
+    if os.name != 'posix':
+        return True
+    if pid <= 0:  # crashed before recording its pid
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by another user
+        pass
+    return True
 
 
 class BaseDataset(Dataset):
@@ -26,7 +56,8 @@ class BaseDataset(Dataset):
     Args:
         img_path (str): Path to the folder containing images.
         imgsz (int, optional): Image size. Defaults to 640.
-        cache (bool, optional): Cache images to RAM or disk during training. Defaults to False.
+        cache (bool | str, optional): Cache images to RAM ('ram'), disk ('disk') or a packed memory-mapped store
+            ('mmap') during training. Defaults to False.
         augment (bool, optional): If True, data augmentation is applied. Defaults to True.
         hyp (dict, optional): Hyperparameters to apply data augmentation. Defaults to None.
         prefix (str, optional): Prefix to print in log messages. Defaults to ''.
@@ -43,7 +74,10 @@ class BaseDataset(Dataset):
         labels (list): List of label data dictionaries.
         ni (int): Number of images in the dataset.
         ims (list): List of loaded images.
+        shm (SharedMemory): Shared memory block backing the RAM cache, set when cache='ram' or True.
+        shm_name (str): Name of the shared memory block this dataset creates, None if attached or not RAM cached.
         npy_files (list): List of numpy file paths.
+        mmap_file (Path): Packed memory-mapped image store, set when cache='mmap'.
         transforms (callable): Image transformation function.
     """
 
@@ -85,12 +119,24 @@ class BaseDataset(Dataset):
         self.max_buffer_length = min((self.ni, self.batch_size * 8, 1000)) if self.augment else 0
 
         # Cache stuff
-        if cache == 'ram' and not self.check_cache_ram():
-            cache = False
         self.ims, self.im_hw0, self.im_hw = [None] * self.ni, [None] * self.ni, [None] * self.ni
+        self.shm, self.shm_name, self.workers = None, None, getattr(hyp, 'workers', 0)
+        if cache is True or cache == 'ram':
+            name = self.shared_cache_name()
+            if self.attach_shared_cache(name):
+                cache = False  # already cached in shared memory by another rank or run
+            elif cache == 'ram' and not self.check_cache_ram():
+                cache = False
+            else:
+                self.shm_name = name
         self.npy_files = [Path(f).with_suffix('.npy') for f in self.im_files]
-        if cache:
+        self.mmap_file, self.mmap, self.mmap_index = None, None, None
+        if cache == 'mmap':
+            self.cache_images_to_mmap()
+        elif cache:
             self.cache_images(cache)
+        if (cache or self.shm) and self.augment and not self.buffer:  # all cached, mosaic samples the last loaded
+            self.buffer = list(range(self.ni))[-self.max_buffer_length:]
 
         # Transforms
         self.transforms = self.build_transforms(hyp=hyp)
@@ -124,6 +170,12 @@ class BaseDataset(Dataset):
     def update_labels(self, include_class: Optional[list]):
         """include_class, filter labels to include only these classes (optional)."""
         include_class_array = np.array(include_class).reshape(1, -1)
+        if isinstance(self.labels, LabelStore):
+            if include_class is not None:
+                self.labels = self.labels.select((self.labels.cls == include_class_array).any(1))
+            if self.single_cls:
+                self.labels.cls = np.zeros(self.labels.cls.shape, dtype=self.labels.cls.dtype)
+            return
         for i in range(len(self.labels)):
             if include_class is not None:
                 cls = self.labels[i]['cls']
@@ -142,6 +194,8 @@ class BaseDataset(Dataset):
 
     def load_image(self, i, rect_mode=True):
         """Loads 1 image from dataset index 'i', returns (im, resized hw)."""
+        if self.mmap_file is not None:
+            return self.load_mmap_image(i)
         im, f, fn = self.ims[i], self.im_files[i], self.npy_files[i]
         if im is None:  # not cached in RAM
             if fn.exists():  # load npy
@@ -159,8 +213,8 @@ class BaseDataset(Dataset):
             elif not (h0 == w0 == self.imgsz):  # resize by stretching image to square imgsz
                 im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
 
-            # Add to buffer if training with augmentations
-            if self.augment:
+            # Add to buffer if training with augmentations, RAM cache keeps every image
+            if self.augment and self.shm_name is None:
                 self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]  # im, hw_original, hw_resized
                 self.buffer.append(i)
                 if len(self.buffer) >= self.max_buffer_length:
@@ -169,7 +223,8 @@ class BaseDataset(Dataset):
 
             return im, (h0, w0), im.shape[:2]
 
-        return self.ims[i], self.im_hw0[i], self.im_hw[i]
+        im = self.ims[i]
+        return im if im.flags.writeable else im.copy(), self.im_hw0[i], self.im_hw[i]  # shared cache is read-only
 
     def cache_images(self, cache):
         """Cache images to memory or disk."""
@@ -186,6 +241,134 @@ class BaseDataset(Dataset):
                     b += self.ims[i].nbytes
                 pbar.desc = f'{self.prefix}Caching images ({b / gb:.1f}GB {cache})'
             pbar.close()
+        if cache != 'disk':
+            self.share_cached_images(self.shm_name, b)
+
+    def shared_cache_name(self):
+        """Name of the shared memory RAM cache, identical for every process caching the same images."""
+        h = hashlib.sha256(f'{get_hash(self.im_files)}{self.imgsz}{type(self).__name__}'.encode())
+        return f'yolo_{h.hexdigest()[:16]}'
+
+    def shared_cache_index(self, shm):
+        """
+        Views of a shared cache block laid out as int64 (ready, ni, creator pid), offsets, shapes, hw0 followed by
+        image bytes.
+        """
+        ni = self.ni
+        index = np.ndarray((3 + (ni + 1) + ni * 5, ), dtype=np.int64, buffer=shm.buf)
+        offsets, shapes, hw0 = np.split(index[3:], [ni + 1, ni * 4 + 1])
+        return index[:3], offsets, shapes.reshape(ni, 3), hw0.reshape(ni, 2), index.nbytes
+
+    def share_cached_images(self, name, nbytes):
+        """Move RAM cached images into one shared memory block that all workers and local DDP ranks read from."""
+        gb, size = 1 << 30, 8 * (3 + (self.ni + 1) + self.ni * 5) + nbytes
+        if os.path.isdir('/dev/shm') and shutil.disk_usage('/dev/shm').free < size:  # writing past it raises SIGBUS
+            LOGGER.warning(f'{self.prefix}WARNING ⚠️ {size / gb:.1f}GB /dev/shm required to share cached images '
+                           f"but only {shutil.disk_usage('/dev/shm').free / gb:.1f}GB free, not sharing.")
+            return
+        for retry in True, False:
+            try:
+                shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                break
+            except FileExistsError:  # created concurrently, or left over by a crashed run
+                if self.attach_shared_cache(name):
+                    return
+                if not (retry and self.unlink_stale_shared_cache(name)):
+                    LOGGER.warning(f'{self.prefix}WARNING ⚠️ Shared image cache {name} exists but is incomplete, '
+                                   'not sharing.')
+                    return
+            except OSError as e:
+                LOGGER.warning(f'{self.prefix}WARNING ⚠️ Shared image cache not created: {e}')
+                return
+        SHARED_CACHES[name] = shm
+        atexit.register(_unlink_shared_memory, shm, os.getpid())  # only the creating process unlinks
+        header, offsets, shapes, hw0, o = self.shared_cache_index(shm)
+        header[1:] = self.ni, os.getpid()  # creator, to detect blocks left incomplete by a crashed run
+        for i, im in enumerate(self.ims):
+            im = np.ascontiguousarray(im if im.ndim == 3 else im[..., None])  # grayscale stored as (h, w, 1)
+            offsets[i + 1], shapes[i], hw0[i] = offsets[i] + im.nbytes, im.shape, self.im_hw0[i]
+            shm.buf[o + offsets[i]:o + offsets[i + 1]] = im.ravel().data
+            self.ims[i] = None  # free the private copy as soon as it is shared
+        header[0] = 1  # mark ready
+        del header, offsets, shapes, hw0
+        self.shm = shm
+        self.set_shared_views()
+        procs = max(int(os.getenv('LOCAL_WORLD_SIZE', 1)), 1) * (max(self.workers, 0) + 1)  # ranks x (workers + main)
+        LOGGER.info(f'{self.prefix}Shared RAM image cache {name}: {nbytes / gb:.1f}GB held once for up to {procs} '
+                    f'processes instead of one copy each ({nbytes * (procs - 1) / gb:.1f}GB saved)')
+
+    def attach_shared_cache(self, name, worker=False):
+        """
+        Attach to a completed shared memory RAM cache by name, returns True on success.
+
+        Args:
+            name (str): Shared memory block name from shared_cache_name().
+            worker (bool): Attaching from a spawned DataLoader worker, which shares the resource tracker of the
+                creating process and must leave its registration in place.
+        """
+        shm = SHARED_CACHES.get(name)
+        if shm is None:
+            try:
+                try:
+                    shm = shared_memory.SharedMemory(name=name, track=False)  # Python>=3.13
+                except TypeError:
+                    shm = shared_memory.SharedMemory(name=name)
+                    if not worker:  # another rank or run owns the block, do not unlink it when this process exits
+                        resource_tracker.unregister(shm._name, 'shared_memory')
+            except OSError:
+                return False
+        ready = False
+        if shm.size >= 8 * (3 + (self.ni + 1) + self.ni * 5):
+            header = self.shared_cache_index(shm)[0]
+            ready = header[0] == 1 and header[1] == self.ni  # fully written and same dataset
+            del header
+        if not ready:
+            if name not in SHARED_CACHES:
+                shm.close()
+            return False
+        SHARED_CACHES[name] = shm
+        self.shm = shm
+        self.set_shared_views()
+        if not worker:
+            LOGGER.info(f'{self.prefix}Attached shared RAM image cache {name} ({shm.size / (1 << 30):.1f}GB)')
+        return True
+
+    def unlink_stale_shared_cache(self, name):
+        """
+        Unlink a shared memory RAM cache left incomplete by a process that no longer exists, i.e. a run that crashed
+        while caching, returns True if the block was unlinked or is already gone.
+        """
+        try:
+            try:
+                shm, tracked = shared_memory.SharedMemory(name=name, track=False), False  # Python>=3.13
+            except TypeError:
+                shm, tracked = shared_memory.SharedMemory(name=name), True
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        stale = True  # too small to hold a header
+        if shm.size >= 24:
+            header = np.ndarray((3, ), dtype=np.int64, buffer=shm.buf)
+            stale = header[0] == 0 and not _pid_alive(int(header[2]))
+            del header
+        if stale:
+            LOGGER.warning(f'{self.prefix}WARNING ⚠️ Removing incomplete shared image cache {name} of a crashed run.')
+            with contextlib.suppress(FileNotFoundError):
+                shm.unlink()
+        elif tracked:  # another live process owns the block, do not unlink it when this process exits
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        shm.close()
+        return stale
+
+    def set_shared_views(self):
+        """Point self.ims at read-only views into the shared memory block."""
+        _, offsets, shapes, hw0, o = self.shared_cache_index(self.shm)
+        for i in range(self.ni):
+            im = np.ndarray(shapes[i], dtype=np.uint8, buffer=self.shm.buf, offset=o + offsets[i])
+            im.flags.writeable = False
+            self.ims[i] = im if im.shape[2] > 1 else im[..., 0]
+            self.im_hw0[i], self.im_hw[i] = tuple(hw0[i]), self.ims[i].shape[:2]
 
     def cache_images_to_disk(self, i):
         """Saves an image as an *.npy file for faster loading."""
@@ -193,6 +376,52 @@ class BaseDataset(Dataset):
         if not f.exists():
             np.save(f.as_posix(), cv2.imread(self.im_files[i]), allow_pickle=False)
 
+    def cache_images_to_mmap(self):
+        """Pack all resized images into one memory-mapped file, rebuilt only when the image list hash changes."""
+        p = Path(self.im_files[0]).parent
+        path = p.parent / f'{p.name}-{self.imgsz}.mmap'  # packed uint8 image data
+        index_path = path.with_suffix('.mmap.npz')  # offsets, resized shapes and original hw per image
+        h = get_hash(self.im_files)
+        try:
+            with np.load(index_path) as index:
+                assert str(index['hash']) == h and int(index['imgsz']) == self.imgsz  # identical image list
+                assert path.stat().st_size == int(index['offsets'][-1])  # data file complete
+                self.mmap_index = {k: index[k] for k in ('offsets', 'shapes', 'hw0')}
+            LOGGER.info(f'{self.prefix}Using packed image cache {path} ({path.stat().st_size / (1 << 30):.1f}GB mmap)')
+        except Exception:  # missing, stale or corrupt index
+            self.mmap_index = None
+            if not is_dir_writeable(path.parent):
+                LOGGER.warning(f'{self.prefix}WARNING ⚠️ Cache directory {path.parent} is not writeable, '
+                               'images not cached.')
+                return
+            offsets = np.zeros(self.ni + 1, dtype=np.int64)  # byte offset of each image, last = total size
+            shapes, hw0 = np.zeros((self.ni, 3), dtype=np.int32), np.zeros((self.ni, 2), dtype=np.int32)
+            tmp = path.with_suffix('.mmap.tmp')
+            with open(tmp, 'wb') as fp, ThreadPool(NUM_THREADS) as pool:
+                results = pool.imap(self.load_image, range(self.ni))
+                pbar = TQDM(enumerate(results), total=self.ni, disable=LOCAL_RANK > 0)
+                for i, (im, hw, _) in pbar:
+                    im = np.ascontiguousarray(im if im.ndim == 3 else im[..., None])  # grayscale stored as (h, w, 1)
+                    fp.write(im.data)
+                    offsets[i + 1], shapes[i], hw0[i] = offsets[i] + im.nbytes, im.shape, hw
+                    pbar.desc = f'{self.prefix}Caching images ({offsets[i + 1] / (1 << 30):.1f}GB mmap)'
+                pbar.close()
+            tmp.replace(path)
+            self.mmap_index = {'offsets': offsets, 'shapes': shapes, 'hw0': hw0}
+            np.savez(index_path, hash=h, imgsz=self.imgsz, **self.mmap_index)  # written last, marks the store valid
+            LOGGER.info(f'{self.prefix}New packed image cache created: {path}')
+        self.ims, self.im_hw0, self.im_hw = [None] * self.ni, [None] * self.ni, [None] * self.ni  # keep indices only
+        self.mmap_file = path
+
+    def load_mmap_image(self, i):
+        """Loads image 'i' from the packed memory-mapped store, returns (im, hw_original, hw_resized)."""
+        if self.mmap is None:  # opened lazily so every DataLoader worker maps the same pages read-only
+            self.mmap = np.memmap(self.mmap_file, dtype=np.uint8, mode='r')
+        o, shape = self.mmap_index['offsets'][i], self.mmap_index['shapes'][i]
+        im = self.mmap[o:o + shape.prod()].reshape(shape)
+        im = np.array(im if shape[2] > 1 else im[..., 0])  # writeable copy, augmentations may modify in-place
+        return im, tuple(self.mmap_index['hw0'][i]), im.shape[:2]
+
     def check_cache_ram(self, safety_margin=0.5):
         """Check image caching requirements vs available memory."""
         b, gb = 0, 1 << 30  # bytes of cached images, bytes per gigabytes
@@ -216,11 +445,12 @@ class BaseDataset(Dataset):
         bi = np.floor(np.arange(self.ni) / self.batch_size).astype(int)  # batch index
         nb = bi[-1] + 1  # number of batches
 
-        s = np.array([x.pop('shape') for x in self.labels])  # hw
+        store = isinstance(self.labels, LabelStore)
+        s = self.labels.shapes if store else np.array([x.pop('shape') for x in self.labels])  # hw
         ar = s[:, 0] / s[:, 1]  # aspect ratio
         irect = ar.argsort()
         self.im_files = [self.im_files[i] for i in irect]
-        self.labels = [self.labels[i] for i in irect]
+        self.labels = self.labels[irect] if store else [self.labels[i] for i in irect]
         ar = ar[irect]
 
         # Set training image shapes
@@ -236,13 +466,30 @@ class BaseDataset(Dataset):
         self.batch_shapes = np.ceil(np.array(shapes) * self.imgsz / self.stride + self.pad).astype(int) * self.stride
         self.batch = bi  # batch index of image
 
+    def __getstate__(self):
+        """Drop the open memory map when pickled to spawned DataLoader workers, which re-open it lazily."""
+        state = self.__dict__.copy()
+        state['mmap'] = None
+        if self.shm is not None:  # shared cache is re-attached by name, not pickled image by image
+            state['shm'], state['ims'] = self.shm.name, [None] * self.ni
+        return state
+
+    def __setstate__(self, state):
+        """Re-attach the shared memory RAM cache after unpickling in a spawned worker."""
+        self.__dict__.update(state)
+        if isinstance(self.shm, str):
+            self.attach_shared_cache(self.shm, worker=True)
+
     def __getitem__(self, index):
         """Returns transformed label information for given index."""
         return self.transforms(self.get_image_and_label(index))
 
     def get_image_and_label(self, index):
         """Get and return label information from the dataset."""
-        label = deepcopy(self.labels[index])  # requires deepcopy() https://github.com/ultralytics/ultralytics/pull/1948
+        if isinstance(self.labels, LabelStore):
+            label = self.labels[index]  # fresh dict holding copies of this image's rows
+        else:
+            label = deepcopy(self.labels[index])  # requires deepcopy() https://github.com/ultralytics/ultralytics/pull/1948
         label.pop('shape', None)  # shape is for rect, remove it
         label['img'], label['ori_shape'], label['resized_shape'] = self.load_image(index)
         label['ratio_pad'] = (label['resized_shape'][0] / label['ori_shape'][0],
@@ -9,9 +9,9 @@ import torch
 from PIL import Image
 from torch.utils.data import dataloader, distributed
 
-from ultralytics.data.loaders import (LOADERS, LoadImages, LoadPilAndNumpy, LoadScreenshots, LoadStreams, LoadTensor,
-                                      SourceTypes, autocast_list)
-from ultralytics.data.utils import IMG_FORMATS, VID_FORMATS
+from ultralytics.data.loaders import (LOADERS, LoadImages, LoadPilAndNumpy, LoadPrefetch, LoadScreenshots, LoadStreams,
+                                      LoadTensor, SourceTypes, autocast_list)
+from ultralytics.data.utils import IMG_FORMATS, VID_FORMATS, LabelStore, stratified_subset
 from ultralytics.utils import RANK, colorstr
 from ultralytics.utils.checks import check_file
 
@@ -109,6 +109,48 @@ def build_dataloader(dataset, batch, workers, shuffle=True, rank=-1):
                               generator=generator)
 
 
+def build_subset_dataloader(dataset, fraction, batch, workers, seed=0):
+    """
+    Return an InfiniteDataLoader over a fixed class-stratified fraction of a validation dataset.
+
+    The dataset, its image caches and label cache are shared with the full validation DataLoader. Batches hold
+    consecutive selected images with the same rectangular batch shape, so rect datasets keep their letterbox shapes.
+
+    Args:
+        dataset (Dataset): Validation YOLODataset or ClassificationDataset.
+        fraction (float): Fraction of the images of every class to validate on, see stratified_subset().
+        batch (int): Maximum batch size.
+        workers (int): Maximum number of DataLoader workers.
+        seed (int, optional): Random seed of the subset. Defaults to 0.
+
+    Returns:
+        (InfiniteDataLoader): DataLoader over the subset.
+    """
+    labels = getattr(dataset, 'labels', None)
+    if isinstance(labels, LabelStore):
+        classes = np.split(labels.cls[:, 0], labels.offsets[1:-1])
+    elif labels is not None:
+        classes = [x['cls'].reshape(-1) for x in labels]
+    else:  # ClassificationDataset
+        classes = [[x[1]] for x in dataset.samples]
+    index = stratified_subset(classes, fraction, seed)
+    rect = getattr(dataset, 'rect', False)
+    shapes = dataset.batch_shapes[dataset.batch[index]] if rect else np.zeros((len(index), 2), dtype=int)
+    batches, start = [], 0
+    for i in range(1, len(index) + 1):
+        if i == len(index) or i - start == batch or (shapes[i] != shapes[start]).any():
+            batches.append(index[start:i].tolist())
+            start = i
+    nd = torch.cuda.device_count()  # number of CUDA devices
+    nw = min([os.cpu_count() // max(nd, 1), batch if batch > 1 else 0, workers])  # number of workers
+    return InfiniteDataLoader(dataset=dataset,
+                              batch_sampler=batches,
+                              num_workers=nw,
+                              pin_memory=PIN_MEMORY,
+                              collate_fn=getattr(dataset, 'collate_fn', None),
+                              worker_init_fn=seed_worker)
+
+
 def check_source(source):
     """Check source type and return corresponding flag values."""
     webcam, screenshot, from_img, in_memory, tensor = False, False, False, False, False
@@ -135,7 +177,7 @@ def check_source(source):
     return source, webcam, screenshot, from_img, in_memory, tensor
 
 
-def load_inference_source(source=None, imgsz=640, vid_stride=1, buffer=False):
+def load_inference_source(source=None, imgsz=640, vid_stride=1, buffer=False, batch=1, prefetch=0, workers=4):
     """
     Loads an inference source for object detection and applies necessary transformations.
 
@@ -144,6 +186,9 @@ def load_inference_source(source=None, imgsz=640, vid_stride=1, buffer=False):
         imgsz (int, optional): The size of the image for inference. Default is 640.
         vid_stride (int, optional): The frame interval for video sources. Default is 1.
         buffer (bool, optional): Determined whether stream frames will be buffered. Default is False.
+        batch (int, optional): Number of image files returned per iteration for file sources. Default is 1.
+        prefetch (int, optional): Number of file source batches decoded ahead in a background thread. Default is 0.
+        workers (int, optional): Number of image decoding threads used when prefetching. Default is 4.
 
     Returns:
         dataset (Dataset): A dataset object for the specified input source.
@@ -163,7 +208,9 @@ def load_inference_source(source=None, imgsz=640, vid_stride=1, buffer=False):
     elif from_img:
         dataset = LoadPilAndNumpy(source, imgsz=imgsz)
     else:
-        dataset = LoadImages(source, imgsz=imgsz, vid_stride=vid_stride)
+        dataset = LoadImages(source, imgsz=imgsz, vid_stride=vid_stride, batch=batch)
+        if prefetch > 0:
+            dataset = LoadPrefetch(dataset, prefetch=prefetch, workers=workers)
 
     # Attach source types to the dataset
     setattr(dataset, 'source_type', source_type)
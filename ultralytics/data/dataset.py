@@ -1,5 +1,6 @@
 # Ultralytics YOLO 🚀, AGPL-3.0 license
 import contextlib
+import json
 from itertools import repeat
 from multiprocessing.pool import ThreadPool
 from pathlib import Path
@@ -11,12 +12,15 @@ import torchvision
 
 from ultralytics.utils import LOCAL_RANK, NUM_THREADS, TQDM, colorstr, is_dir_writeable
 
-from .augment import Compose, Format, Instances, LetterBox, classify_albumentations, classify_transforms, v8_transforms
+from .augment import (BatchAugment, Compose, Format, Instances, LetterBox, classify_albumentations, classify_transforms,
+                      v8_transforms)
 from .base import BaseDataset
-from .utils import HELP_URL, LOGGER, get_hash, img2label_paths, verify_image, verify_image_label
+from .utils import (HELP_URL, LOGGER, LabelStore, get_file_stamps, get_hash, img2label_paths, verify_image,
+                    verify_image_label)
 
 # Ultralytics dataset *.cache version, >= 1.0.0 for YOLOv8
 DATASET_CACHE_VERSION = '1.0.3'
+LABEL_CACHE_VERSION = '1.2.0'  # columnar YOLODataset labels *.cache with per-file stamps
 
 
 class YOLODataset(BaseDataset):
@@ -39,34 +43,66 @@ class YOLODataset(BaseDataset):
         assert not (self.use_segments and self.use_keypoints), 'Can not use both segments and keypoints.'
         super().__init__(*args, **kwargs)
 
-    def cache_labels(self, path=Path('./labels.cache')):
+    def cache_labels(self, path=Path('./labels.cache'), cache=None):
         """Cache dataset labels, check images and read shapes.
+
+        Image/label pairs whose file sizes and modification times match an entry of a previous cache are reused, only
+        new or changed pairs are verified and merged in.
+
         Args:
             path (Path): path where to save the cache file (default: Path('./labels.cache')).
+            cache (dict, optional): previously saved cache to update. Defaults to None (verify all pairs).
         Returns:
-            (dict): labels.
+            (dict): labels, the unchanged 'cache' object if nothing had to be verified.
         """
-        x = {'labels': []}
-        nm, nf, ne, nc, msgs = 0, 0, 0, 0, []  # number missing, found, empty, corrupt, messages
+        x, labels, verified = {}, [], []
+        nc, msgs, corrupt = 0, {}, {}  # number corrupt, messages and stamps of corrupt pairs by image file
         desc = f'{self.prefix}Scanning {path.parent / path.stem}...'
-        total = len(self.im_files)
         nkpt, ndim = self.data.get('kpt_shape', (0, 0))
         if self.use_keypoints and (nkpt <= 0 or ndim not in (2, 3)):
             raise ValueError("'kpt_shape' in data.yaml missing or incorrect. Should be a list with [number of "
                              "keypoints, number of dims (2 for x,y or 3 for x,y,visible)], i.e. 'kpt_shape: [17, 3]'")
+        kpt_shape = (nkpt, 3) if self.use_keypoints else None  # 2D keypoints gain a visibility column
+        stamps = np.concatenate((get_file_stamps(self.im_files), get_file_stamps(self.label_files)), 1)
+
+        # Match image/label pairs against the previous cache by path, size and modification time
+        old = cache['labels'] if cache else LabelStore.from_labels([], kpt_shape, stamps[:0], np.zeros(0, np.int8))
+        rows = {f: i for i, f in enumerate(old.im_files)}
+        reuse = np.array([rows.get(f, -1) for f in self.im_files], dtype=np.int64)  # row in old cache, -1 to verify
+        known = np.flatnonzero(reuse >= 0)
+        reuse[known[(old.stamps[reuse[known]] != stamps[known]).any(1)]] = -1  # changed since cached
+        keep = np.flatnonzero(reuse >= 0)
+        for i in np.flatnonzero(reuse < 0):
+            f = self.im_files[i]
+            if cache and cache['corrupt'].get(f) == stamps[i].tolist():  # unchanged corrupt pair, skip it again
+                nc, corrupt[f] = nc + 1, cache['corrupt'][f]
+            else:
+                verified.append(i)
+        if cache:
+            if not verified and corrupt == cache['corrupt'] and np.array_equal(reuse[keep], np.arange(len(old))):
+                return cache  # nothing new, changed or removed
+            kept = {self.im_files[i] for i in keep} | corrupt.keys()
+            msgs = {f: m for f, m in cache['msgs'].items() if f in kept}  # warnings of pairs not verified again
+        status = old.status[reuse[keep]].tolist()  # 0 found, 1 empty, 2 missing label per cached image
+        nm, nf, ne = status.count(2), status.count(0) + status.count(1), status.count(1)
+
+        new = np.zeros(len(self.im_files), dtype=bool)  # newly verified valid pairs
         with ThreadPool(NUM_THREADS) as pool:
             results = pool.imap(func=verify_image_label,
-                                iterable=zip(self.im_files, self.label_files, repeat(self.prefix),
+                                iterable=zip([self.im_files[i] for i in verified],
+                                             [self.label_files[i] for i in verified], repeat(self.prefix),
                                              repeat(self.use_keypoints), repeat(len(self.data['names'])), repeat(nkpt),
                                              repeat(ndim)))
-            pbar = TQDM(results, desc=desc, total=total)
-            for im_file, lb, shape, segments, keypoint, nm_f, nf_f, ne_f, nc_f, msg in pbar:
+            pbar = TQDM(results, desc=desc, total=len(verified))
+            for i, (im_file, lb, shape, segments, keypoint, nm_f, nf_f, ne_f, nc_f, msg) in zip(verified, pbar):
                 nm += nm_f
                 nf += nf_f
                 ne += ne_f
                 nc += nc_f
                 if im_file:
-                    x['labels'].append(
+                    new[i] = True
+                    status.append(2 if nm_f else ne_f)
+                    labels.append(
                         dict(
                             im_file=im_file,
                             shape=shape,
@@ -76,19 +112,33 @@ class YOLODataset(BaseDataset):
                             keypoints=keypoint,
                             normalized=True,
                             bbox_format='xywh'))
+                else:
+                    corrupt[self.im_files[i]] = stamps[i].tolist()
                 if msg:
-                    msgs.append(msg)
+                    msgs[self.im_files[i]] = msg
                 pbar.desc = f'{desc} {nf} images, {nm + ne} backgrounds, {nc} corrupt'
             pbar.close()
 
-        if msgs:
-            LOGGER.info('\n'.join(msgs))
+        new_msgs = [msgs[self.im_files[i]] for i in verified if self.im_files[i] in msgs]
+        if new_msgs:
+            LOGGER.info('\n'.join(new_msgs))
         if nf == 0:
             LOGGER.warning(f'{self.prefix}WARNING ⚠️ No labels found in {path}. {HELP_URL}')
-        x['hash'] = get_hash(self.label_files + self.im_files)
+        if len(keep):
+            LOGGER.info(f'{self.prefix}Reused {len(keep)} unchanged cached labels, verified {len(verified)} new or '
+                        'changed image/label pairs')
+        fresh = LabelStore.from_labels(labels, kpt_shape=kpt_shape, stamps=stamps[new].reshape(-1, 4))
+        merged = LabelStore.concatenate([old.take(reuse[keep]), fresh])
+        old = None
+        if cache:
+            cache.clear()  # release the memory-mapped previous cache before its file is replaced
+        order = np.argsort(np.concatenate((keep, np.flatnonzero(new))), kind='stable')  # back to im_files order
+        x['labels'] = merged.take(order)
+        x['labels'].status = np.array(status, dtype=np.int8)[order]
+        x['corrupt'] = corrupt
         x['results'] = nf, nm, ne, nc, len(self.im_files)
-        x['msgs'] = msgs  # warnings
-        save_dataset_cache_file(self.prefix, path, x)
+        x['msgs'] = msgs  # warnings by image file
+        save_label_cache_file(self.prefix, path, x)
         return x
 
     def get_labels(self):
@@ -96,11 +146,13 @@ class YOLODataset(BaseDataset):
         self.label_files = img2label_paths(self.im_files)
         cache_path = Path(self.label_files[0]).parent.with_suffix('.cache')
         try:
-            cache, exists = load_dataset_cache_file(cache_path), True  # attempt to load a *.cache file
-            assert cache['version'] == DATASET_CACHE_VERSION  # matches current version
-            assert cache['hash'] == get_hash(self.label_files + self.im_files)  # identical hash
-        except (FileNotFoundError, AssertionError, AttributeError):
-            cache, exists = self.cache_labels(cache_path), False  # run cache ops
+            cache = load_label_cache_file(cache_path)  # attempt to load a *.cache file
+            assert cache['version'] == LABEL_CACHE_VERSION  # matches current version
+            assert (cache['labels'].keypoints is not None) == self.use_keypoints  # built for the same task
+        except (FileNotFoundError, AssertionError, AttributeError, KeyError, ValueError):
+            cache = None
+        x = self.cache_labels(cache_path, cache)  # verify new or changed image/label pairs only
+        exists, cache = x is cache, x
 
         # Display cache
         nf, nm, ne, nc, n = cache.pop('results')  # found, missing, empty, corrupt, total
@@ -108,25 +160,23 @@ class YOLODataset(BaseDataset):
             d = f'Scanning {cache_path}... {nf} images, {nm + ne} backgrounds, {nc} corrupt'
             TQDM(None, desc=self.prefix + d, total=n, initial=n)  # display results
             if cache['msgs']:
-                LOGGER.info('\n'.join(cache['msgs']))  # display warnings
+                LOGGER.info('\n'.join(cache['msgs'].values()))  # display warnings
 
         # Read cache
-        [cache.pop(k) for k in ('hash', 'version', 'msgs')]  # remove items
+        [cache.pop(k) for k in ('corrupt', 'version', 'msgs')]  # remove items
         labels = cache['labels']
         if not labels:
             LOGGER.warning(f'WARNING ⚠️ No images found in {cache_path}, training may not work correctly. {HELP_URL}')
-        self.im_files = [lb['im_file'] for lb in labels]  # update im_files
+        self.im_files = labels.im_files  # update im_files
 
         # Check if the dataset is all boxes or all segments
-        lengths = ((len(lb['cls']), len(lb['bboxes']), len(lb['segments'])) for lb in labels)
-        len_cls, len_boxes, len_segments = (sum(x) for x in zip(*lengths))
+        len_cls, len_boxes, len_segments = len(labels.cls), len(labels.bboxes), labels.num_segments
         if len_segments and len_boxes != len_segments:
             LOGGER.warning(
                 f'WARNING ⚠️ Box and segment counts should be equal, but got len(segments) = {len_segments}, '
                 f'len(boxes) = {len_boxes}. To resolve this only boxes will be used and all segments will be removed. '
                 'To avoid this please supply either a detect or segment dataset, not a detect-segment mixed dataset.')
-            for lb in labels:
-                lb['segments'] = []
+            labels.drop_segments()
         if len_cls == 0:
             LOGGER.warning(f'WARNING ⚠️ No labels found in {cache_path}, training may not work correctly. {HELP_URL}')
         return labels
@@ -136,9 +186,16 @@ class YOLODataset(BaseDataset):
         if self.augment:
             hyp.mosaic = hyp.mosaic if self.augment and not self.rect else 0.0
             hyp.mixup = hyp.mixup if self.augment and not self.rect else 0.0
-            transforms = v8_transforms(self, self.imgsz, hyp)
+            if getattr(hyp, 'batch_aug', False) and self.use_segments:
+                LOGGER.warning("WARNING ⚠️ 'batch_aug=True' does not support segments, augmenting per sample instead")
+                hyp.batch_aug = False
+            batch_aug = getattr(hyp, 'batch_aug', False)
+            transforms = v8_transforms(self, self.imgsz, hyp, batch_aug=batch_aug)
+            # Warp, HSV and flips of collated batches, applied by the trainer on its device
+            self.batch_aug = BatchAugment(self.imgsz, hyp, self.data.get('flip_idx')) if batch_aug else None
         else:
             transforms = Compose([LetterBox(new_shape=(self.imgsz, self.imgsz), scaleup=False)])
+            self.batch_aug = None
         transforms.append(
             Format(bbox_format='xywh',
                    normalize=True,
@@ -146,7 +203,8 @@ class YOLODataset(BaseDataset):
                    return_keypoint=self.use_keypoints,
                    batch_idx=True,
                    mask_ratio=hyp.mask_ratio,
-                   mask_overlap=hyp.overlap_mask))
+                   mask_overlap=hyp.overlap_mask,
+                   channels_last=self.batch_aug is not None))
         return transforms
 
     def close_mosaic(self, hyp):
@@ -318,6 +376,28 @@ def save_dataset_cache_file(prefix, path, x):
         LOGGER.warning(f'{prefix}WARNING ⚠️ Cache directory {path.parent} is not writeable, cache not saved.')
 
 
+def load_label_cache_file(path):
+    """Load a columnar YOLODataset labels *.cache from path, label arrays are memory-mapped."""
+    with open(path, 'rb') as f:
+        x = json.loads(str(np.load(f)))  # metadata, older pickled caches raise ValueError
+        x['labels'] = LabelStore.load(f, path)
+    return x
+
+
+def save_label_cache_file(prefix, path, x):
+    """Save a columnar YOLODataset labels *.cache dictionary x to path."""
+    x['version'] = LABEL_CACHE_VERSION  # add cache version
+    if is_dir_writeable(path.parent):
+        tmp = path.with_suffix('.cache.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, np.array(json.dumps({k: v for k, v in x.items() if k != 'labels'})))
+            x['labels'].save(f)
+        tmp.replace(path)  # atomic, readers never see a partial cache
+        LOGGER.info(f'{prefix}New cache created: {path}')
+    else:
+        LOGGER.warning(f'{prefix}WARNING ⚠️ Cache directory {path.parent} is not writeable, cache not saved.')
+
+
 # TODO: support semantic segmentation
 class SemanticDataset(BaseDataset):
 
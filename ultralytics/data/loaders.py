@@ -4,8 +4,11 @@ import glob
 import math
 import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from queue import Empty, Full, Queue
 from threading import Thread
 from urllib.parse import urlparse
 
@@ -192,9 +195,14 @@ class LoadScreenshots:
 
 
 class LoadImages:
-    """YOLOv8 image/video dataloader, i.e. `yolo predict source=image.jpg/vid.mp4`."""
+    """
+    YOLOv8 image/video dataloader, i.e. `yolo predict source=image.jpg/vid.mp4`.
+
+    Image files are returned in batches of up to `batch` images so they can be inferred in a single forward pass.
+    Videos are always returned one frame at a time, and a batch never mixes image files and video frames.
+    """
 
-    def __init__(self, path, imgsz=640, vid_stride=1):
+    def __init__(self, path, imgsz=640, vid_stride=1, batch=1):
         """Initialize the Dataloader and raise FileNotFoundError if file not found."""
         parent = None
         if isinstance(path, str) and Path(path).suffix == '.txt':  # *.txt file with img/vid/dir on each line
@@ -221,10 +229,12 @@ class LoadImages:
         self.imgsz = imgsz
         self.files = images + videos
         self.nf = ni + nv  # number of files
+        self.ni = ni  # number of images
         self.video_flag = [False] * ni + [True] * nv
         self.mode = 'image'
         self.vid_stride = vid_stride  # video frame-rate stride
-        self.bs = 1
+        self.bs = max(min(batch, ni), 1) if ni else 1  # batch size for image files
+        self.imread = cv2.imread  # image file reader, LoadPrefetch replaces it with a read-ahead thread pool
         if any(videos):
             self._new_video(videos[0])  # new video
         else:
@@ -264,12 +274,20 @@ class LoadImages:
             s = f'video {self.count + 1}/{self.nf} ({self.frame}/{self.frames}) {path}: '
 
         else:
-            # Read image
-            self.count += 1
-            im0 = cv2.imread(path)  # BGR
-            if im0 is None:
-                raise FileNotFoundError(f'Image Not Found {path}')
-            s = f'image {self.count}/{self.nf} {path}: '
+            # Read images, up to batch size and never past the last image file
+            paths, im0s = [], []
+            for path in self.files[self.count:min(self.count + self.bs, self.ni)]:
+                im0 = self.imread(path)  # BGR
+                if im0 is None:
+                    raise FileNotFoundError(f'Image Not Found {path}')
+                paths.append(path)
+                im0s.append(im0)
+            self.count += len(paths)
+            if len(paths) == 1:
+                s = f'image {self.count}/{self.nf} {path}: '
+            else:
+                s = f'images {self.count - len(paths) + 1}-{self.count}/{self.nf} {Path(path).parent}: '
+            return paths, im0s, self.cap, s
 
         return [path], [im0], self.cap, s
 
@@ -284,6 +302,135 @@ class LoadImages:
         return self.nf  # number of files
 
 
+class LoadPrefetch:
+    """
+    Background prefetching wrapper for file sources, i.e. `yolo predict source=path/ prefetch=4`.
+
+    A producer thread iterates the wrapped LoadImages dataset up to `prefetch` batches ahead of the predictor, so disk
+    reads, JPEG decoding and video frame grabs overlap with preprocessing and inference. Image files are decoded by a
+    thread pool reading ahead in file order. The bounded queue caps memory, and batches are returned in exactly the
+    order the wrapped dataset produces them.
+
+    Attributes:
+        dataset (LoadImages): Wrapped dataset, all attributes not set here are read from it.
+        prefetch (int): Maximum number of batches buffered ahead of the consumer.
+        workers (int): Number of image decoding threads.
+        mode (str): Dataset mode ('image' or 'video') of the batch last returned.
+        count (int): Dataset file count of the batch last returned.
+        frame (int): Video frame number of the batch last returned.
+    """
+
+    def __init__(self, dataset, prefetch=4, workers=4):
+        """Wrap `dataset`, buffering up to `prefetch` batches decoded by `workers` threads."""
+        self.dataset = dataset
+        self.prefetch = max(prefetch, 1)
+        self.workers = max(workers, 1)
+        self.mode, self.count, self.frame = dataset.mode, 0, 0
+        self.running, self.thread, self.queue = False, None, None
+
+    def __getattr__(self, name):
+        """Read any other attribute, i.e. bs, files, video_flag, from the wrapped dataset."""
+        if name == 'dataset':  # not yet set, avoid recursion
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    def __len__(self):
+        """Returns the number of files in the wrapped dataset."""
+        return len(self.dataset)
+
+    def __iter__(self):
+        """Start a new producer thread and return the iterator."""
+        self.close()
+        self.running = True
+        self.queue = Queue(maxsize=self.prefetch)
+        self.thread = Thread(target=self._produce, args=(self.queue, ), daemon=True)
+        self.thread.start()
+        return self
+
+    def __next__(self):
+        """Return the next prefetched batch in order, restoring the dataset state it was produced with."""
+        item = self.queue.get()
+        if item is None:  # end of dataset
+            self.running = False
+            raise StopIteration
+        if isinstance(item, Exception):  # re-raise producer errors, i.e. FileNotFoundError, in the consumer thread
+            self.running = False
+            raise item
+        batch, (self.mode, self.count, self.frame) = item
+        return batch
+
+    def _produce(self, queue):
+        """Producer thread, puts (batch, dataset state) items followed by None (or the raised exception)."""
+        ds = self.dataset
+        pool = ThreadPoolExecutor(self.workers)
+        reads = deque()  # ordered (path, future) image reads submitted ahead
+        depth = self.prefetch * ds.bs  # image files to read ahead
+        images = iter(ds.files[:ds.ni])
+
+        def imread(path):
+            while len(reads) < depth and (p := next(images, None)) is not None:
+                reads.append((p, pool.submit(cv2.imread, p)))
+            if reads and reads[0][0] == path:
+                return reads.popleft()[1].result()
+            return cv2.imread(path)  # out of order read, i.e. dataset count was changed externally
+
+        caps = {}  # VideoCapture -> _CaptureInfo, properties stay valid after the producer releases the capture
+        ds.imread = imread
+        try:
+            for path, im0s, cap, s in ds:
+                if cap is not None:
+                    cap = caps.get(cap) or caps.setdefault(cap, _CaptureInfo(cap))
+                item = (path, im0s, cap, s), (ds.mode, ds.count, getattr(ds, 'frame', 0))
+                if not self._put(queue, item):
+                    return
+            self._put(queue, None)
+        except Exception as e:
+            self._put(queue, e)
+        finally:
+            ds.imread = cv2.imread
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _put(self, queue, item):
+        """Put `item` on the bounded queue, waiting while it is full. Returns False if the wrapper was closed."""
+        while self.running:
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def close(self):
+        """Stop the producer thread and drop any prefetched batches."""
+        self.running = False
+        if self.thread is not None and self.thread.is_alive():
+            while True:  # unblock a producer waiting on a full queue
+                try:
+                    self.queue.get_nowait()
+                except Empty:
+                    break
+            self.thread.join(timeout=5)
+        self.thread = None
+
+    def __del__(self):
+        """Stop the producer thread when the wrapper is garbage collected."""
+        self.close()
+
+
+class _CaptureInfo:
+    """Snapshot of the VideoCapture properties read by the predictor, taken by the LoadPrefetch producer thread."""
+
+    PROPS = cv2.CAP_PROP_FPS, cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT, cv2.CAP_PROP_FRAME_COUNT
+
+    def __init__(self, cap):
+        """Read all properties from `cap`."""
+        self.props = {p: cap.get(p) for p in self.PROPS}
+
+    def get(self, prop):
+        """Return a property like cv2.VideoCapture.get(), 0 if it was not captured."""
+        return self.props.get(prop, 0)
+
+
 class LoadPilAndNumpy:
 
     def __init__(self, im0, imgsz=640):
@@ -43,6 +43,16 @@ def get_hash(paths):
     return h.hexdigest()  # return hash
 
 
+def get_file_stamps(paths):
+    """Returns an int64 array of (size, mtime_ns) per path, (-1, -1) for missing files."""
+    stamps = np.full((len(paths), 2), -1, dtype=np.int64)
+    for i, p in enumerate(paths):
+        with contextlib.suppress(OSError):
+            st = os.stat(p)
+            stamps[i] = st.st_size, st.st_mtime_ns
+    return stamps
+
+
 def exif_size(img: Image.Image):
     """Returns exif-corrected PIL size."""
     s = img.size  # (width, height)
@@ -153,6 +163,198 @@ def verify_image_label(args):
         return [None, None, None, None, None, nm, nf, ne, nc, msg]
 
 
+def _ragged_take(offsets, rows):
+    """Element indices and new offsets selecting the ragged rows 'rows' of an array indexed by 'offsets'."""
+    starts, lengths = offsets[rows], offsets[rows + 1] - offsets[rows]
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    return np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1]), new_offsets
+
+
+class LabelStore:
+    """
+    Columnar YOLO labels, one row per image.
+
+    Instances of all images are concatenated into a few large arrays indexed by per-image offsets, so a label cache
+    is memory-mapped instead of unpickled as one dict of small arrays per image. Indexing an image returns a label dict
+    in the layout built by YOLODataset.cache_labels() holding copies of only that image's rows, which augmentations may
+    modify in place without a deepcopy().
+
+    Attributes:
+        im_files (list): Image file paths.
+        shapes (np.ndarray): Image (height, width) per image, shape (n, 2).
+        offsets (np.ndarray): Start of each image's instances, shape (n + 1, ).
+        cls (np.ndarray): Class of every instance, shape (N, 1).
+        bboxes (np.ndarray): Normalized xywh box of every instance, shape (N, 4).
+        seg_offsets (np.ndarray): Start of each instance's polygon in seg_points, shape (N + 1, ).
+        seg_points (np.ndarray): Concatenated normalized polygon points, shape (P, 2).
+        keypoints (np.ndarray | None): Keypoints of every instance, shape (N, nkpt, ndim), None without keypoints.
+        stamps (np.ndarray | None): Image and label (size, mtime_ns) per image, shape (n, 4), used to update a cache
+            incrementally.
+        status (np.ndarray | None): Label file status per image, 0 found, 1 empty or 2 missing, shape (n, ).
+    """
+
+    columns = 'shapes', 'offsets', 'cls', 'bboxes', 'seg_offsets', 'seg_points', 'keypoints', 'stamps', 'status'
+
+    def __init__(self,
+                 im_files,
+                 shapes,
+                 offsets,
+                 cls,
+                 bboxes,
+                 seg_offsets,
+                 seg_points,
+                 keypoints=None,
+                 stamps=None,
+                 status=None):
+        """Initialize from column arrays, see LabelStore.from_labels() to build one from label dicts."""
+        self.im_files = im_files
+        self.shapes = shapes
+        self.offsets = offsets
+        self.cls = cls
+        self.bboxes = bboxes
+        self.seg_offsets = seg_offsets
+        self.seg_points = seg_points
+        self.keypoints = keypoints
+        self.stamps = stamps
+        self.status = status
+
+    @classmethod
+    def from_labels(cls, labels, kpt_shape=None, stamps=None, status=None):
+        """Build a LabelStore from a list of label dicts as returned by verify_image_label()."""
+        n = [len(lb['cls']) for lb in labels]
+        offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(n, out=offsets[1:])
+        segments = [s for lb in labels for s in (lb['segments'] or [np.zeros((0, 2))] * len(lb['cls']))]
+        seg_offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in segments], out=seg_offsets[1:])
+        keypoints = None
+        if kpt_shape is not None:
+            keypoints = np.concatenate([lb['keypoints'] for lb in labels] or [np.zeros((0, *kpt_shape))])
+        return cls(im_files=[lb['im_file'] for lb in labels],
+                   shapes=np.array([lb['shape'] for lb in labels], dtype=np.int32).reshape(-1, 2),
+                   offsets=offsets,
+                   cls=np.concatenate([lb['cls'] for lb in labels] or [np.zeros((0, 1))]).astype(np.float32),
+                   bboxes=np.concatenate([lb['bboxes'] for lb in labels] or [np.zeros((0, 4))]).astype(np.float32),
+                   seg_offsets=seg_offsets,
+                   seg_points=np.concatenate(segments or [np.zeros((0, 2))]).astype(np.float32),
+                   keypoints=keypoints if keypoints is None else keypoints.astype(np.float32),
+                   stamps=stamps,
+                   status=status)
+
+    def __len__(self):
+        """Number of images."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """Label dict of image 'index', or a new LabelStore of the images selected by an index array."""
+        if not isinstance(index, (int, np.integer)):
+            return self.take(np.asarray(index, dtype=np.int64))
+        a, b = self.offsets[index], self.offsets[index + 1]
+        seg = self.seg_offsets[a:b + 1]
+        segments = [self.seg_points[s:e] for s, e in zip(seg[:-1], seg[1:])] if b > a and seg[-1] > seg[0] else []
+        return dict(im_file=self.im_files[index],
+                    shape=tuple(self.shapes[index]),
+                    cls=np.array(self.cls[a:b]),
+                    bboxes=np.array(self.bboxes[a:b]),
+                    segments=segments,
+                    keypoints=None if self.keypoints is None else np.array(self.keypoints[a:b]),
+                    normalized=True,
+                    bbox_format='xywh')
+
+    def __iter__(self):
+        """Iterate over label dicts."""
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def num_segments(self):
+        """Number of instances with a polygon."""
+        return int((np.diff(self.seg_offsets) > 0).sum())
+
+    def take(self, rows):
+        """Returns a new LabelStore with the images 'rows', in that order."""
+        i, offsets = _ragged_take(self.offsets, rows)
+        j, seg_offsets = _ragged_take(self.seg_offsets, i)
+        return LabelStore(im_files=[self.im_files[r] for r in rows],
+                          shapes=self.shapes[rows],
+                          offsets=offsets,
+                          cls=self.cls[i],
+                          bboxes=self.bboxes[i],
+                          seg_offsets=seg_offsets,
+                          seg_points=self.seg_points[j],
+                          keypoints=None if self.keypoints is None else self.keypoints[i],
+                          stamps=None if self.stamps is None else self.stamps[rows],
+                          status=None if self.status is None else self.status[rows])
+
+    @staticmethod
+    def concatenate(stores):
+        """Concatenate LabelStores image-wise into a new LabelStore."""
+        offsets, seg_offsets = [np.zeros(1, dtype=np.int64)], [np.zeros(1, dtype=np.int64)]
+        n, p = 0, 0  # instances and polygon points before each store
+        for s in stores:
+            offsets.append(s.offsets[1:] + n)
+            seg_offsets.append(s.seg_offsets[1:] + p)
+            n, p = n + s.offsets[-1], p + s.seg_offsets[-1]
+
+        def cat(k):
+            """Concatenate column k, None if any store lacks it."""
+            x = [getattr(s, k) for s in stores]
+            return None if any(a is None for a in x) else np.concatenate(x)
+
+        return LabelStore(im_files=[f for s in stores for f in s.im_files],
+                          shapes=cat('shapes'),
+                          offsets=np.concatenate(offsets),
+                          cls=cat('cls'),
+                          bboxes=cat('bboxes'),
+                          seg_offsets=np.concatenate(seg_offsets),
+                          seg_points=cat('seg_points'),
+                          keypoints=cat('keypoints'),
+                          stamps=cat('stamps'),
+                          status=cat('status'))
+
+    def select(self, mask):
+        """Returns a new LabelStore keeping only the instances where boolean 'mask' of shape (N, ) is True."""
+        n = len(self)
+        image = np.repeat(np.arange(n), np.diff(self.offsets))  # image index of every instance
+        offsets = np.zeros_like(self.offsets)
+        np.cumsum(np.bincount(image[mask], minlength=n), out=offsets[1:])
+        i = np.flatnonzero(mask)
+        j, seg_offsets = _ragged_take(self.seg_offsets, i)
+        return LabelStore(self.im_files, self.shapes, offsets, self.cls[i], self.bboxes[i], seg_offsets,
+                          self.seg_points[j], None if self.keypoints is None else self.keypoints[i], self.stamps,
+                          self.status)
+
+    def drop_segments(self):
+        """Remove all polygons, keeping boxes."""
+        self.seg_offsets = np.zeros_like(self.seg_offsets)
+        self.seg_points = self.seg_points[:0]
+
+    def save(self, f):
+        """Write column names, image paths and columns to an open binary file as consecutive .npy arrays."""
+        columns = [k for k in self.columns if getattr(self, k) is not None]
+        np.save(f, np.array(columns))
+        np.save(f, np.frombuffer('\0'.join(self.im_files).encode(), dtype=np.uint8))
+        for k in columns:
+            np.save(f, np.ascontiguousarray(getattr(self, k)))
+
+    @classmethod
+    def load(cls, f, path):
+        """Memory-map the arrays written by LabelStore.save() to 'path', reading from open file 'f' at their start."""
+        columns = list(np.load(f))
+        arrays = []
+        for _ in range(len(columns) + 1):
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+                np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            offset, size = f.tell(), int(np.prod(shape)) * dtype.itemsize
+            arrays.append(np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                                    order='F' if fortran_order else 'C') if size else np.zeros(shape, dtype=dtype))
+            f.seek(offset + size)
+        names, arrays = arrays[0], dict(zip(columns, arrays[1:]))
+        return cls(im_files=bytes(names).decode().split('\0') if len(arrays['shapes']) else [], **arrays)
+
+
 def polygon2mask(imgsz, polygons, color=1, downsample_ratio=1):
     """
     Args:
@@ -617,3 +819,39 @@ def autosplit(path=DATASETS_DIR / 'coco8/images', weights=(0.9, 0.1, 0.0), annot
         if not annotated_only or Path(img2label_paths([str(img)])[0]).exists():  # check label
             with open(path.parent / txt[i], 'a') as f:
                 f.write(f'./{img.relative_to(path.parent).as_posix()}' + '\n')  # add image to txt file
+
+
+def stratified_subset(classes, fraction, seed=0):
+    """
+    Select a fixed, class-stratified fraction of a dataset's images, i.e. to validate on a subset of a large val split.
+
+    Classes are filled rarest first: each keeps `fraction` of the images it appears in, at least one, counting images
+    already selected for other classes. Images without labels keep `fraction` as well.
+
+    Args:
+        classes (list): Class indices of each image, one array-like per image.
+        fraction (float): Fraction of the images of every class to select.
+        seed (int, optional): Random seed, the same seed selects the same subset. Defaults to 0.
+
+    Returns:
+        (np.ndarray): Sorted indices of the selected images.
+
+    Example:
+        ```python
+        from ultralytics.data.utils import stratified_subset
+
+        index = stratified_subset([[0], [0, 1], [], [1], [2]], fraction=0.5)
+        ```
+    """
+    rng = np.random.default_rng(seed)
+    selected = np.zeros(len(classes), dtype=bool)
+    images = {}  # images of each class, -1 for images without labels
+    for i, c in enumerate(classes):
+        for k in np.unique(np.asarray(c, dtype=np.int64)).tolist() or [-1]:
+            images.setdefault(k, []).append(i)
+    for k in sorted(images, key=lambda k: (k == -1, len(images[k]))):  # rarest class first, backgrounds last
+        index = np.array(images[k])
+        n = max(round(len(index) * fraction), 1) - selected[index].sum()
+        if n > 0:
+            selected[rng.choice(index[~selected[index]], n, replace=False)] = True
+    return np.flatnonzero(selected)
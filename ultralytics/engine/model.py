@@ -54,13 +54,15 @@ class Model(nn.Module):
         list(ultralytics.engine.results.Results): The prediction results.
     """
 
-    def __init__(self, model: Union[str, Path] = 'yolov8n.pt', task=None) -> None:
+    def __init__(self, model: Union[str, Path] = 'yolov8n.pt', task=None, cache=False) -> None:
         """
         Initializes the YOLO model.
 
         Args:
             model (Union[str, Path], optional): Path or name of the model to load or create. Defaults to 'yolov8n.pt'.
             task (Any, optional): Task type for the YOLO model. Defaults to None.
+            cache (bool | str, optional): Load *.pt weights through the pre-fused inference cache, 'half' for FP16.
+                Defaults to False.
         """
         super().__init__()
         self.callbacks = callbacks.get_default_callbacks()
@@ -89,7 +91,7 @@ class Model(nn.Module):
         if suffix in ('.yaml', '.yml'):
             self._new(model, task)
         else:
-            self._load(model, task)
+            self._load(model, task, cache)
 
     def __call__(self, source=None, stream=False, **kwargs):
         """Calls the 'predict' function with given arguments to perform object detection."""
@@ -124,17 +126,18 @@ class Model(nn.Module):
         self.model.args = {**DEFAULT_CFG_DICT, **self.overrides}  # combine default and model args (prefer model args)
         self.model.task = self.task
 
-    def _load(self, weights: str, task=None):
+    def _load(self, weights: str, task=None, cache=False):
         """
         Initializes a new model and infers the task type from the model head.
 
         Args:
             weights (str): model checkpoint to be loaded
             task (str | None): model task
+            cache (bool | str): load through the pre-fused inference cache, 'half' for FP16
         """
         suffix = Path(weights).suffix
         if suffix == '.pt':
-            self.model, self.ckpt = attempt_load_one_weight(weights)
+            self.model, self.ckpt = attempt_load_one_weight(weights, cache=cache)
             self.task = self.model.args['task']
             self.overrides = self.model.args = self._reset_ckpt_args(self.model.args)
             self.ckpt_path = self.model.pt_path
@@ -220,7 +223,7 @@ class Model(nn.Module):
         is_cli = (sys.argv[0].endswith('yolo') or sys.argv[0].endswith('ultralytics')) and any(
             x in sys.argv for x in ('predict', 'track', 'mode=predict', 'mode=track'))
 
-        custom = {'conf': 0.25, 'save': is_cli}  # method defaults
+        custom = {'conf': 0.25, 'batch': 1, 'save': is_cli}  # method defaults
         args = {**self.overrides, **custom, **kwargs, 'mode': 'predict'}  # highest priority args on the right
         prompts = args.pop('prompts', None)  # for SAM-type models
 
@@ -253,6 +256,7 @@ class Model(nn.Module):
             register_tracker(self, persist)
         # ByteTrack-based method needs low confidence predictions as input
         kwargs['conf'] = kwargs.get('conf') or 0.1
+        kwargs['batch'] = 1  # one tracker per source, frames must arrive one at a time
         kwargs['mode'] = 'track'
         return self.predict(source=source, stream=stream, **kwargs)
 
@@ -322,6 +326,8 @@ class Model(nn.Module):
                 LOGGER.warning('WARNING ⚠️ using HUB training arguments, ignoring local training arguments.')
             kwargs = self.session.train_args
         check_pip_update_available()
+        if self.ckpt and 'cache' in self.ckpt:  # fused inference weights, train from the original checkpoint
+            self._load(self.ckpt_path, self.task)
 
         overrides = yaml_load(check_yaml(kwargs['cfg'])) if kwargs.get('cfg') else self.overrides
         custom = {'data': TASK2DATA[self.task]}  # method defaults
@@ -27,7 +27,9 @@ Usage - formats:
                               yolov8n_edgetpu.tflite     # TensorFlow Edge TPU
                               yolov8n_paddle_model       # PaddlePaddle
 """
+import math
 import platform
+from copy import copy
 from pathlib import Path
 
 import cv2
@@ -37,10 +39,12 @@ import torch
 from ultralytics.cfg import get_cfg, get_save_dir
 from ultralytics.data import load_inference_source
 from ultralytics.data.augment import LetterBox, classify_transforms
+from ultralytics.data.loaders import LoadPrefetch
+from ultralytics.engine.results import ResultsSink
 from ultralytics.nn.autobackend import AutoBackend
 from ultralytics.utils import DEFAULT_CFG, LOGGER, MACOS, WINDOWS, callbacks, colorstr, ops
 from ultralytics.utils.checks import check_imgsz, check_imshow
-from ultralytics.utils.files import increment_path
+from ultralytics.utils.files import AsyncWriter, increment_path
 from ultralytics.utils.torch_utils import select_device, smart_inference_mode
 
 STREAM_WARNING = """
@@ -73,6 +77,10 @@ class BasePredictor:
         vid_path (str): Path to video file.
         vid_writer (cv2.VideoWriter): Video writer for saving video output.
         data_path (str): Path to data.
+        results_sink (ResultsSink): Columnar results store written to 'results.npz' if `save_npz=True`.
+        writer (AsyncWriter): Background writer for saved images, videos, labels and crops if `save_queue > 0`.
+        motion_ref (tuple): Paths and grayscale thumbnails of the last inferred video/stream batch if `motion_gate > 0`.
+        motion_skipped (int): Number of consecutive batches that reused the results of `motion_ref`.
     """
 
     def __init__(self, cfg=DEFAULT_CFG, overrides=None, _callbacks=None):
@@ -106,6 +114,9 @@ class BasePredictor:
         self.transforms = None
         self.callbacks = _callbacks or callbacks.get_default_callbacks()
         self.txt_path = None
+        self.results_sink = None
+        self.writer = None
+        self.motion_ref, self.motion_skipped = None, 0
         callbacks.add_integration_callbacks(self)
 
     def preprocess(self, im):
@@ -143,9 +154,63 @@ class BasePredictor:
             (list): A list of transformed images.
         """
         same_shapes = all(x.shape == im[0].shape for x in im)
-        letterbox = LetterBox(self.imgsz, auto=same_shapes and self.model.pt, stride=self.model.stride)
+        if same_shapes or not self.model.pt:
+            letterbox = LetterBox(self.imgsz, auto=same_shapes and self.model.pt, stride=self.model.stride)
+        else:  # mixed shapes, pad all images to the smallest common stride-multiple shape instead of full imgsz
+            letterbox = LetterBox(self.common_shape(im), auto=False, stride=self.model.stride)
         return [letterbox(image=x) for x in im]
 
+    def common_shape(self, im):
+        """
+        Return the smallest (h, w) shape, a multiple of model stride and no larger than imgsz, that holds every image in
+        `im` after letterbox scaling, so a batch of mixed-shape images can be stacked into one tensor.
+
+        Args:
+            im (List(np.ndarray)): [(h, w, 3) x N] images.
+
+        Returns:
+            (tuple): Common (h, w) shape.
+        """
+        shapes = np.array([x.shape[:2] for x in im], dtype=np.float64)  # (N, 2) h, w
+        r = np.min(np.array(self.imgsz, dtype=np.float64) / shapes, axis=1, keepdims=True)  # letterbox scale ratios
+        hw = np.round(shapes * r).max(0)  # largest resized h, w
+        stride = int(self.model.stride)
+        return tuple(int(min(math.ceil(x / stride) * stride, s)) for x, s in zip(hw, self.imgsz))
+
+    def motion_gate(self, paths, im0s):
+        """
+        Return True if inference can be skipped for a video or stream batch whose frames did not change.
+
+        Frames are compared on 32x32 grayscale thumbnails against the last inferred batch of the same sources. The batch
+        is skipped when every frame's mean absolute difference is below `motion_gate` (0-255 scale), for at most
+        `motion_skip` consecutive batches.
+
+        Args:
+            paths (List[str]): Source paths of the batch.
+            im0s (List[np.ndarray]): Original BGR frames of the batch.
+
+        Returns:
+            (bool): Whether the previous results can be reused for this batch.
+        """
+        if not self.args.motion_gate or self.dataset.mode == 'image' or self.source_type.tensor:
+            return False
+        thumbs = [cv2.resize(cv2.cvtColor(x, cv2.COLOR_BGR2GRAY), (32, 32), interpolation=cv2.INTER_AREA) for x in im0s]
+        ref = self.motion_ref
+        skip = (ref is not None and ref[0] == list(paths) and self.motion_skipped < self.args.motion_skip and
+                all(cv2.absdiff(a, b).mean() < self.args.motion_gate for a, b in zip(thumbs, ref[1])))
+        if skip:
+            self.motion_skipped += 1
+        else:
+            self.motion_ref, self.motion_skipped = (list(paths), thumbs), 0
+        return skip
+
+    def reuse_results(self, paths, im0s):
+        """Return shallow copies of the previous batch results attached to the current frames."""
+        results = [copy(r) for r in self.results]
+        for r, p, im0 in zip(results, paths, im0s):
+            r.orig_img, r.path = im0, p
+        return results
+
     def write_results(self, idx, results, batch):
         """Write inference results to a file or directory."""
         p, im, _ = batch
@@ -156,6 +221,8 @@ class BasePredictor:
             log_string += f'{idx}: '
             frame = self.dataset.count
         else:
+            if self.dataset.mode == 'image' and self.dataset.bs > 1:  # batched image files
+                log_string += f'{idx}: '
             frame = getattr(self.dataset, 'frame', 0)
         self.data_path = p
         self.txt_path = str(self.save_dir / 'labels' / p.stem) + ('' if self.dataset.mode == 'image' else f'_{frame}')
@@ -174,10 +241,13 @@ class BasePredictor:
             self.plotted_img = result.plot(**plot_args)
         # Write
         if self.args.save_txt:
-            result.save_txt(f'{self.txt_path}.txt', save_conf=self.args.save_conf)
+            self.write(result.save_txt, f'{self.txt_path}.txt', save_conf=self.args.save_conf)
         if self.args.save_crop:
-            result.save_crop(save_dir=self.save_dir / 'crops',
-                             file_name=self.data_path.stem + ('' if self.dataset.mode == 'image' else f'_{frame}'))
+            self.write(result.save_crop,
+                       save_dir=self.save_dir / 'crops',
+                       file_name=self.data_path.stem + ('' if self.dataset.mode == 'image' else f'_{frame}'))
+        if self.results_sink is not None:
+            self.results_sink.add(result)
 
         return log_string
 
@@ -204,10 +274,15 @@ class BasePredictor:
         self.imgsz = check_imgsz(self.args.imgsz, stride=self.model.stride, min_dim=2)  # check image size
         self.transforms = getattr(self.model.model, 'transforms', classify_transforms(
             self.imgsz[0])) if self.args.task == 'classify' else None
+        if isinstance(self.dataset, LoadPrefetch):  # stop the producer thread of a previous, partially consumed source
+            self.dataset.close()
         self.dataset = load_inference_source(source=source,
                                              imgsz=self.imgsz,
                                              vid_stride=self.args.vid_stride,
-                                             buffer=self.args.stream_buffer)
+                                             buffer=self.args.stream_buffer,
+                                             batch=self.args.batch,
+                                             prefetch=self.args.prefetch,
+                                             workers=self.args.workers)
         self.source_type = self.dataset.source_type
         if not getattr(self, 'stream', True) and (self.dataset.mode == 'stream' or  # streams
                                                   len(self.dataset) > 1000 or  # images
@@ -237,7 +312,14 @@ class BasePredictor:
             self.model.warmup(imgsz=(1 if self.model.pt or self.model.triton else self.dataset.bs, 3, *self.imgsz))
             self.done_warmup = True
 
-        self.seen, self.windows, self.batch, profilers = 0, [], None, (ops.Profile(), ops.Profile(), ops.Profile())
+        self.seen, self.windows, self.batch = 0, [], None
+        self.motion_ref, self.motion_skipped, reused = None, 0, 0
+        profilers = (ops.Profile(), ops.Profile(), ops.Profile(), ops.Profile())
+        self.results_sink = ResultsSink(self.save_dir / 'results.npz') if self.args.save_npz else None
+        if self.writer is not None:  # previous, partially consumed run
+            self.writer.close()
+        save = self.args.save or self.args.save_txt or self.args.save_crop
+        self.writer = AsyncWriter(self.args.save_queue) if save and self.args.save_queue > 0 else None
         self.run_callbacks('on_predict_start')
         for batch in self.dataset:
             self.run_callbacks('on_predict_batch_start')
@@ -246,36 +328,44 @@ class BasePredictor:
 
             # Preprocess
             with profilers[0]:
-                im = self.preprocess(im0s)
+                skip = self.motion_gate(path, im0s)  # unchanged video/stream frames reuse the previous results
+                if not skip:
+                    im = self.preprocess(im0s)
 
             # Inference
             with profilers[1]:
-                preds = self.inference(im, *args, **kwargs)
+                if not skip:
+                    preds = self.inference(im, *args, **kwargs)
 
             # Postprocess
             with profilers[2]:
-                self.results = self.postprocess(preds, im, im0s)
+                self.results = self.reuse_results(path, im0s) if skip else self.postprocess(preds, im, im0s)
+            reused += len(im0s) if skip else 0
             self.run_callbacks('on_predict_postprocess_end')
 
             # Visualize, save, write results
             n = len(im0s)
+            with profilers[3]:
+                for i in range(n):
+                    self.seen += 1
+                    p, im0 = path[i], None if self.source_type.tensor else im0s[i].copy()
+                    p = Path(p)
+
+                    if self.args.verbose or save or self.args.show or self.args.save_npz:
+                        s += self.write_results(i, self.results, (p, im, im0))
+                    if self.args.save or self.args.save_txt:
+                        self.results[i].save_dir = self.save_dir.__str__()
+                    if self.args.show and self.plotted_img is not None:
+                        self.show(p)
+                    if self.args.save and self.plotted_img is not None:
+                        self.save_preds(vid_cap, i, str(self.save_dir / p.name))
             for i in range(n):
-                self.seen += 1
                 self.results[i].speed = {
                     'preprocess': profilers[0].dt * 1E3 / n,
                     'inference': profilers[1].dt * 1E3 / n,
-                    'postprocess': profilers[2].dt * 1E3 / n}
-                p, im0 = path[i], None if self.source_type.tensor else im0s[i].copy()
-                p = Path(p)
-
-                if self.args.verbose or self.args.save or self.args.save_txt or self.args.show:
-                    s += self.write_results(i, self.results, (p, im, im0))
-                if self.args.save or self.args.save_txt:
-                    self.results[i].save_dir = self.save_dir.__str__()
-                if self.args.show and self.plotted_img is not None:
-                    self.show(p)
-                if self.args.save and self.plotted_img is not None:
-                    self.save_preds(vid_cap, i, str(self.save_dir / p.name))
+                    'postprocess': profilers[2].dt * 1E3 / n,
+                    'write': profilers[3].dt * 1E3 / n,  # plotting and saving time on the predictor thread
+                    'write_backlog': len(self.writer) if self.writer else 0}  # pending background writes
 
             self.run_callbacks('on_predict_batch_end')
             yield from self.results
@@ -286,16 +376,26 @@ class BasePredictor:
 
         # Release assets
         if isinstance(self.vid_writer[-1], cv2.VideoWriter):
-            self.vid_writer[-1].release()  # release final video writer
+            self.write(self.vid_writer[-1].release)  # release final video writer
+        peak = 0
+        if self.writer is not None:  # flush pending writes before reporting saved results
+            self.writer.close()
+            peak, self.writer = self.writer.peak, None
 
         # Print results
         if self.args.verbose and self.seen:
             t = tuple(x.t / self.seen * 1E3 for x in profilers)  # speeds per image
-            LOGGER.info(f'Speed: %.1fms preprocess, %.1fms inference, %.1fms postprocess per image at shape '
-                        f'{(1, 3, *im.shape[2:])}' % t)
-        if self.args.save or self.args.save_txt or self.args.save_crop:
+            LOGGER.info(f'Speed: %.1fms preprocess, %.1fms inference, %.1fms postprocess, %.1fms write per image at '
+                        f'shape {(1, 3, *im.shape[2:])}' % t + (f', peak writer backlog {peak}' if peak else ''))
+            if self.args.motion_gate:
+                LOGGER.info(f'Motion gate: {reused}/{self.seen} frames reused previous results')
+        if self.results_sink is not None:
+            self.results_sink.save()
+        if self.args.save or self.args.save_txt or self.args.save_crop or self.args.save_npz:
             nl = len(list(self.save_dir.glob('labels/*.txt')))  # number of labels
             s = f"\n{nl} label{'s' * (nl > 1)} saved to {self.save_dir / 'labels'}" if self.args.save_txt else ''
+            if self.results_sink is not None:
+                s += f'\n{len(self.results_sink)} image results saved to {self.results_sink.file}'
             LOGGER.info(f"Results saved to {colorstr('bold', self.save_dir)}{s}")
 
         self.run_callbacks('on_predict_end')
@@ -329,12 +429,12 @@ class BasePredictor:
         im0 = self.plotted_img
         # Save imgs
         if self.dataset.mode == 'image':
-            cv2.imwrite(save_path, im0)
+            self.write(cv2.imwrite, save_path, im0)
         else:  # 'video' or 'stream'
             if self.vid_path[idx] != save_path:  # new video
                 self.vid_path[idx] = save_path
                 if isinstance(self.vid_writer[idx], cv2.VideoWriter):
-                    self.vid_writer[idx].release()  # release previous video writer
+                    self.write(self.vid_writer[idx].release)  # release previous video writer
                 if vid_cap:  # video
                     fps = int(vid_cap.get(cv2.CAP_PROP_FPS))  # integer required, floats produce error in MP4 codec
                     w = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -344,7 +444,14 @@ class BasePredictor:
                 suffix, fourcc = ('.mp4', 'avc1') if MACOS else ('.avi', 'WMV2') if WINDOWS else ('.avi', 'MJPG')
                 save_path = str(Path(save_path).with_suffix(suffix))
                 self.vid_writer[idx] = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*fourcc), fps, (w, h))
-            self.vid_writer[idx].write(im0)
+            self.write(self.vid_writer[idx].write, im0)
+
+    def write(self, fn, *args, **kwargs):
+        """Run file write `fn(*args, **kwargs)` on the background writer if `save_queue > 0`, otherwise inline."""
+        if self.writer is not None:
+            self.writer.submit(fn, *args, **kwargs)
+        else:
+            fn(*args, **kwargs)
 
     def run_callbacks(self, event: str):
         """Runs all registered callbacks for a specific event."""
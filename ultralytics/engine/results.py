@@ -5,7 +5,6 @@ Ultralytics Results, Boxes and Masks classes for handling inference results
 Usage: See https://docs.ultralytics.com/modes/predict/
 """
 
-from copy import deepcopy
 from functools import lru_cache
 from pathlib import Path
 
@@ -222,13 +221,14 @@ class Results(SimpleClass):
         pred_boxes, show_boxes = self.boxes, boxes
         pred_masks, show_masks = self.masks, masks
         pred_probs, show_probs = self.probs, probs
+        classify = pred_probs is not None and show_probs
         annotator = Annotator(
-            deepcopy(self.orig_img if img is None else img),
+            (self.orig_img if img is None else img).copy(),
             line_width,
             font_size,
             font,
-            pil or (pred_probs is not None and show_probs),  # Classify tasks default to pil=True
-            example=names)
+            pil or classify,  # Classify tasks default to pil=True
+            example=names if classify else 'abc')  # box labels render non-ASCII names without PIL
 
         # Plot Segment results
         if pred_masks and show_masks:
@@ -241,11 +241,16 @@ class Results(SimpleClass):
 
         # Plot Detect results
         if pred_boxes and show_boxes:
-            for d in reversed(pred_boxes):
-                c, conf, id = int(d.cls), float(d.conf) if conf else None, None if d.id is None else int(d.id.item())
-                name = ('' if id is None else f'id:{id} ') + names[c]
-                label = (f'{name} {conf:.2f}' if conf else name) if labels else None
-                annotator.box_label(d.xyxy.squeeze(), label, color=colors(c, True))
+            cls = [int(c) for c in pred_boxes.cls.tolist()][::-1]  # reversed, highest confidence drawn last
+            ids = [None] * len(cls) if pred_boxes.id is None else [int(i) for i in pred_boxes.id.tolist()][::-1]
+            texts = None
+            if labels:
+                texts = [('' if i is None else f'id:{i} ') + names[c] for c, i in zip(cls, ids)]
+                if conf:
+                    texts = [f'{t} {p:.2f}' for t, p in zip(texts, pred_boxes.conf.tolist()[::-1])]
+            xyxy = pred_boxes.xyxy
+            xyxy = (xyxy.cpu().numpy() if isinstance(xyxy, torch.Tensor) else xyxy)[::-1]
+            annotator.box_labels(xyxy, texts, colors=[colors(c, True) for c in cls])
 
         # Plot Classify results
         if pred_probs is not None and show_probs:
@@ -591,3 +596,75 @@ class Probs(BaseTensor):
     def top5conf(self):
         """Return the confidences of top 5."""
         return self.data[self.top5]
+
+
+class ResultsSink:
+    """
+    Columnar store that accumulates detection results of a prediction run and saves them to a single `.npz` file.
+
+    Per-image arrays are buffered in memory and concatenated once on `save()`, so a run over tens of thousands of
+    images produces one file instead of one formatted txt per image.
+
+    Attributes:
+        file (Path): Output `.npz` file path.
+        paths (list): Image paths in the order they were added.
+        shapes (list): Original image shapes (h, w) in the order they were added.
+
+    Saved arrays:
+        paths (N,): image paths, shapes (N, 2): original (h, w),
+        im (M,): image index of each detection, cls (M,), conf (M,), xyxy (M, 4) pixels, xywhn (M, 4) normalized.
+
+    Example:
+        ```python
+        import numpy as np
+        from ultralytics.engine.results import ResultsSink
+
+        data = ResultsSink.load('runs/detect/predict/results.npz')
+        counts = np.bincount(data['cls'].astype(int))  # detections per class
+        ```
+    """
+
+    def __init__(self, file):
+        """Initialize an empty sink that will be written to `file`."""
+        self.file = Path(file)
+        self.paths, self.shapes = [], []
+        self._boxes, self._im = [], []  # per-image (n, 6) xyxy, conf, cls arrays and image indices
+
+    def __len__(self):
+        """Return the number of images added."""
+        return len(self.paths)
+
+    def add(self, result):
+        """Append the boxes of a single Results object."""
+        i = len(self.paths)
+        self.paths.append(str(result.path))
+        self.shapes.append(result.orig_shape)
+        boxes = result.boxes
+        if boxes is not None and len(boxes):
+            data = boxes.data if isinstance(boxes.data, np.ndarray) else boxes.data.cpu().numpy()
+            self._boxes.append(np.concatenate((data[:, :4], data[:, -2:]), 1).astype(np.float32))  # drop track id
+            self._im.append(np.full(len(data), i, dtype=np.int32))
+
+    def save(self):
+        """Concatenate all buffered arrays and write them to `self.file`."""
+        boxes = np.concatenate(self._boxes, 0) if self._boxes else np.zeros((0, 6), dtype=np.float32)
+        im = np.concatenate(self._im, 0) if self._im else np.zeros(0, dtype=np.int32)
+        shapes = np.array(self.shapes, dtype=np.int32).reshape(-1, 2)
+        hw = shapes[im].astype(np.float32)  # (M, 2) original h, w of each detection
+        xywhn = ops.xyxy2xywh(boxes[:, :4]) / np.concatenate((hw[:, ::-1], hw[:, ::-1]), 1)
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(self.file,
+                 paths=np.array(self.paths, dtype=str),
+                 shapes=shapes,
+                 im=im,
+                 cls=boxes[:, 5].astype(np.int32),
+                 conf=boxes[:, 4],
+                 xyxy=boxes[:, :4],
+                 xywhn=xywhn.astype(np.float32))
+        return self.file
+
+    @staticmethod
+    def load(file):
+        """Load a saved `.npz` results file into a dict of NumPy arrays."""
+        with np.load(file) as data:
+            return {k: data[k] for k in data.files}
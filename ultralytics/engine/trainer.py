@@ -6,14 +6,16 @@ Usage:
     $ yolo mode=train model=yolov8n.pt data=coco128.yaml imgsz=640 epochs=100 batch=16
 """
 
+import io
 import math
 import os
 import subprocess
 import time
 import warnings
-from copy import deepcopy
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
+from types import SimpleNamespace
 
 import numpy as np
 import torch
@@ -23,6 +25,7 @@ from torch.cuda import amp
 from torch.nn.parallel import DistributedDataParallel as DDP
 
 from ultralytics.cfg import get_cfg, get_save_dir
+from ultralytics.data.build import build_subset_dataloader
 from ultralytics.data.utils import check_cls_dataset, check_det_dataset
 from ultralytics.nn.tasks import attempt_load_one_weight, attempt_load_weights
 from ultralytics.utils import (DEFAULT_CFG, LOGGER, RANK, TQDM, __version__, callbacks, clean_url, colorstr, emojis,
@@ -30,9 +33,9 @@ from ultralytics.utils import (DEFAULT_CFG, LOGGER, RANK, TQDM, __version__, cal
 from ultralytics.utils.autobatch import check_train_batch_size
 from ultralytics.utils.checks import check_amp, check_file, check_imgsz, print_args
 from ultralytics.utils.dist import ddp_cleanup, generate_ddp_command
-from ultralytics.utils.files import get_latest_run
-from ultralytics.utils.torch_utils import (EarlyStopping, ModelEMA, de_parallel, init_seeds, one_cycle, select_device,
-                                           strip_optimizer)
+from ultralytics.utils.files import AsyncWriter, get_latest_run, write_atomic
+from ultralytics.utils.torch_utils import (EarlyStopping, ModelEMA, copy_to_cpu, de_parallel, half_cpu_copy, init_seeds,
+                                           one_cycle, select_device, strip_optimizer)
 
 
 class BaseTrainer:
@@ -51,6 +54,9 @@ class BaseTrainer:
         wdir (Path): Directory to save weights.
         last (Path): Path to the last checkpoint.
         best (Path): Path to the best checkpoint.
+        ckpt_writer (AsyncWriter): Background writer for checkpoints, created by the first save_model().
+        val_subset_loader (DataLoader): Class-stratified `val_fraction` of the val split, None to validate on all of it.
+        val_worker (AsyncWriter): Background thread validating EMA snapshots on `val_device`, None to validate inline.
         save_period (int): Save checkpoint every x epochs (disabled if < 1).
         batch_size (int): Batch size for training.
         epochs (int): Number of epochs to train for.
@@ -97,6 +103,8 @@ class BaseTrainer:
             self.args.save_dir = str(self.save_dir)
             yaml_save(self.save_dir / 'args.yaml', vars(self.args))  # save run args
         self.last, self.best = self.wdir / 'last.pt', self.wdir / 'best.pt'  # checkpoint paths
+        self.ckpt_writer = None
+        self.val_subset_loader, self.val_worker = None, None
         self.save_period = self.args.save_period
 
         self.batch_size = self.args.batch
@@ -261,7 +269,15 @@ class BaseTrainer:
             self.validator = self.get_validator()
             metric_keys = self.validator.metrics.keys + self.label_loss_items(prefix='val')
             self.metrics = dict(zip(metric_keys, [0] * len(metric_keys)))
-            self.ema = ModelEMA(self.model)
+            self.ema = ModelEMA(self.model, every=self.args.ema_every)
+            self.val_subset_loader = build_subset_dataloader(self.test_loader.dataset, self.args.val_fraction,
+                                                             batch_size * 2, self.args.workers * 2,
+                                                             self.args.seed) if self.args.val_fraction < 1 else None
+            if self.args.val_device not in (None, ''):
+                d = str(self.args.val_device).lower().replace('cuda:', '')
+                self.val_device = torch.device(f'cuda:{d}' if d.isdigit() else d)
+                self.val_worker = AsyncWriter(maxsize=1)  # at most one snapshot waits while another is validated
+                self.val_results, self.val_ckpts, self.csv_rows = deque(), {}, deque()
             if self.args.plots:
                 self.plot_training_labels()
 
@@ -385,11 +401,23 @@ class BaseTrainer:
                 # Validation
                 self.ema.update_attr(self.model, include=['yaml', 'nc', 'args', 'names', 'stride', 'class_weights'])
                 final_epoch = (epoch + 1 == self.epochs) or self.stopper.possible_stop
-
-                if self.args.val or final_epoch:
-                    self.metrics, self.fitness = self.validate()
-                self.save_metrics(metrics={**self.label_loss_items(self.tloss), **self.metrics, **self.lr})
-                self.stop = self.stopper(epoch + 1, self.fitness)
+                validate = (self.args.val and (epoch + 1) % max(self.args.val_period, 1) == 0) or final_epoch
+                full = final_epoch or (self.args.val_full_period > 0 and (epoch + 1) % self.args.val_full_period == 0)
+
+                if self.val_worker is not None:  # concurrent, results are applied as they arrive
+                    self.collect_validation()
+                    if validate:
+                        self.submit_validation(full)
+                    self.csv_rows.append([epoch, self.label_loss_items(self.tloss), self.lr, None if validate else {}])
+                    self.collect_validation()
+                else:
+                    if validate:
+                        self.metrics, self.fitness = self.validate(full)
+                    else:
+                        self.fitness = None  # best.pt and EarlyStopping only consider validated epochs
+                    metrics = self.metrics if validate else self.skipped_metrics()
+                    self.save_metrics(metrics={**self.label_loss_items(self.tloss), **metrics, **self.lr})
+                    self.stop = self.stopper(epoch + 1, self.fitness)
 
                 # Save model
                 if self.args.save or (epoch + 1 == self.epochs):
@@ -412,6 +440,13 @@ class BaseTrainer:
                 break  # must break all DDP ranks
 
         if RANK in (-1, 0):
+            if self.val_worker is not None:  # finish concurrent validation, may still update best.pt
+                self.val_worker.close()
+                self.val_worker = None
+                self.collect_validation()
+            if self.ckpt_writer is not None:  # finish background checkpoint writes
+                self.ckpt_writer.close()
+                self.ckpt_writer = None
             # Do final val with best.pt
             LOGGER.info(f'\n{epoch - self.start_epoch + 1} epochs completed in '
                         f'{(time.time() - self.train_time_start) / 3600:.3f} hours.')
@@ -423,29 +458,53 @@ class BaseTrainer:
         self.run_callbacks('teardown')
 
     def save_model(self):
-        """Save model training checkpoints with additional metadata."""
-        import pandas as pd  # scope for faster startup
-        metrics = {**self.metrics, **{'fitness': self.fitness}}
-        results = {k.strip(): v for k, v in pd.read_csv(self.csv).to_dict(orient='list').items()}
+        """
+        Save model training checkpoints with additional metadata.
+
+        Model, EMA and optimizer state are snapshot to CPU here, then a background thread serializes the checkpoint once
+        and writes the same bytes to last.pt, best.pt and epochN.pt, each atomically through a temporary file.
+        """
+        if self.ckpt_writer is None:
+            self.ckpt_writer = AsyncWriter(maxsize=1)  # at most one snapshot waits while the previous one is written
+        if self.fitness is None or self.val_worker is not None:  # not validated, or validation still pending
+            metrics = {**self.skipped_metrics(), 'fitness': float('nan')}
+        else:
+            metrics = {**self.metrics, 'fitness': self.fitness}
         ckpt = {
             'epoch': self.epoch,
             'best_fitness': self.best_fitness,
-            'model': deepcopy(de_parallel(self.model)).half(),
-            'ema': deepcopy(self.ema.ema).half(),
+            'model': half_cpu_copy(de_parallel(self.model)),
+            'ema': half_cpu_copy(self.ema.ema),
             'updates': self.ema.updates,
-            'optimizer': self.optimizer.state_dict(),
-            'train_args': vars(self.args),  # save as dict
+            'optimizer': copy_to_cpu(self.optimizer.state_dict()),
+            'train_args': dict(vars(self.args)),  # save as dict
             'train_metrics': metrics,
-            'train_results': results,
+            'train_results': None,  # parsed from results.csv by the writer
             'date': datetime.now().isoformat(),
             'version': __version__}
 
         # Save last and best
-        torch.save(ckpt, self.last)
-        if self.best_fitness == self.fitness:
-            torch.save(ckpt, self.best)
+        files = [self.last]
+        if self.val_worker is not None:  # best.pt is written by collect_validation()
+            if self.epoch in self.val_ckpts:
+                self.val_ckpts[self.epoch] = ckpt
+        elif self.fitness is not None and self.best_fitness == self.fitness:
+            files.append(self.best)
         if (self.save_period > 0) and (self.epoch > 0) and (self.epoch % self.save_period == 0):
-            torch.save(ckpt, self.wdir / f'epoch{self.epoch}.pt')
+            files.append(self.wdir / f'epoch{self.epoch}.pt')
+        self.ckpt_writer.submit(self._write_checkpoint, ckpt, self.read_csv(), files)
+
+    @staticmethod
+    def _write_checkpoint(ckpt, csv, files):
+        """Serialize a checkpoint snapshot once and write it to each of `files`, on the checkpoint writer thread."""
+        import pandas as pd  # scope for faster startup
+        results = pd.read_csv(io.StringIO(csv)).to_dict(orient='list') if csv else {}  # no rows yet
+        ckpt['train_results'] = {k.strip(): v for k, v in results.items()}
+        buffer = io.BytesIO()
+        torch.save(ckpt, buffer)
+        data = buffer.getvalue()
+        for f in files:
+            write_atomic(f, data)
 
     @staticmethod
     def get_dataset(data):
@@ -487,16 +546,86 @@ class BaseTrainer:
         """
         return batch
 
-    def validate(self):
+    def validate(self, full=True):
         """
         Runs validation on test set using self.validator. The returned dict is expected to contain "fitness" key.
         """
-        metrics = self.validator(self)
-        fitness = metrics.pop('fitness', -self.loss.detach().cpu().numpy())  # use loss as fitness measure if not found
+        metrics, fitness = self.run_validator(self, full, -self.loss.detach().cpu().numpy())
         if not self.best_fitness or self.best_fitness < fitness:
             self.best_fitness = fitness
         return metrics, fitness
 
+    def run_validator(self, trainer, full, loss_fitness):
+        """
+        Validate on the `val_fraction` subset, and with `full` also on the whole val split, returns (metrics, fitness).
+
+        The fitness always comes from the same fixed subset when there is one, so best.pt and EarlyStopping compare like
+        with like, while the metrics of full passes are the ones reported.
+
+        Args:
+            trainer (BaseTrainer | SimpleNamespace): This trainer, or a snapshot of it from submit_validation().
+            full (bool): Also validate on the whole val split.
+            loss_fitness (float): Fitness used when the validator does not return one, minus the training loss.
+        """
+        loaders = [self.val_subset_loader] if self.val_subset_loader else []
+        if full or not loaders:
+            loaders.append(self.test_loader)
+        fitness = None
+        try:
+            for loader in loaders:
+                self.validator.dataloader = loader
+                metrics = self.validator(trainer)
+                f = metrics.pop('fitness', loss_fitness)  # use loss as fitness measure if not found
+                fitness = f if fitness is None else fitness
+        finally:
+            self.validator.dataloader = self.test_loader
+        return metrics, fitness
+
+    def submit_validation(self, full):
+        """Queue validation of an EMA snapshot of this epoch on `val_device`, training continues meanwhile."""
+        model = half_cpu_copy(self.ema.ema)
+        if hasattr(model, 'criterion'):  # rebuilt on val_device
+            del model.criterion
+        trainer = SimpleNamespace(device=self.val_device,
+                                  data=self.data,
+                                  ema=SimpleNamespace(ema=model),
+                                  model=None,
+                                  loss_items=self.loss_items.detach().clone(),
+                                  stopper=SimpleNamespace(possible_stop=self.stopper.possible_stop),
+                                  epoch=self.epoch,
+                                  epochs=self.epochs,
+                                  label_loss_items=self.label_loss_items)
+        self.val_ckpts[self.epoch] = None  # filled by save_model()
+        self.val_worker.submit(self._validate_snapshot, trainer, full, -self.loss.detach().cpu().numpy())
+
+    def _validate_snapshot(self, trainer, full, loss_fitness):
+        """Validate a snapshot from submit_validation(), runs on the validation worker thread."""
+        trainer.ema.ema.to(trainer.device)
+        self.val_results.append((trainer.epoch, *self.run_validator(trainer, full, loss_fitness)))
+
+    def collect_validation(self):
+        """Apply finished concurrent validations in order: metrics, best.pt, EarlyStopping and results.csv rows."""
+        while self.val_results:
+            epoch, self.metrics, self.fitness = self.val_results.popleft()
+            ckpt = self.val_ckpts.pop(epoch, None)
+            if not self.best_fitness or self.best_fitness < self.fitness:
+                self.best_fitness = self.fitness
+                if ckpt is not None:  # that epoch's checkpoint snapshot
+                    metrics = {**self.metrics, 'fitness': self.fitness}
+                    ckpt = {**ckpt, 'best_fitness': self.best_fitness, 'train_metrics': metrics}
+                    self.ckpt_writer.submit(self._write_checkpoint, ckpt, self.read_csv(), [self.best])
+            self.stop = self.stopper(epoch + 1, self.fitness) or self.stop
+            for row in self.csv_rows:
+                if row[0] == epoch:
+                    row[3] = self.metrics
+        while self.csv_rows and self.csv_rows[0][3] is not None:  # rows in epoch order
+            epoch, loss, lr, metrics = self.csv_rows.popleft()
+            self.save_metrics(metrics={**loss, **(metrics or self.skipped_metrics()), **lr}, epoch=epoch)
+
+    def skipped_metrics(self):
+        """Returns NaN for every validation metric, recorded for epochs that were not validated."""
+        return dict.fromkeys(self.metrics, float('nan'))
+
     def get_model(self, cfg=None, weights=None, verbose=True):
         """Get model and raise NotImplementedError for loading cfg files."""
         raise NotImplementedError("This task trainer doesn't support loading cfg files")
@@ -545,13 +674,18 @@ class BaseTrainer:
         """Plots training labels for YOLO model."""
         pass
 
-    def save_metrics(self, metrics):
-        """Saves training metrics to a CSV file."""
+    def save_metrics(self, metrics, epoch=None):
+        """Saves training metrics to a CSV file, as the row of `epoch` (default the current epoch)."""
         keys, vals = list(metrics.keys()), list(metrics.values())
         n = len(metrics) + 1  # number of cols
         s = '' if self.csv.exists() else (('%23s,' * n % tuple(['epoch'] + keys)).rstrip(',') + '\n')  # header
+        epoch = self.epoch if epoch is None else epoch
         with open(self.csv, 'a') as f:
-            f.write(s + ('%23.5g,' * n % tuple([self.epoch + 1] + vals)).rstrip(',') + '\n')
+            f.write(s + ('%23.5g,' * n % tuple([epoch + 1] + vals)).rstrip(',') + '\n')
+
+    def read_csv(self):
+        """Returns the text of results.csv, empty before its first row."""
+        return self.csv.read_text() if self.csv.exists() else ''
 
     def plot_metrics(self):
         """Plot and display metrics visually."""
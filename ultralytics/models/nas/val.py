@@ -21,4 +21,5 @@ class NASValidator(DetectionValidator):
                                        multi_label=False,
                                        agnostic=self.args.single_cls,
                                        max_det=self.args.max_det,
-                                       max_time_img=0.5)
+                                       max_time_img=0.5,
+                                       method=self.args.nms_method)
@@ -1,8 +1,10 @@
 # Ultralytics YOLO 🚀, AGPL-3.0 license
 
+import torch
+
 from ultralytics.engine.predictor import BasePredictor
 from ultralytics.engine.results import Results
-from ultralytics.utils import ops
+from ultralytics.utils import DEFAULT_CFG, ops
 
 
 class DetectionPredictor(BasePredictor):
@@ -18,8 +20,95 @@ class DetectionPredictor(BasePredictor):
         predictor = DetectionPredictor(overrides=args)
         predictor.predict_cli()
         ```
+
+    Tiled inference for large images, i.e. `yolo predict source=strip.jpg tile=640 tile_overlap=0.2`, cuts each image
+    into overlapping `tile` x `tile` crops plus one full image view, runs them through the model in batches of
+    `tile_batch` and merges the detections of all crops with cross-tile NMS.
+
+    `nms_method='soft'` (Gaussian soft-NMS) or `nms_method='wbf'` (weighted box fusion) replace hard NMS, for the model
+    output as well as for merging tiles, TTA (`augment=True`) and ensemble predictions.
     """
 
+    def __init__(self, cfg=DEFAULT_CFG, overrides=None, _callbacks=None):
+        """Initializes DetectionPredictor, `tile_offsets` holds (image index, x, y, w, h) per tile of the last batch."""
+        super().__init__(cfg, overrides, _callbacks)
+        self.tile_offsets = None
+
+    def preprocess(self, im):
+        """Prepares input images, cutting each image into overlapping tiles if `tile > 0`."""
+        im, self.tile_offsets = self.preprocess_tiles(im)
+        return im
+
+    def preprocess_tiles(self, im):
+        """
+        Prepares input images like preprocess() without storing the tile offsets on the predictor, so that a
+        preprocessing thread can run ahead of inference, i.e. VideoPipeline.
+
+        Returns:
+            (torch.Tensor): Model input of the images, or of their tiles if `tile > 0`.
+            (List[tuple] | None): (image index, x, y, w, h) of each tile, None when not tiling.
+        """
+        if not self.args.tile or self.args.task != 'detect' or isinstance(im, torch.Tensor):
+            return super().preprocess(im), None
+        tiles, offsets = [], []
+        for i, im0 in enumerate(im):
+            for x0, y0, x1, y1 in self.tile_windows(*im0.shape[:2]):
+                tiles.append(im0[y0:y1, x0:x1])
+                offsets.append((i, x0, y0, x1 - x0, y1 - y0))
+        return super().preprocess(tiles), offsets
+
+    def tile_windows(self, h, w):
+        """Return xyxy tile windows covering an image of shape (h, w), the first window being the full image."""
+        t = self.args.tile
+        if h <= t and w <= t:
+            return [(0, 0, w, h)]
+        step = max(round(t * (1 - self.args.tile_overlap)), 1)
+
+        def starts(n):
+            """Tile start offsets along one dimension, the last tile aligned to the image border."""
+            return [0] if n <= t else [*range(0, n - t, step), n - t]
+
+        return [(0, 0, w, h)] + [(x, y, min(x + t, w), min(y + t, h)) for y in starts(h) for x in starts(w)]
+
+    def inference(self, im, *args, **kwargs):
+        """Runs inference, in chunks of `tile_batch` images when tiling."""
+        if self.tile_offsets is None or len(im) <= self.args.tile_batch:
+            return super().inference(im, *args, **kwargs)
+        preds = []
+        for x in im.split(self.args.tile_batch):
+            p = super().inference(x, *args, **kwargs)
+            preds.append(p[0] if isinstance(p, (list, tuple)) else p)  # inference output only
+        return torch.cat(preds)
+
+    def merge_tiles(self, preds, shape, n):
+        """
+        Map per-tile detections to full image coordinates and merge duplicates from overlapping tiles.
+
+        Args:
+            preds (List[torch.Tensor]): Per-tile detections (m, 6) in letterboxed tile coordinates.
+            shape (tuple): Letterboxed tile shape (h, w) of the model input.
+            n (int): Number of full images.
+
+        Returns:
+            (List[torch.Tensor]): Per-image detections (k, 6) in original image coordinates.
+        """
+        merged = [[] for _ in range(n)]
+        for pred, (i, x0, y0, w, h) in zip(preds, self.tile_offsets):
+            pred[:, :4] = ops.scale_boxes(shape, pred[:, :4], (h, w))
+            pred[:, [0, 2]] += x0
+            pred[:, [1, 3]] += y0
+            merged[i].append(pred)
+        output = []
+        for pred in merged:
+            pred = torch.cat(pred)
+            c = pred[:, 5].long() * (0 if self.args.agnostic_nms else 1)  # classes
+            i, pred[:, :4], pred[:, 4] = ops.batched_suppression(pred[:, :4], pred[:, 4], c, self.args.iou,
+                                                                 self.args.nms_method)
+            if self.args.nms_method == 'soft':
+                i = i[pred[i, 4] > self.args.conf]  # decayed scores
+            output.append(pred[i[:self.args.max_det]])
+        return output
+
     def postprocess(self, preds, img, orig_imgs):
         """Post-processes predictions and returns a list of Results objects."""
         preds = ops.non_max_suppression(preds,
@@ -27,15 +116,20 @@ class DetectionPredictor(BasePredictor):
                                         self.args.iou,
                                         agnostic=self.args.agnostic_nms,
                                         max_det=self.args.max_det,
-                                        classes=self.args.classes)
+                                        classes=self.args.classes,
+                                        method=self.args.nms_method)
 
         if not isinstance(orig_imgs, list):  # input images are a torch.Tensor, not a list
             orig_imgs = ops.convert_torch2numpy_batch(orig_imgs)
+        tiled = self.tile_offsets is not None
+        if tiled:  # boxes are returned in original image coordinates
+            preds = self.merge_tiles(preds, img.shape[2:], len(orig_imgs))
 
         results = []
         for i, pred in enumerate(preds):
             orig_img = orig_imgs[i]
-            pred[:, :4] = ops.scale_boxes(img.shape[2:], pred[:, :4], orig_img.shape)
+            if not tiled:
+                pred[:, :4] = ops.scale_boxes(img.shape[2:], pred[:, :4], orig_img.shape)
             img_path = self.batch[0][i]
             results.append(Results(orig_img, path=img_path, names=self.model.names, boxes=pred))
         return results
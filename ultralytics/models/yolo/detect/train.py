@@ -52,8 +52,11 @@ class DetectionTrainer(BaseTrainer):
         return build_dataloader(dataset, batch_size, workers, shuffle, rank)  # return dataloader
 
     def preprocess_batch(self, batch):
-        """Preprocesses a batch of images by scaling and converting to float."""
+        """Preprocesses a batch of images by scaling and converting to float, and applies batched augmentations."""
         batch['img'] = batch['img'].to(self.device, non_blocking=True).float() / 255
+        batch_aug = getattr(self.train_loader.dataset, 'batch_aug', None)
+        if batch_aug:
+            batch = batch_aug(batch)
         return batch
 
     def set_model_attributes(self):
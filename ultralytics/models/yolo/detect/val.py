@@ -85,7 +85,9 @@ class DetectionValidator(BaseValidator):
                                        labels=self.lb,
                                        multi_label=True,
                                        agnostic=self.args.single_cls,
-                                       max_det=self.args.max_det)
+                                       max_det=self.args.max_det,
+                                       topk=self.args.nms_topk,
+                                       method=self.args.nms_method)
 
     def update_metrics(self, preds, batch):
         """Metrics."""
@@ -35,7 +35,8 @@ class PosePredictor(DetectionPredictor):
                                         agnostic=self.args.agnostic_nms,
                                         max_det=self.args.max_det,
                                         classes=self.args.classes,
-                                        nc=len(self.model.names))
+                                        nc=len(self.model.names),
+                                        method=self.args.nms_method)
 
         if not isinstance(orig_imgs, list):  # input images are a torch.Tensor, not a list
             orig_imgs = ops.convert_torch2numpy_batch(orig_imgs)
@@ -57,7 +57,9 @@ class PoseValidator(DetectionValidator):
                                        multi_label=True,
                                        agnostic=self.args.single_cls,
                                        max_det=self.args.max_det,
-                                       nc=self.nc)
+                                       topk=self.args.nms_topk,
+                                       nc=self.nc,
+                                       method=self.args.nms_method)
 
     def init_metrics(self, model):
         """Initiate pose estimation metrics for YOLO model."""
@@ -31,7 +31,8 @@ class SegmentationPredictor(DetectionPredictor):
                                     agnostic=self.args.agnostic_nms,
                                     max_det=self.args.max_det,
                                     nc=len(self.model.names),
-                                    classes=self.args.classes)
+                                    classes=self.args.classes,
+                                    method=self.args.nms_method)
 
         if not isinstance(orig_imgs, list):  # input images are a torch.Tensor, not a list
             orig_imgs = ops.convert_torch2numpy_batch(orig_imgs)
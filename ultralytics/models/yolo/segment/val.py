@@ -66,7 +66,9 @@ class SegmentationValidator(DetectionValidator):
                                     multi_label=True,
                                     agnostic=self.args.single_cls,
                                     max_det=self.args.max_det,
-                                    nc=self.nc)
+                                    topk=self.args.nms_topk,
+                                    nc=self.nc,
+                                    method=self.args.nms_method)
         proto = preds[1][-1] if len(preds[1]) == 3 else preds[1]  # second output is len 3 if pt, but only 1 if exported
         return p, proto
 
@@ -1,6 +1,9 @@
 # Ultralytics YOLO 🚀, AGPL-3.0 license
 
 import contextlib
+import hashlib
+import os
+import tempfile
 from copy import deepcopy
 from pathlib import Path
 
@@ -11,12 +14,13 @@ from ultralytics.nn.modules import (AIFI, C1, C2, C3, C3TR, SPP, SPPF, Bottlenec
                                     Classify, Concat, Conv, Conv2, ConvTranspose, Detect, DWConv, DWConvTranspose2d,
                                     Focus, GhostBottleneck, GhostConv, HGBlock, HGStem, Pose, RepC3, RepConv,
                                     RTDETRDecoder, Segment)
-from ultralytics.utils import DEFAULT_CFG_DICT, DEFAULT_CFG_KEYS, LOGGER, colorstr, emojis, yaml_load
+from ultralytics.utils import (DEFAULT_CFG_DICT, DEFAULT_CFG_KEYS, LOGGER, USER_CONFIG_DIR, __version__, colorstr,
+                               emojis, yaml_load)
 from ultralytics.utils.checks import check_requirements, check_suffix, check_yaml
 from ultralytics.utils.loss import v8ClassificationLoss, v8DetectionLoss, v8PoseLoss, v8SegmentationLoss
 from ultralytics.utils.plotting import feature_visualization
-from ultralytics.utils.torch_utils import (fuse_conv_and_bn, fuse_deconv_and_bn, initialize_weights, intersect_dicts,
-                                           make_divisible, model_info, scale_img, time_sync)
+from ultralytics.utils.torch_utils import (TORCH_2_1, fuse_conv_and_bn, fuse_deconv_and_bn, initialize_weights,
+                                           intersect_dicts, make_divisible, model_info, scale_img, time_sync)
 
 try:
     import thop
@@ -583,11 +587,86 @@ def attempt_load_weights(weights, device=None, inplace=True, fuse=False):
     return ensemble
 
 
-def attempt_load_one_weight(weight, device=None, inplace=True, fuse=False):
-    """Loads a single model weights."""
-    ckpt, weight = torch_safe_load(weight)  # load ckpt
+def load_inference_cache(weight, half=False):
+    """
+    Loads a checkpoint through the persistent inference cache in USER_CONFIG_DIR/model_cache.
+
+    On the first load the full training checkpoint is unpickled, stripped down to the EMA (or model) weights and train
+    args, Conv+BN fused, optionally converted to FP16 and saved under a key derived from the source file hash, the
+    ultralytics and torch versions and the precision. Later loads memory-map the cached file directly, skipping the
+    optimizer state and the fusing step.
+
+    Args:
+        weight (str): The file path of the PyTorch model.
+        half (bool): Cache FP16 instead of FP32 weights.
+
+    Returns:
+        (dict): Stripped checkpoint with 'model', 'train_args' and 'cache' metadata.
+        (str): The resolved source file path.
+    """
+    from ultralytics.utils.downloads import attempt_download_asset
+
+    check_suffix(file=weight, suffix='.pt')
+    file = attempt_download_asset(weight)  # search online if missing locally
+    h = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    h.update(f'{__version__}-{torch.__version__}-{bool(half)}'.encode())
+    cache = USER_CONFIG_DIR / 'model_cache' / f'{Path(file).stem}-{h.hexdigest()[:16]}.pt'
+
+    if cache.exists():
+        try:
+            kwargs = {'mmap': True, 'weights_only': False} if TORCH_2_1 else {}
+            return torch.load(cache, map_location='cpu', **kwargs), file
+        except Exception as e:
+            LOGGER.warning(f'WARNING ⚠️ inference cache {cache} is corrupt and will be rebuilt: {e}')
+
+    ckpt, file = torch_safe_load(file)
+    model = (ckpt.get('ema') or ckpt['model']).float().requires_grad_(False)  # before fusing, keeps leaf tensors
+    model = model.fuse(verbose=False) if hasattr(model, 'fuse') else model
+    model = (model.half() if half else model).eval()
+    ckpt = {
+        'model': model,
+        'train_args': ckpt.get('train_args', {}),
+        'date': ckpt.get('date'),
+        'version': ckpt.get('version'),
+        'cache': {
+            'source': str(file),
+            'half': bool(half),
+            'ultralytics': __version__,
+            'torch': torch.__version__}}
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache.parent, prefix=f'.{cache.name}.', suffix='.tmp', delete=False) as f:
+            tmp = Path(f.name)  # unique per writer, concurrent first loads never write into the same file
+            try:
+                torch.save(ckpt, f)
+            except Exception:
+                f.close()
+                tmp.unlink()
+                raise
+        tmp.replace(cache)  # atomic, concurrent loaders never see a partial file
+        LOGGER.info(f'Inference cache saved to {cache} ({cache.stat().st_size / 1E6:.1f}MB)')
+    except Exception as e:
+        LOGGER.warning(f'WARNING ⚠️ inference cache {cache} is not writeable: {e}')
+    return ckpt, file
+
+
+def attempt_load_one_weight(weight, device=None, inplace=True, fuse=False, cache=False):
+    """
+    Loads a single model weights.
+
+    Passing cache=True (or 'half' for FP16) loads a pre-fused inference copy through load_inference_cache(), such models
+    are for inference only and are not suitable for training.
+    """
+    if cache:
+        ckpt, weight = load_inference_cache(weight, half=cache == 'half')
+        model = ckpt['model'].to(device)  # already fused, keep cached precision
+    else:
+        ckpt, weight = torch_safe_load(weight)  # load ckpt
+        model = (ckpt.get('ema') or ckpt['model']).to(device).float()  # FP32 model
     args = {**DEFAULT_CFG_DICT, **(ckpt.get('train_args', {}))}  # combine model and default args, preferring model args
-    model = (ckpt.get('ema') or ckpt['model']).to(device).float()  # FP32 model
 
     # Model compatibility updates
     model.args = {k: v for k, v in args.items() if k in DEFAULT_CFG_KEYS}  # attach args to model
@@ -3,9 +3,14 @@
 Benchmark a YOLO model formats for speed and accuracy
 
 Usage:
-    from ultralytics.utils.benchmarks import ProfileModels, benchmark
+    from ultralytics.utils.benchmarks import (ProfileModels, benchmark, benchmark_dataloader, benchmark_loss,
+                                             benchmark_nms, benchmark_predict)
     ProfileModels(['yolov8n.yaml', 'yolov8s.yaml']).profile()
     benchmark(model='yolov8n.pt', imgsz=160)
+    benchmark_predict(model='yolov8n.pt', source='path/to/images', batch=(1, 8, 32))
+    benchmark_nms(batch=(1, 8, 64), conf_thres=0.001, multi_label=True)
+    benchmark_dataloader(data='coco128.yaml', imgsz=640, batch=16, workers=8, device=0)
+    benchmark_loss(model='yolov8n.yaml', batch=(16, 64), imgsz=640)
 
 Format                  | `format=argument`         | Model
 ---                     | ---                       | ---
@@ -150,6 +155,368 @@ def benchmark(model=Path(SETTINGS['weights_dir']) / 'yolov8n.pt',
     return df
 
 
+def benchmark_predict(model=Path(SETTINGS['weights_dir']) / 'yolov8n.pt',
+                      source=ASSETS,
+                      batch=(1, 8, 32),
+                      imgsz=640,
+                      half=False,
+                      device='cpu',
+                      **kwargs):
+    """
+    Benchmark end-to-end prediction throughput over a directory of images at different batch sizes.
+
+    Args:
+        model (str | Path | YOLO): Model to benchmark. Default is Path(SETTINGS['weights_dir']) / 'yolov8n.pt'.
+        source (str | Path): Directory, glob or list of images to predict on. Default is ASSETS.
+        batch (tuple): Batch sizes to compare. Default is (1, 8, 32).
+        imgsz (int): Image size for inference. Default is 640.
+        half (bool): Use half-precision for the model if True. Default is False.
+        device (str): Device to run the benchmark on, either 'cpu' or 'cuda'. Default is 'cpu'.
+        **kwargs (Any): Additional predict arguments, i.e. conf=0.25.
+
+    Returns:
+        df (pandas.DataFrame): Images, total time, throughput and speedup relative to the first batch size.
+
+    Example:
+        ```python
+        from ultralytics.utils.benchmarks import benchmark_predict
+
+        benchmark_predict(model='yolov8n.pt', source='datasets/NEU-DET/images/val', batch=(1, 8, 32))
+        ```
+    """
+    import pandas as pd
+    device = select_device(device, verbose=False)
+    if isinstance(model, (str, Path)):
+        model = YOLO(model)
+
+    args = {'imgsz': imgsz, 'half': half, 'device': device, 'verbose': False, 'save': False, **kwargs}
+    for _ in model.predict(source, stream=True, batch=max(batch), **args):  # warmup, also fills the OS file cache
+        pass
+    y = []
+    for b in batch:
+        t = time.perf_counter()
+        n = sum(1 for _ in model.predict(source, stream=True, batch=b, **args))
+        dt = time.perf_counter() - t
+        y.append([b, n, round(dt, 3), round(n / dt, 1)])
+    df = pd.DataFrame(y, columns=['Batch', 'Images', 'Time (s)', 'Throughput (im/s)'])
+    df['Speedup'] = (df['Throughput (im/s)'] / df['Throughput (im/s)'].iloc[0]).round(2)
+    LOGGER.info(f'\nPrediction benchmarks complete for {source} at imgsz={imgsz} on {device}\n{df}\n')
+    return df
+
+
+def benchmark_nms(batch=(1, 4, 16, 64), nc=80, anchors=8400, density=2E-4, runs=10, device='cpu', **kwargs):
+    """
+    Benchmark batched non_max_suppression() against one NMS call per image on synthetic detection head outputs.
+
+    Args:
+        batch (tuple): Batch sizes to compare. Default is (1, 4, 16, 64).
+        nc (int): Number of classes of the synthetic head output. Default is 80.
+        anchors (int): Number of anchors of the synthetic head output, 8400 for imgsz=640. Default is 8400.
+        density (float): Fraction of non-zero class scores, about 130 scored boxes per image by default. Default is 2E-4.
+        runs (int): Timed runs per batch size, the median is reported. Default is 10.
+        device (str): Device to run the benchmark on, either 'cpu' or 'cuda'. Default is 'cpu'.
+        **kwargs (Any): Additional non_max_suppression() arguments, i.e. conf_thres=0.001, multi_label=True.
+
+    Returns:
+        df (pandas.DataFrame): Per-batch time of the per-image loop and of the batched call, and the speedup.
+
+    Example:
+        ```python
+        from ultralytics.utils.benchmarks import benchmark_nms
+
+        benchmark_nms(batch=(1, 8, 64), conf_thres=0.001, multi_label=True)
+        ```
+    """
+    import pandas as pd
+
+    from ultralytics.utils.ops import non_max_suppression
+
+    device = select_device(device, verbose=False)
+    gen = torch.Generator().manual_seed(0)
+    y = []
+    for b in batch:
+        x = torch.rand(b, 4 + nc, anchors, generator=gen)
+        x[:, :2] *= 640  # xy
+        x[:, 2:4] = x[:, 2:4] * 160 + 4  # wh
+        x[:, 4:] *= torch.rand(b, nc, anchors, generator=gen) < density  # sparse class scores, like a trained head
+        x = x.to(device)
+        t = []
+        for fn in (lambda p: [non_max_suppression(pi[None], **kwargs)[0] for pi in p],
+                   lambda p: non_max_suppression(p, **kwargs)):
+            dt = []
+            for _ in range(runs + 1):  # first run is warmup
+                p = x.clone()
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+                t0 = time.perf_counter()
+                fn(p)
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+                dt.append(time.perf_counter() - t0)
+            t.append(float(np.median(dt[1:])) * 1E3)
+        y.append([b, round(t[0], 2), round(t[1], 2), round(t[0] / t[1], 2)])
+    df = pd.DataFrame(y, columns=['Batch', 'Loop (ms)', 'Batched (ms)', 'Speedup'])
+    LOGGER.info(f'\nNMS benchmarks complete for nc={nc}, anchors={anchors} on {device} {kwargs}\n{df}\n')
+    return df
+
+
+def benchmark_dataloader(data='coco8.yaml', imgsz=640, batch=16, workers=8, batches=20, device='cpu', **kwargs):
+    """
+    Benchmark training dataloader throughput with per-sample augmentation in workers against `batch_aug=True`.
+
+    Each batch is timed up to a float image tensor on `device`, for `batch_aug=True` including BatchAugment, the way
+    DetectionTrainer.preprocess_batch() hands it to the model.
+
+    Args:
+        data (str): Dataset YAML whose train split is loaded. Default is 'coco8.yaml'.
+        imgsz (int): Training image size. Default is 640.
+        batch (int): Batch size. Default is 16.
+        workers (int): Dataloader workers, capped at the CPU count like in training. Default is 8.
+        batches (int): Timed batches per mode after one warmup batch. Default is 20.
+        device (str): Device batches are moved to and augmented on, either 'cpu' or 'cuda'. Default is 'cpu'.
+        **kwargs (Any): Additional training arguments, i.e. task='pose', cache='ram', mosaic=0.5.
+
+    Returns:
+        df (pandas.DataFrame): Images, time, throughput and per-image worker time per mode, and the throughput speedup
+            of `batch_aug=True`.
+
+    Example:
+        ```python
+        from ultralytics.utils.benchmarks import benchmark_dataloader
+
+        benchmark_dataloader(data='datasets/NEU-DET/data.yaml', batch=32, workers=4, device=0)
+        ```
+    """
+    import pandas as pd
+
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data import build_dataloader, build_yolo_dataset
+    from ultralytics.data.utils import check_det_dataset
+
+    device = select_device(device, verbose=False)
+    data = check_det_dataset(data)
+    y = []
+    for batch_aug in (False, True):
+        cfg = get_cfg(overrides={'imgsz': imgsz, 'batch_aug': batch_aug, **kwargs})
+        dataset = build_yolo_dataset(cfg, data['train'], batch, data)
+        loader = build_dataloader(dataset, batch, workers)
+        for i in range(batches + 1):  # first batch is warmup, it also starts the workers
+            if i == 1:
+                t = time.perf_counter()
+            b = next(loader.iterator)
+            b['img'] = b['img'].to(device, non_blocking=True).float() / 255
+            if dataset.batch_aug:
+                b = dataset.batch_aug(b)
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+        dt = time.perf_counter() - t
+        n = batches * len(b['img'])
+        t = time.perf_counter()
+        for i in np.random.randint(0, len(dataset), n):  # dataloader worker cost alone, measured in this process
+            dataset[i]
+        y.append([batch_aug, n, round(dt, 3), round(n / dt, 1), round((time.perf_counter() - t) / n * 1E3, 2)])
+        del loader
+    df = pd.DataFrame(y, columns=['batch_aug', 'Images', 'Time (s)', 'Throughput (im/s)', 'Worker (ms/im)'])
+    df['Speedup'] = (df['Throughput (im/s)'] / df['Throughput (im/s)'].iloc[0]).round(2)
+    LOGGER.info(f'\nDataloader benchmarks complete at imgsz={imgsz}, batch={batch}, workers={workers} on {device}\n'
+                f'{df}\n')
+    return df
+
+
+def benchmark_loss(model='yolov8n.yaml', batch=(16, 64), imgsz=640, nt=8, runs=10, device='cpu'):
+    """
+    Benchmark the per-iteration detection loss, and what the packed targets and cached anchors save in it compared to a
+    per-image target loop and make_anchors() on every step.
+
+    Args:
+        model (str): Detection model YAML or weights, only its Detect() head configuration is used. Default is
+            'yolov8n.yaml'.
+        batch (tuple): Batch sizes to compare. Default is (16, 64).
+        imgsz (int): Image size of the synthetic head outputs. Default is 640.
+        nt (int): Average number of targets per image. Default is 8.
+        runs (int): Timed runs per batch size, the median is reported. Default is 10.
+        device (str): Device to run the benchmark on, either 'cpu' or 'cuda'. Default is 'cpu'.
+
+    Returns:
+        df (pandas.DataFrame): Per-batch times of target packing and anchor generation before and after, the full loss
+            call, and the saving per iteration.
+
+    Example:
+        ```python
+        from ultralytics.utils.benchmarks import benchmark_loss
+
+        benchmark_loss(model='yolov8s.yaml', batch=(64,), device=0)
+        ```
+    """
+    import pandas as pd
+
+    from ultralytics.cfg import get_cfg
+    from ultralytics.utils.ops import xywh2xyxy
+    from ultralytics.utils.tal import make_anchors
+
+    device = select_device(device, verbose=False)
+    m = YOLO(model).model.to(device)
+    m.args = get_cfg()
+    loss = m.init_criterion()
+
+    def loop_preprocess(targets, batch_size, scale_tensor):  # per-image loop replaced by v8DetectionLoss.preprocess()
+        i = targets[:, 0]
+        out = torch.zeros(batch_size, i.unique(return_counts=True)[1].max(), 5, device=device)
+        for j in range(batch_size):
+            matches = i == j
+            n = matches.sum()
+            if n:
+                out[j, :n] = targets[matches, 1:]
+        out[..., 1:5] = xywh2xyxy(out[..., 1:5].mul_(scale_tensor))
+        return out
+
+    def step_anchors(feats):  # anchors and image size built on every step
+        anchor_points, stride_tensor = make_anchors(feats, loss.stride, 0.5)
+        imgsz = torch.tensor(feats[0].shape[2:], device=device, dtype=feats[0].dtype) * loss.stride[0]
+        return anchor_points, stride_tensor, anchor_points * stride_tensor, imgsz
+
+    def timed(fn, *args):
+        dt = []
+        for _ in range(runs + 1):  # first run is warmup
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            t0 = time.perf_counter()
+            fn(*args)
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            dt.append(time.perf_counter() - t0)
+        return float(np.median(dt[1:])) * 1E3
+
+    gen = torch.Generator().manual_seed(0)
+    y = []
+    for b in batch:
+        feats = [torch.rand(b, loss.no, imgsz // int(s), imgsz // int(s), generator=gen) for s in loss.stride]
+        feats = [x.to(device) for x in feats]
+        bi = torch.repeat_interleave(torch.arange(b), torch.randint(0, 2 * nt + 1, (b, ), generator=gen)).float()
+        n = len(bi)
+        xywh = torch.cat((torch.rand(n, 2, generator=gen) * 0.8 + 0.1, torch.rand(n, 2, generator=gen) * 0.2), 1)
+        cls = torch.randint(0, loss.nc, (n, 1), generator=gen).float()
+        targets = torch.cat((bi[:, None], cls, xywh), 1).to(device)
+        scale = torch.tensor([imgsz] * 4, device=device, dtype=torch.float)
+        t = [
+            timed(loop_preprocess, targets, b, scale),
+            timed(loss.preprocess, targets, b, scale),
+            timed(step_anchors, feats),
+            timed(loss.anchors, feats),
+            timed(loss, feats, {'batch_idx': bi, 'cls': cls, 'bboxes': xywh})]
+        saving = t[0] - t[1] + t[2] - t[3]
+        y.append([b, n] + [round(x, 2) for x in t] + [round(saving, 2), round(saving / (t[4] + saving) * 100, 1)])
+    df = pd.DataFrame(y,
+                      columns=[
+                          'Batch', 'Targets', 'Loop targets (ms)', 'Packed targets (ms)', 'Step anchors (ms)',
+                          'Cached anchors (ms)', 'Loss (ms)', 'Saving (ms)', 'Saving (%)'])
+    LOGGER.info(f'\nLoss benchmarks complete for {model} at imgsz={imgsz} on {device}\n{df}\n')
+    return df
+
+
+def benchmark_assigner(batch=16, nt=(32, 128, 512), dense=1, imgsz=640, nc=6, gt_chunk=64, runs=3, device='cpu'):
+    """
+    Benchmark peak memory and time of TaskAlignedAssigner with dense and chunked ground truth assignment, for batches
+    where a few densely labelled images pad every image to their box count.
+
+    Peak memory is torch.cuda.max_memory_allocated() on CUDA, and on CPU the peak of the tensor allocations and frees
+    recorded by torch.profiler.
+
+    Args:
+        batch (int): Batch size. Default is 16.
+        nt (tuple): Ground truths in each densely labelled image, one row per value. Default is (32, 128, 512).
+        dense (int): Densely labelled images in the batch, the others have up to 8 ground truths. Default is 1.
+        imgsz (int): Image size, sets the number of anchors at strides 8, 16 and 32. Default is 640.
+        nc (int): Number of classes. Default is 6.
+        gt_chunk (int): Ground truths per chunk of the chunked assignment. Default is 64.
+        runs (int): Timed runs per mode, the median is reported. Default is 3.
+        device (str): Device to run the benchmark on, either 'cpu' or 'cuda'. Default is 'cpu'.
+
+    Returns:
+        df (pandas.DataFrame): Per-row peak memory and time of both modes, and whether their outputs are identical.
+
+    Example:
+        ```python
+        from ultralytics.utils.benchmarks import benchmark_assigner
+
+        benchmark_assigner(batch=32, nt=(256, 1024), device=0)
+        ```
+    """
+    import itertools
+
+    import pandas as pd
+    from torch.profiler import ProfilerActivity, profile
+
+    from ultralytics.utils.tal import TaskAlignedAssigner, make_anchors
+
+    device = select_device(device, verbose=False)
+    strides = torch.tensor([8., 16., 32.])
+    anc_points, stride_tensor = make_anchors([torch.zeros(1, 1, imgsz // s, imgsz // s) for s in (8, 16, 32)], strides)
+    anc_points = (anc_points * stride_tensor).to(device)
+    na = len(anc_points)
+
+    def peak(fn, *args):  # peak bytes allocated while fn runs, above what was allocated before
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats(device)
+            base = torch.cuda.memory_allocated(device)
+            out = fn(*args)
+            torch.cuda.synchronize()
+            return out, torch.cuda.max_memory_allocated(device) - base
+        with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+            out = fn(*args)
+        events = sorted((e.time_range.start, e.cpu_memory_usage if e.name == '[memory]' else e.self_cpu_memory_usage)
+                        for e in prof.events())
+        return out, max(itertools.accumulate(m for _, m in events), default=0)
+
+    def timed(fn, *args):
+        dt = []
+        for _ in range(runs + 1):  # first run is warmup
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            t0 = time.perf_counter()
+            fn(*args)
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            dt.append(time.perf_counter() - t0)
+        return float(np.median(dt[1:])) * 1E3
+
+    gen = torch.Generator().manual_seed(0)
+    y = []
+    for n in nt:
+        counts = torch.randint(0, 9, (batch, ), generator=gen).clamp(max=n)
+        counts[:dense] = n
+        xy = torch.rand(batch, n, 2, generator=gen) * imgsz
+        wh = torch.rand(batch, n, 2, generator=gen) * imgsz / 8 + 4
+        mask_gt = (torch.arange(n)[None] < counts[:, None]).float()[..., None]
+        gt_bboxes = torch.cat((xy - wh / 2, xy + wh / 2), -1).clamp(0, imgsz) * mask_gt
+        gt_labels = torch.randint(0, nc, (batch, n, 1), generator=gen).float() * mask_gt
+        pd_scores = torch.rand(batch, na, nc, generator=gen)
+        pd_xy = anc_points.cpu() + torch.randn(batch, na, 2, generator=gen) * 16
+        pd_wh = torch.rand(batch, na, 2, generator=gen) * imgsz / 8 + 4
+        pd_bboxes = torch.cat((pd_xy - pd_wh / 2, pd_xy + pd_wh / 2), -1)
+        args = [x.to(device) for x in (pd_scores, pd_bboxes)] + [anc_points] + [
+            x.to(device) for x in (gt_labels, gt_bboxes, mask_gt)]
+
+        row, outs = [n, int(counts.sum())], []
+        for chunk in (0, gt_chunk):
+            assigner = TaskAlignedAssigner(topk=10, num_classes=nc, alpha=0.5, beta=6.0, gt_chunk=chunk)
+            out, mem = peak(assigner, *args)
+            outs.append(out)
+            row += [round(mem / 2 ** 20, 1), round(timed(assigner, *args), 1)]
+            del out
+        row.append(all(torch.equal(a, b) for a, b in zip(*outs)))
+        y.append(row)
+        del outs, args
+    df = pd.DataFrame(y,
+                      columns=[
+                          'GTs/image', 'GTs', 'Dense peak (MB)', 'Dense (ms)', 'Chunked peak (MB)', 'Chunked (ms)',
+                          'Identical'])
+    LOGGER.info(f'\nAssigner benchmarks complete for batch={batch}, dense={dense}, imgsz={imgsz}, gt_chunk={gt_chunk} '
+                f'on {device}\n{df}\n')
+    return df
+
+
 class ProfileModels:
     """
     ProfileModels class for profiling different models on ONNX and TensorRT.
@@ -40,6 +40,8 @@ def on_model_save(trainer):
         is_best = trainer.best_fitness == trainer.fitness
         if time() - session.timers['ckpt'] > session.rate_limits['ckpt']:
             LOGGER.info(f'{PREFIX}Uploading checkpoint {HUB_WEB_ROOT}/models/{session.model_id}')
+            if trainer.ckpt_writer is not None:  # wait for this epoch's checkpoint to be written
+                trainer.ckpt_writer.flush()
             session.upload_model(trainer.epoch, trainer.last, is_best)
             session.timers['ckpt'] = time()  # reset timer
 
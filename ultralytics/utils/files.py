@@ -8,6 +8,8 @@ import tempfile
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from queue import Queue
+from threading import Thread
 
 
 class WorkingDirectory(contextlib.ContextDecorator):
@@ -27,6 +29,97 @@ class WorkingDirectory(contextlib.ContextDecorator):
         os.chdir(self.cwd)
 
 
+class AsyncWriter:
+    """
+    Background file writer, i.e. for predictor image, video, label and crop saving.
+
+    Tasks run one at a time in submission order on a single daemon thread, so label file appends and video frames stay
+    ordered. The queue is bounded: submit() blocks while `maxsize` tasks are pending, which caps memory held by queued
+    images when the disk is slower than inference.
+
+    Attributes:
+        queue (Queue): Pending (fn, args, kwargs) tasks, None stops the thread.
+        thread (Thread): Writer thread.
+        peak (int): Largest number of pending tasks seen by submit().
+        error (Exception | None): First exception raised by a task, re-raised by the next submit(), flush() or close().
+
+    Usage:
+        writer = AsyncWriter(maxsize=64)
+        writer.submit(cv2.imwrite, 'image.jpg', im)
+        writer.close()  # wait for pending writes and stop the thread
+    """
+
+    def __init__(self, maxsize=64):
+        """Start the writer thread with a queue of at most `maxsize` pending tasks."""
+        self.queue = Queue(maxsize=max(maxsize, 1))
+        self.peak = 0
+        self.error = None
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        """Returns the number of pending tasks, including the one being written."""
+        return self.queue.unfinished_tasks
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue `fn(*args, **kwargs)`, waiting while the queue is full."""
+        self._raise()
+        self.queue.put((fn, args, kwargs))
+        self.peak = max(self.peak, len(self))
+
+    def flush(self):
+        """Wait until all pending tasks are written."""
+        self.queue.join()
+        self._raise()
+
+    def close(self):
+        """Write all pending tasks and stop the thread."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise()
+
+    def _run(self):
+        """Writer thread loop, keeps draining the queue after an error so that producers never block."""
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    break
+                fn, args, kwargs = task
+                if self.error is None:
+                    fn(*args, **kwargs)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _raise(self):
+        """Re-raise a task exception in the calling thread."""
+        if self.error is not None:
+            e, self.error = self.error, None
+            raise e
+
+
+def write_atomic(file, data):
+    """
+    Write bytes to a file through a temporary file in the same directory and a rename.
+
+    Readers, and a crash part way through the write, only ever see the previous or the complete new file.
+
+    Args:
+        file (str | Path): File to write.
+        data (bytes): File contents.
+    """
+    file = Path(file)
+    tmp = file.with_name(f'.{file.name}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, file)
+
+
 @contextmanager
 def spaces_in_path(path):
     """
@@ -127,22 +127,39 @@ class v8DetectionLoss:
         self.assigner = TaskAlignedAssigner(topk=10, num_classes=self.nc, alpha=0.5, beta=6.0)
         self.bbox_loss = BboxLoss(m.reg_max - 1, use_dfl=self.use_dfl).to(device)
         self.proj = torch.arange(m.reg_max, dtype=torch.float, device=device)
+        self.anchor_cache = {}  # feature shapes and dtype -> anchors(), fixed for a given image size
+
+    def anchors(self, feats):
+        """
+        Return anchor points, stride tensor, anchor points in pixels and the (h, w) image size for `feats`.
+
+        Results are cached by feature map shapes, so make_anchors() and the image size tensor are only built once per
+        image size instead of every step. The cached tensors must not be modified in place.
+        """
+        key = tuple(x.shape[2:] for x in feats), feats[0].dtype, feats[0].device
+        if key not in self.anchor_cache:
+            if len(self.anchor_cache) >= 16:  # multi-scale or rect training, keep the cache bounded
+                self.anchor_cache.clear()
+            anchor_points, stride_tensor = make_anchors(feats, self.stride, 0.5)
+            imgsz = torch.tensor(feats[0].shape[2:], device=self.device, dtype=feats[0].dtype) * self.stride[0]
+            self.anchor_cache[key] = anchor_points, stride_tensor, anchor_points * stride_tensor, imgsz
+        return self.anchor_cache[key]
 
     def preprocess(self, targets, batch_size, scale_tensor):
-        """Preprocesses the target counts and matches with the input batch size to output a tensor."""
+        """
+        Pack (n, 6) image index, cls, xywh targets into a zero-padded (batch_size, max_targets, 5) cls, xyxy tensor.
+
+        Targets are scattered to their row and position within the image in one indexing op, keeping the input order
+        of each image's targets.
+        """
         if targets.shape[0] == 0:
-            out = torch.zeros(batch_size, 0, 5, device=self.device)
-        else:
-            i = targets[:, 0]  # image index
-            _, counts = i.unique(return_counts=True)
-            counts = counts.to(dtype=torch.int32)
-            out = torch.zeros(batch_size, counts.max(), 5, device=self.device)
-            for j in range(batch_size):
-                matches = i == j
-                n = matches.sum()
-                if n:
-                    out[j, :n] = targets[matches, 1:]
-            out[..., 1:5] = xywh2xyxy(out[..., 1:5].mul_(scale_tensor))
+            return torch.zeros(batch_size, 0, 5, device=self.device)
+        i, order = targets[:, 0].long().sort(stable=True)  # image index
+        counts = torch.bincount(i, minlength=batch_size)
+        j = torch.arange(len(i), device=i.device) - (counts.cumsum(0) - counts)[i]  # position within the image
+        out = torch.zeros(batch_size, int(counts.max()), 5, device=self.device)
+        out[i, j] = targets[order, 1:]
+        out[..., 1:5] = xywh2xyxy(out[..., 1:5].mul_(scale_tensor))
         return out
 
     def bbox_decode(self, anchor_points, pred_dist):
@@ -166,8 +183,7 @@ class v8DetectionLoss:
 
         dtype = pred_scores.dtype
         batch_size = pred_scores.shape[0]
-        imgsz = torch.tensor(feats[0].shape[2:], device=self.device, dtype=dtype) * self.stride[0]  # image size (h,w)
-        anchor_points, stride_tensor = make_anchors(feats, self.stride, 0.5)
+        anchor_points, stride_tensor, anchor_pixels, imgsz = self.anchors(feats)  # imgsz (h,w)
 
         # targets
         targets = torch.cat((batch['batch_idx'].view(-1, 1), batch['cls'].view(-1, 1), batch['bboxes']), 1)
@@ -180,7 +196,7 @@ class v8DetectionLoss:
 
         _, target_bboxes, target_scores, fg_mask, _ = self.assigner(
             pred_scores.detach().sigmoid(), (pred_bboxes.detach() * stride_tensor).type(gt_bboxes.dtype),
-            anchor_points * stride_tensor, gt_labels, gt_bboxes, mask_gt)
+            anchor_pixels, gt_labels, gt_bboxes, mask_gt)
 
         target_scores_sum = max(target_scores.sum(), 1)
 
@@ -223,8 +239,7 @@ class v8SegmentationLoss(v8DetectionLoss):
         pred_masks = pred_masks.permute(0, 2, 1).contiguous()
 
         dtype = pred_scores.dtype
-        imgsz = torch.tensor(feats[0].shape[2:], device=self.device, dtype=dtype) * self.stride[0]  # image size (h,w)
-        anchor_points, stride_tensor = make_anchors(feats, self.stride, 0.5)
+        anchor_points, stride_tensor, anchor_pixels, imgsz = self.anchors(feats)  # imgsz (h,w)
 
         # targets
         try:
@@ -245,7 +260,7 @@ class v8SegmentationLoss(v8DetectionLoss):
 
         _, target_bboxes, target_scores, fg_mask, target_gt_idx = self.assigner(
             pred_scores.detach().sigmoid(), (pred_bboxes.detach() * stride_tensor).type(gt_bboxes.dtype),
-            anchor_points * stride_tensor, gt_labels, gt_bboxes, mask_gt)
+            anchor_pixels, gt_labels, gt_bboxes, mask_gt)
 
         target_scores_sum = max(target_scores.sum(), 1)
 
@@ -321,8 +336,7 @@ class v8PoseLoss(v8DetectionLoss):
         pred_kpts = pred_kpts.permute(0, 2, 1).contiguous()
 
         dtype = pred_scores.dtype
-        imgsz = torch.tensor(feats[0].shape[2:], device=self.device, dtype=dtype) * self.stride[0]  # image size (h,w)
-        anchor_points, stride_tensor = make_anchors(feats, self.stride, 0.5)
+        anchor_points, stride_tensor, anchor_pixels, imgsz = self.anchors(feats)  # imgsz (h,w)
 
         # targets
         batch_size = pred_scores.shape[0]
@@ -338,7 +352,7 @@ class v8PoseLoss(v8DetectionLoss):
 
         _, target_bboxes, target_scores, fg_mask, target_gt_idx = self.assigner(
             pred_scores.detach().sigmoid(), (pred_bboxes.detach() * stride_tensor).type(gt_bboxes.dtype),
-            anchor_points * stride_tensor, gt_labels, gt_bboxes, mask_gt)
+            anchor_pixels, gt_labels, gt_bboxes, mask_gt)
 
         target_scores_sum = max(target_scores.sum(), 1)
 
@@ -11,7 +11,7 @@ import torch
 import torch.nn.functional as F
 import torchvision
 
-from ultralytics.utils import LOGGER
+SUPPRESSION_METHODS = 'nms', 'soft', 'wbf'  # non_max_suppression() methods
 
 
 class Profile(contextlib.ContextDecorator):
@@ -141,6 +141,9 @@ def non_max_suppression(
         max_time_img=0.05,
         max_nms=30000,
         max_wh=7680,
+        max_batch_nms=1024,
+        topk=0,
+        method='nms',
 ):
     """
     Perform non-maximum suppression (NMS) on a set of boxes, with support for masks and multiple labels per box.
@@ -160,11 +163,17 @@ def non_max_suppression(
         labels (List[List[Union[int, float, torch.Tensor]]]): A list of lists, where each inner
             list contains the apriori labels for a given image. The list should be in the format
             output by a dataloader, with each label being a tuple of (class_index, x1, y1, x2, y2).
-        max_det (int): The maximum number of boxes to keep after NMS.
+        max_det (int): The maximum number of boxes to keep per image after NMS.
         nc (int, optional): The number of classes output by the model. Any indices after this will be considered masks.
-        max_time_img (float): The maximum time (seconds) for processing one image.
-        max_nms (int): The maximum number of boxes into torchvision.ops.nms().
-        max_wh (int): The maximum box width and height in pixels
+        max_time_img (float): Unused, kept for backwards compatibility. The whole batch runs through a single NMS call.
+        max_nms (int): The maximum number of boxes per image into torchvision.ops.nms().
+        max_wh (int): Unused, kept for backwards compatibility. Class offsets are derived from the box coordinates.
+        max_batch_nms (int): The number of boxes above which the batch is split over several torchvision.ops.nms()
+            calls.
+        topk (int): Keep only the topk highest class scores of each image and class before thresholding, which caps the
+            candidates of low conf_thres multi-label runs such as validation. 0 keeps all scores.
+        method (str): Suppression method, 'nms' (hard NMS), 'soft' (Gaussian soft-NMS) or 'wbf' (weighted box fusion),
+            see batched_suppression().
 
     Returns:
         (List[torch.Tensor]): A list of length batch_size, where each element is a tensor of
@@ -175,6 +184,7 @@ def non_max_suppression(
     # Checks
     assert 0 <= conf_thres <= 1, f'Invalid Confidence threshold {conf_thres}, valid values are between 0.0 and 1.0'
     assert 0 <= iou_thres <= 1, f'Invalid IoU {iou_thres}, valid values are between 0.0 and 1.0'
+    assert method in SUPPRESSION_METHODS, f"Invalid method '{method}', valid methods are {SUPPRESSION_METHODS}"
     if isinstance(prediction, (list, tuple)):  # YOLOv8 model in validation model, output = (inference_out, loss_out)
         prediction = prediction[0]  # select only inference output
 
@@ -186,82 +196,209 @@ def non_max_suppression(
     nc = nc or (prediction.shape[1] - 4)  # number of classes
     nm = prediction.shape[1] - nc - 4
     mi = 4 + nc  # mask start index
+    if 0 < topk < prediction.shape[2]:  # zero all but the topk scores of each image and class
+        scores = prediction[:, 4:mi]
+        scores.masked_fill_(scores < scores.topk(topk, dim=2)[0][..., -1:], 0.0)
     xc = prediction[:, 4:mi].amax(1) > conf_thres  # candidates
 
     # Settings
     # min_wh = 2  # (pixels) minimum box width and height
-    time_limit = 0.5 + max_time_img * bs  # seconds to quit after
     multi_label &= nc > 1  # multiple labels per box (adds 0.5ms/img)
 
     prediction = prediction.transpose(-1, -2)  # shape(1,84,6300) to shape(1,6300,84)
     prediction[..., :4] = xywh2xyxy(prediction[..., :4])  # xywh to xyxy
 
-    t = time.time()
-    output = [torch.zeros((0, 6 + nm), device=prediction.device)] * bs
-    for xi, x in enumerate(prediction):  # image index, image inference
-        # Apply constraints
-        # x[((x[:, 2:4] < min_wh) | (x[:, 2:4] > max_wh)).any(1), 4] = 0  # width-height
-        x = x[xc[xi]]  # confidence
-
-        # Cat apriori labels if autolabelling
-        if labels and len(labels[xi]):
-            lb = labels[xi]
-            v = torch.zeros((len(lb), nc + nm + 4), device=x.device)
-            v[:, :4] = xywh2xyxy(lb[:, 1:5])  # box
-            v[range(len(lb)), lb[:, 0].long() + 4] = 1.0  # cls
-            x = torch.cat((x, v), 0)
-
-        # If none remain process next image
-        if not x.shape[0]:
-            continue
-
-        # Detections matrix nx6 (xyxy, conf, cls)
-        box, cls, mask = x.split((4, nc, nm), 1)
-
-        if multi_label:
-            i, j = torch.where(cls > conf_thres)
-            x = torch.cat((box[i], x[i, 4 + j, None], j[:, None].float(), mask[i]), 1)
-        else:  # best class only
-            conf, j = cls.max(1, keepdim=True)
-            x = torch.cat((box, conf, j.float(), mask), 1)[conf.view(-1) > conf_thres]
-
-        # Filter by class
-        if classes is not None:
-            x = x[(x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)]
-
-        # Check shape
-        n = x.shape[0]  # number of boxes
-        if not n:  # no boxes
-            continue
-        if n > max_nms:  # excess boxes
-            x = x[x[:, 4].argsort(descending=True)[:max_nms]]  # sort by confidence and remove excess boxes
-
-        # Batched NMS
-        c = x[:, 5:6] * (0 if agnostic else max_wh)  # classes
-        boxes, scores = x[:, :4] + c, x[:, 4]  # boxes (offset by class), scores
-        i = torchvision.ops.nms(boxes, scores, iou_thres)  # NMS
-        i = i[:max_det]  # limit detections
-
-        # # Experimental
-        # merge = False  # use merge-NMS
-        # if merge and (1 < n < 3E3):  # Merge NMS (boxes merged using weighted mean)
-        #     # Update boxes as boxes(i,4) = weights(i,n) * boxes(n,4)
-        #     from .metrics import box_iou
-        #     iou = box_iou(boxes[i], boxes) > iou_thres  # iou matrix
-        #     weights = iou * scores[None]  # box weights
-        #     x[i, :4] = torch.mm(weights, x[:, :4]).float() / weights.sum(1, keepdim=True)  # merged boxes
-        #     redundant = True  # require redundant detections
-        #     if redundant:
-        #         i = i[iou.sum(1) > 1]  # require redundancy
-
-        output[xi] = x[i]
-        if mps:
-            output[xi] = output[xi].to(device)
-        if (time.time() - t) > time_limit:
-            LOGGER.warning(f'WARNING ⚠️ NMS time limit {time_limit:.3f}s exceeded')
-            break  # time limit exceeded
-
-    return output
+    # Gather the candidates of the whole batch, b holds the image index of every row
+    b, a = xc.nonzero(as_tuple=True)
+    x = prediction[b, a]
+
+    # Cat apriori labels if autolabelling
+    if labels and any(len(lb) for lb in labels):
+        lb = torch.cat([torch.cat((torch.full_like(lb[:, :1], i), lb[:, :5]), 1) for i, lb in enumerate(labels)], 0)
+        v = torch.zeros((len(lb), nc + nm + 4), device=x.device)
+        v[:, :4] = xywh2xyxy(lb[:, 2:6])  # box
+        v[range(len(lb)), lb[:, 1].long() + 4] = 1.0  # cls
+        x, b = torch.cat((x, v), 0), torch.cat((b, lb[:, 0].long().to(b.device)), 0)
+
+    # Detections matrix nx6 (xyxy, conf, cls)
+    box, cls, mask = x.split((4, nc, nm), 1)
+    if multi_label:
+        i, j = torch.where(cls > conf_thres)
+        x, b = torch.cat((box[i], x[i, 4 + j, None], j[:, None].float(), mask[i]), 1), b[i]
+    else:  # best class only
+        conf, j = cls.max(1, keepdim=True)
+        i = conf.view(-1) > conf_thres
+        x, b = torch.cat((box, conf, j.float(), mask), 1)[i], b[i]
+
+    # Filter by class
+    if classes is not None:
+        i = (x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)
+        x, b = x[i], b[i]
+
+    if not x.shape[0]:  # no boxes
+        return [torch.zeros((0, 6 + nm), device=device)] * bs
+    if x.shape[0] > max_nms:  # excess boxes, keep the max_nms most confident boxes of each image
+        i = x[:, 4].argsort(descending=True)
+        i = i[_rank_in_group(b[i], bs) < max_nms]
+        x, b = x[i], b[i]
+
+    # Batched NMS over boxes grouped by image and class. NMS cost is quadratic in the number of boxes, so consecutive
+    # images are grouped into calls of about max_batch_nms boxes, a single call for typical inference batches
+    groups = b if agnostic else b * nc + x[:, 5].long()
+    if x.shape[0] <= max_batch_nms:
+        i, x[:, :4], x[:, 4] = batched_suppression(x[:, :4], x[:, 4], groups, iou_thres, method)
+    else:
+        n = torch.bincount(b, minlength=bs)
+        chunk = ((n.cumsum(0) - n) // max_batch_nms)[b]  # images never span two calls
+        i = []
+        for c in chunk.unique():
+            k = torch.nonzero(chunk == c).view(-1)
+            j, x[k, :4], x[k, 4] = batched_suppression(x[k, :4], x[k, 4], groups[k], iou_thres, method)
+            i.append(k[j])
+        i = torch.cat(i)  # sorted by decreasing score within each image
+    if method == 'soft':
+        i = i[x[i, 4] > conf_thres]  # decayed scores
+    i = i[_rank_in_group(b[i], bs) < max_det]  # limit detections per image
+    i = i[torch.sort(b[i], stable=True)[1]]  # group by image, scores stay sorted within each image
+
+    output = x[i].to(device).split(torch.bincount(b[i], minlength=bs).tolist())
+    return list(output)
+
+
+def _offset_boxes(boxes, idxs):
+    """
+    Offsets boxes by their group index so that boxes of different groups never overlap, the coordinate trick of
+    torchvision batched_nms, in float64 so that large group offsets keep sub-pixel precision.
+    """
+    boxes = boxes.double()
+    return boxes + (idxs * (boxes.max() + 1))[:, None]
+
+
+def _group_blocks(row_groups, col_groups, min_rows=256, max_elements=1 << 22):
+    """
+    Yields (rows, cols) slices covering every row/column pair of the same group, with rows and columns sorted by group.
+    Consecutive small groups share a block of at least min_rows rows and large groups are split into row blocks of at
+    most max_elements pairs, so the cost is about n * group size instead of n^2.
+    """
+    g, counts = torch.unique_consecutive(row_groups, return_counts=True)
+    ends = counts.cumsum(0).tolist()
+    lo = torch.searchsorted(col_groups, g).tolist()  # first column of each group
+    hi = torch.searchsorted(col_groups, g, right=True).tolist()  # last column + 1
+    s = k0 = 0
+    for k, e in enumerate(ends):
+        if e - s < min_rows and k + 1 < len(ends):
+            continue  # merge with the next group
+        c = slice(lo[k0], hi[k])
+        step = max(max_elements // max(c.stop - c.start, 1), 1)
+        for r in range(s, e, step):
+            yield slice(r, min(r + step, e)), c
+        s, k0 = e, k + 1
+
+
+def soft_nms(boxes, scores, idxs, sigma=0.5):
+    """
+    Gaussian soft-NMS, computed in parallel in the matrix NMS formulation (https://arxiv.org/abs/2003.10152).
+
+    Every box is decayed by its overlap with each higher scoring box of the same group, compensated by how much that
+    box was suppressed itself: decay_j = min_k exp(-(iou_kj^2 - max_iou_k^2) / sigma). No boxes are removed.
+
+    Args:
+        boxes (torch.Tensor): Boxes (n, 4) in xyxy format.
+        scores (torch.Tensor): Scores (n,).
+        idxs (torch.Tensor): Group (class and/or image) index (n,) of each box, different groups never interact.
+        sigma (float): Gaussian decay width, smaller values suppress harder.
+
+    Returns:
+        (torch.Tensor): Decayed scores (n,), in the input order.
+    """
+    order = scores.argsort(descending=True)
+    order = order[torch.sort(idxs[order], stable=True)[1]]  # by group, then by decreasing score
+    groups, boxes = idxs[order], _offset_boxes(boxes, idxs)[order]
+    comp = torch.zeros(len(boxes), dtype=boxes.dtype, device=boxes.device)  # max IoU with a higher scoring box
+    decay = torch.ones_like(comp)
+    for r, c in _group_blocks(groups, groups):  # row box k only decays the lower scoring boxes j > k
+        iou = torchvision.ops.box_iou(boxes[r], boxes[c]).triu_(r.start - c.start + 1)
+        comp[c] = torch.maximum(comp[c], iou.amax(0))
+    for r, c in _group_blocks(groups, groups):
+        iou = torchvision.ops.box_iou(boxes[r], boxes[c]).triu_(r.start - c.start + 1)
+        decay[c] = torch.minimum(decay[c], torch.exp((comp[r, None] ** 2 - iou ** 2) / sigma).amin(0))
+    out = torch.empty_like(scores)
+    out[order] = scores[order] * decay.to(scores.dtype)
+    return out
+
+
+def weighted_boxes_fusion(boxes, scores, idxs, iou_thres):
+    """
+    Weighted box fusion (https://arxiv.org/abs/1910.13302) with hard NMS picking the cluster heads.
+
+    Every box joins the head of its group it overlaps most, if that IoU exceeds iou_thres, and each head box is
+    replaced by the score-weighted mean of its cluster. Head scores are kept.
+
+    Args:
+        boxes (torch.Tensor): Boxes (n, 4) in xyxy format.
+        scores (torch.Tensor): Scores (n,).
+        idxs (torch.Tensor): Group (class and/or image) index (n,) of each box, different groups never fuse.
+        iou_thres (float): IoU threshold for both the head NMS and the cluster assignment.
+
+    Returns:
+        (torch.Tensor): Indices of the head boxes, sorted by decreasing score.
+        (torch.Tensor): Boxes (n, 4) with the head boxes replaced by their fused boxes.
+    """
+    offset = _offset_boxes(boxes, idxs)
+    keep = torchvision.ops.nms(offset, scores.double(), iou_thres)
+    heads = keep[torch.sort(idxs[keep], stable=True)[1]]  # heads and boxes sorted by group
+    order = torch.sort(idxs, stable=True)[1]
+    best = torch.zeros(len(boxes), dtype=offset.dtype, device=boxes.device)  # best head IoU of each box
+    head = torch.zeros(len(boxes), dtype=torch.long, device=boxes.device)  # its position in heads
+    for r, c in _group_blocks(idxs[heads], idxs[order]):
+        iou, j = torchvision.ops.box_iou(offset[heads[r]], offset[order[c]]).max(0)
+        better = iou > best[c]
+        best[c], head[c] = torch.where(better, iou, best[c]), torch.where(better, j + r.start, head[c])
+    m = order[best > iou_thres]  # cluster members, heads always join themselves with IoU 1
+    w = scores[m, None].to(boxes.dtype)
+    h = head[best > iou_thres]
+    fused = torch.zeros((len(heads), 4), dtype=boxes.dtype, device=boxes.device).index_add_(0, h, boxes[m] * w)
+    weight = torch.zeros((len(heads), 1), dtype=boxes.dtype, device=boxes.device).index_add_(0, h, w)
+    boxes = boxes.clone()
+    boxes[heads] = fused / weight.clamp(min=1E-9)
+    return keep, boxes
+
+
+def batched_suppression(boxes, scores, idxs, iou_thres, method='nms', sigma=0.5):
+    """
+    Batched NMS, soft-NMS or weighted box fusion of boxes grouped by class and/or image, in a single call.
+
+    Args:
+        boxes (torch.Tensor): Boxes (n, 4) in xyxy format.
+        scores (torch.Tensor): Scores (n,).
+        idxs (torch.Tensor): Group index (n,) of each box, boxes of different groups never interact.
+        iou_thres (float): IoU threshold for 'nms' and 'wbf'.
+        method (str): 'nms' (hard NMS), 'soft' (Gaussian soft-NMS) or 'wbf' (weighted box fusion).
+        sigma (float): Gaussian decay width for 'soft'.
+
+    Returns:
+        (torch.Tensor): Indices of the kept boxes, sorted by decreasing (decayed) score.
+        (torch.Tensor): Boxes (n, 4), fused for 'wbf', else unchanged.
+        (torch.Tensor): Scores (n,), decayed for 'soft', else unchanged.
+    """
+    if boxes.numel() == 0:  # no boxes, e.g. an image without detections
+        return torch.zeros(0, dtype=torch.long, device=boxes.device), boxes, scores
+    if method == 'soft':
+        scores = soft_nms(boxes, scores, idxs, sigma)
+        return scores.argsort(descending=True), boxes, scores
+    if method == 'wbf':
+        keep, boxes = weighted_boxes_fusion(boxes, scores, idxs, iou_thres)
+        return keep, boxes, scores
+    return torchvision.ops.nms(_offset_boxes(boxes, idxs), scores.double(), iou_thres), boxes, scores
+
+
+def _rank_in_group(groups, n):
+    """Returns the position of every element among the preceding elements of the same group, groups in [0, n)."""
+    g, order = torch.sort(groups, stable=True)
+    counts = torch.bincount(groups, minlength=n)
+    rank = torch.empty_like(order)
+    rank[order] = torch.arange(len(groups), device=groups.device) - (counts.cumsum(0) - counts)[g]
+    return rank
 
 
 def clip_boxes(boxes, shape):
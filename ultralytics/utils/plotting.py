@@ -3,6 +3,7 @@
 import contextlib
 import math
 import warnings
+from functools import lru_cache
 from pathlib import Path
 
 import cv2
@@ -90,6 +91,7 @@ class Annotator:
                 self.font.getsize = lambda x: self.font.getbbox(x)[2:4]  # text width, height
         else:  # use cv2
             self.im = im
+        self.font_name, self.font_size = font, font_size  # for glyph labels rendered by box_labels()
         self.lw = line_width or max(round(sum(im.shape) / 2 * 0.003), 2)  # line width
         # Pose
         self.skeleton = [[16, 14], [14, 12], [17, 15], [15, 13], [12, 13], [6, 12], [7, 13], [6, 7], [6, 8], [7, 9],
@@ -131,6 +133,50 @@ class Annotator:
                             thickness=tf,
                             lineType=cv2.LINE_AA)
 
+    def box_labels(self, boxes, labels=None, colors=(), txt_color=(255, 255, 255)):
+        """
+        Add all xyxy boxes of an image with their labels in one pass.
+
+        Labels are rasterized and alpha-blended once into cached label patches that are copied onto the numpy image, so
+        non-ASCII labels (i.e. CJK class names with font='simhei.ttf') do not require converting the image to PIL.
+
+        Args:
+            boxes (torch.Tensor | np.ndarray): Boxes in xyxy format, shape (n, 4), drawn in order.
+            labels (List[str], optional): Label per box, None or '' to draw the box only.
+            colors (List[tuple]): Color per box, in image channel order.
+            txt_color (tuple): Label text color.
+        """
+        if isinstance(boxes, torch.Tensor):
+            boxes = boxes.cpu().numpy()
+        boxes = np.asarray(boxes).reshape(-1, 4).astype(int).tolist()
+        labels = labels or [None] * len(boxes)
+        if self.pil:  # PIL image, draw box by box
+            for box, label, color in zip(boxes, labels, colors):
+                self.box_label(box, label, color, txt_color)
+            return
+
+        tf = max(self.lw - 1, 1)  # font thickness
+        font = 'Arial.Unicode.ttf' if self.font_name == 'Arial.ttf' else self.font_name  # for non-ASCII labels
+        size = self.font_size or max(round(sum(self.im.shape[:2]) / 2 * 0.035), 12)
+        for (x1, y1, x2, y2), label, color in zip(boxes, labels, colors):
+            cv2.rectangle(self.im, (x1, y1), (x2, y2), color, thickness=self.lw, lineType=cv2.LINE_AA)
+            if label:
+                color, txt_color = tuple(color), tuple(txt_color)  # hashable cache keys
+                if is_ascii(label):
+                    patch = label_patch(label, color, txt_color, scale=self.lw / 3, thickness=tf)
+                else:
+                    patch = label_patch(label, color, txt_color, font=font, size=size)
+                h = patch.shape[0]
+                self.paste(patch, x1, y1 - h if y1 - h >= 0 else y1)  # outside box if label fits
+
+    def paste(self, patch, x, y):
+        """Copy an image `patch` with top left corner at x, y, clipped to the image."""
+        ph, pw = patch.shape[:2]
+        h, w = self.im.shape[:2]
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + pw, w), min(y + ph, h)
+        if x0 < x1 and y0 < y1:
+            self.im[y0:y1, x0:x1] = patch[y0 - y:y1 - y, x0 - x:x1 - x]
+
     def masks(self, masks, colors, im_gpu, alpha=0.5, retina_masks=False):
         """
         Plot masks on image.
@@ -260,6 +306,58 @@ class Annotator:
         return np.asarray(self.im)
 
 
+@lru_cache(maxsize=8)
+def load_font(font='Arial.ttf', size=12):
+    """Return a cached PIL font, trying installed system fonts (i.e. 'simhei.ttf') before check_font() downloads."""
+    with contextlib.suppress(Exception):
+        return ImageFont.truetype(font, size)
+    with contextlib.suppress(Exception):
+        return ImageFont.truetype(str(check_font(font)), size)
+    LOGGER.warning(f'WARNING ⚠️ font {font} not found, using default font')
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=4096)
+def label_glyph(label, font='Arial.ttf', size=12, scale=0.0, thickness=1):
+    """
+    Rasterize a box label once into a uint8 alpha bitmap.
+
+    Labels are strings like 'person 0.87', so the cache holds one bitmap per (class, 0.01 confidence bucket).
+
+    Args:
+        label (str): Label text.
+        font (str): PIL font name or path, used if `scale` is 0.
+        size (int): PIL font size.
+        scale (float): cv2.putText() font scale, 0 to render with the PIL `font` instead.
+        thickness (int): cv2.putText() thickness.
+
+    Returns:
+        (np.ndarray): Read-only alpha bitmap of shape (h, w), 255 where text is drawn, covering the label box.
+    """
+    if scale:  # cv2 Hershey font, same layout as Annotator.box_label()
+        w, h = cv2.getTextSize(label, 0, fontScale=scale, thickness=thickness)[0]
+        glyph = np.zeros((h + 3, w), dtype=np.uint8)
+        cv2.putText(glyph, label, (0, h + 1), 0, scale, 255, thickness=thickness, lineType=cv2.LINE_AA)
+    else:  # PIL font, supports CJK
+        pil_font = load_font(font, size)
+        w, h = pil_font.getbbox(label)[2:4]
+        im = Image.new('L', (w + 1, h + 1))
+        ImageDraw.Draw(im).text((0, 0), label, fill=255, font=pil_font)
+        glyph = np.asarray(im)
+    glyph.flags.writeable = False
+    return glyph
+
+
+@lru_cache(maxsize=4096)
+def label_patch(label, color, txt_color=(255, 255, 255), font='Arial.ttf', size=12, scale=0.0, thickness=1):
+    """Return a cached read-only uint8 label patch of shape (h, w, 3), `label_glyph()` text blended onto `color`."""
+    a = label_glyph(label, font, size, scale, thickness)[..., None] * np.float32(1 / 255)
+    bg = np.asarray(color, dtype=np.float32)
+    patch = (bg + (np.asarray(txt_color, dtype=np.float32) - bg) * a + 0.5).astype(np.uint8)
+    patch.flags.writeable = False
+    return patch
+
+
 @TryExcept()  # known issue https://github.com/ultralytics/yolov5/issues/5395
 @plt_settings()
 def plot_labels(boxes, cls, names=(), save_dir=Path(''), on_plot=None):
@@ -543,8 +641,9 @@ def plot_results(file='path/to/results.csv', dir='', segment=False, pose=False,
             for i, j in enumerate(index):
                 y = data.values[:, j].astype('float')
                 # y[y == 0] = np.nan  # don't show zero values
-                ax[i].plot(x, y, marker='.', label=f.stem, linewidth=2, markersize=8)  # actual results
-                ax[i].plot(x, gaussian_filter1d(y, sigma=3), ':', label='smooth', linewidth=2)  # smoothing line
+                k = np.isfinite(y)  # NaN for epochs that were not validated
+                ax[i].plot(x[k], y[k], marker='.', label=f.stem, linewidth=2, markersize=8)  # actual results
+                ax[i].plot(x[k], gaussian_filter1d(y[k], sigma=3), ':', label='smooth', linewidth=2)  # smoothing line
                 ax[i].set_title(s[j], fontsize=12)
                 # if j in [8, 9, 10]:  # share train and val loss y axes
                 #     ax[i].get_shared_y_axes().join(ax[i], ax[i - 5])
@@ -70,9 +70,11 @@ class TaskAlignedAssigner(nn.Module):
         alpha (float): The alpha parameter for the classification component of the task-aligned metric.
         beta (float): The beta parameter for the localization component of the task-aligned metric.
         eps (float): A small value to prevent division by zero.
+        gt_chunk (int): Batches padded to more ground truths than this are assigned `gt_chunk` ground truths at a time,
+            bounding the (b, max_num_obj, h*w) intermediates. 0 always uses the dense assignment.
     """
 
-    def __init__(self, topk=13, num_classes=80, alpha=1.0, beta=6.0, eps=1e-9):
+    def __init__(self, topk=13, num_classes=80, alpha=1.0, beta=6.0, eps=1e-9, gt_chunk=64):
         """Initialize a TaskAlignedAssigner object with customizable hyperparameters."""
         super().__init__()
         self.topk = topk
@@ -81,6 +83,7 @@ class TaskAlignedAssigner(nn.Module):
         self.alpha = alpha
         self.beta = beta
         self.eps = eps
+        self.gt_chunk = gt_chunk
 
     @torch.no_grad()
     def forward(self, pd_scores, pd_bboxes, anc_points, gt_labels, gt_bboxes, mask_gt):
@@ -112,6 +115,9 @@ class TaskAlignedAssigner(nn.Module):
                     torch.zeros_like(pd_scores).to(device), torch.zeros_like(pd_scores[..., 0]).to(device),
                     torch.zeros_like(pd_scores[..., 0]).to(device))
 
+        if self.gt_chunk and self.n_max_boxes > self.gt_chunk:
+            return self.chunked_forward(pd_scores, pd_bboxes, anc_points, gt_labels, gt_bboxes, mask_gt)
+
         mask_pos, align_metric, overlaps = self.get_pos_mask(pd_scores, pd_bboxes, gt_labels, gt_bboxes, anc_points,
                                                              mask_gt)
 
@@ -129,6 +135,71 @@ class TaskAlignedAssigner(nn.Module):
 
         return target_labels, target_bboxes, target_scores, fg_mask.bool(), target_gt_idx
 
+    def chunked_forward(self, pd_scores, pd_bboxes, anc_points, gt_labels, gt_bboxes, mask_gt):
+        """
+        Compute the task-aligned assignment `gt_chunk` ground truths at a time, with the same result as the dense path.
+
+        Each chunk runs get_pos_mask() only for the images that have a valid ground truth in it, so a few densely
+        labelled images no longer pad every image of the batch to their box count. Per anchor the number of positive
+        ground truths, the first positive one and the highest-overlap one (with their alignment metric and overlap) are
+        carried across chunks, which is all select_highest_overlaps() and the normalization need.
+
+        Args and returns are the same as forward().
+        """
+        bs, na = pd_scores.shape[:2]
+        device, chunk = pd_scores.device, self.gt_chunk
+        dtype = torch.promote_types(pd_scores.dtype, pd_bboxes.dtype)
+        fg_mask = torch.zeros(bs, na, device=device)  # positive ground truths per anchor
+        first_idx = torch.zeros(bs, na, dtype=torch.long, device=device)  # first positive ground truth
+        best_idx = torch.zeros_like(first_idx)  # highest-overlap ground truth, resolves multiple positives
+        first_align, best_align = torch.zeros(2, bs, na, dtype=dtype, device=device)
+        first_overlaps, best_overlaps = torch.zeros(2, bs, na, dtype=pd_bboxes.dtype, device=device)
+
+        for j0 in range(0, self.n_max_boxes, chunk):
+            j = slice(j0, j0 + chunk)
+            b = (mask_gt[:, j, 0] > 0).any(1).nonzero().squeeze(1)  # images with a valid ground truth in this chunk
+            if not len(b):
+                continue
+            mask_pos, align_metric, overlaps = self.get_pos_mask(pd_scores[b], pd_bboxes[b], gt_labels[b, j],
+                                                                 gt_bboxes[b, j], anc_points, mask_gt[b, j])
+            # (b, chunk, h*w) -> (b, h*w)
+            n_pos, i = mask_pos.sum(1), mask_pos.argmax(1, keepdim=True)
+            new = (fg_mask[b] == 0) & (n_pos > 0)  # first positive ground truth is in this chunk
+            first_idx[b] = torch.where(new, i[:, 0] + j0, first_idx[b])
+            first_align[b] = torch.where(new, align_metric.gather(1, i)[:, 0], first_align[b])
+            first_overlaps[b] = torch.where(new, overlaps.gather(1, i)[:, 0], first_overlaps[b])
+            fg_mask[b] += n_pos
+
+            i = overlaps.argmax(1, keepdim=True)
+            better = overlaps.gather(1, i)[:, 0] > best_overlaps[b]  # strict, ties keep the first ground truth
+            best_idx[b] = torch.where(better, i[:, 0] + j0, best_idx[b])
+            best_align[b] = torch.where(better, align_metric.gather(1, i)[:, 0], best_align[b])
+            best_overlaps[b] = torch.where(better, overlaps.gather(1, i)[:, 0], best_overlaps[b])
+
+        # Same as select_highest_overlaps(): anchors assigned to multiple gts take the highest-overlap one
+        multi = fg_mask > 1
+        fg_mask = fg_mask > 0
+        target_gt_idx = torch.where(multi, best_idx, first_idx)
+        align_metric = torch.where(multi, best_align, first_align) * fg_mask
+        overlaps = torch.where(multi, best_overlaps, first_overlaps) * fg_mask
+
+        # Assigned target
+        target_labels, target_bboxes, target_scores = self.get_targets(gt_labels, gt_bboxes, target_gt_idx, fg_mask)
+
+        # Normalize
+        pos_align_metrics = torch.zeros(bs, self.n_max_boxes, dtype=dtype, device=device)  # b, max_num_obj
+        pos_overlaps = torch.zeros(bs, self.n_max_boxes, dtype=pd_bboxes.dtype, device=device)  # b, max_num_obj
+        for j0 in range(0, self.n_max_boxes, chunk):
+            j = torch.arange(j0, min(j0 + chunk, self.n_max_boxes), device=device)
+            mask = target_gt_idx.unsqueeze(1) == j.view(1, -1, 1)  # b, chunk, h*w
+            pos_align_metrics[:, j0:j0 + chunk] = (align_metric.unsqueeze(1) * mask).amax(-1)
+            pos_overlaps[:, j0:j0 + chunk] = (overlaps.unsqueeze(1) * mask).amax(-1)
+        norm_align_metric = align_metric * pos_overlaps.gather(1, target_gt_idx) / (
+            pos_align_metrics.gather(1, target_gt_idx) + self.eps)
+        target_scores = target_scores * norm_align_metric.unsqueeze(-1)
+
+        return target_labels, target_bboxes, target_scores, fg_mask, target_gt_idx
+
     def get_pos_mask(self, pd_scores, pd_bboxes, gt_labels, gt_bboxes, anc_points, mask_gt):
         """Get in_gts mask, (b, max_num_obj, h*w)."""
         mask_in_gts = select_candidates_in_gts(anc_points, gt_bboxes)
@@ -144,18 +215,19 @@ class TaskAlignedAssigner(nn.Module):
     def get_box_metrics(self, pd_scores, pd_bboxes, gt_labels, gt_bboxes, mask_gt):
         """Compute alignment metric given predicted and ground truth bounding boxes."""
         na = pd_bboxes.shape[-2]
+        bs, n_boxes = gt_bboxes.shape[:2]  # a chunk of the batch in chunked_forward()
         mask_gt = mask_gt.bool()  # b, max_num_obj, h*w
-        overlaps = torch.zeros([self.bs, self.n_max_boxes, na], dtype=pd_bboxes.dtype, device=pd_bboxes.device)
-        bbox_scores = torch.zeros([self.bs, self.n_max_boxes, na], dtype=pd_scores.dtype, device=pd_scores.device)
+        overlaps = torch.zeros([bs, n_boxes, na], dtype=pd_bboxes.dtype, device=pd_bboxes.device)
+        bbox_scores = torch.zeros([bs, n_boxes, na], dtype=pd_scores.dtype, device=pd_scores.device)
 
-        ind = torch.zeros([2, self.bs, self.n_max_boxes], dtype=torch.long)  # 2, b, max_num_obj
-        ind[0] = torch.arange(end=self.bs).view(-1, 1).expand(-1, self.n_max_boxes)  # b, max_num_obj
+        ind = torch.zeros([2, bs, n_boxes], dtype=torch.long)  # 2, b, max_num_obj
+        ind[0] = torch.arange(end=bs).view(-1, 1).expand(-1, n_boxes)  # b, max_num_obj
         ind[1] = gt_labels.squeeze(-1)  # b, max_num_obj
         # Get the scores of each grid for each gt cls
         bbox_scores[mask_gt] = pd_scores[ind[0], :, ind[1]][mask_gt]  # b, max_num_obj, h*w
 
         # (b, max_num_obj, 1, 4), (b, 1, h*w, 4)
-        pd_boxes = pd_bboxes.unsqueeze(1).expand(-1, self.n_max_boxes, -1, -1)[mask_gt]
+        pd_boxes = pd_bboxes.unsqueeze(1).expand(-1, n_boxes, -1, -1)[mask_gt]
         gt_boxes = gt_bboxes.unsqueeze(2).expand(-1, -1, na, -1)[mask_gt]
         overlaps[mask_gt] = bbox_iou(gt_boxes, pd_boxes, xywh=False, CIoU=True).squeeze(-1).clamp_(0)
 
@@ -1,5 +1,6 @@
 # Ultralytics YOLO 🚀, AGPL-3.0 license
 
+import itertools
 import math
 import os
 import platform
@@ -26,6 +27,7 @@ except ImportError:
 
 TORCH_1_9 = check_version(torch.__version__, '1.9.0')
 TORCH_2_0 = check_version(torch.__version__, '2.0.0')
+TORCH_2_1 = check_version(torch.__version__, '2.1.0')
 
 
 @contextmanager
@@ -352,6 +354,30 @@ def de_parallel(model):
     return model.module if is_parallel(model) else model
 
 
+def half_cpu_copy(model):
+    """
+    Deep copy a model with its floating point parameters and buffers copied straight to CPU FP16.
+
+    Same checkpoint as deepcopy(model).half(), without first duplicating the full precision model on its device.
+    """
+    memo = {}
+    for t in itertools.chain(model.parameters(), model.buffers()):
+        c = t.detach().to('cpu', torch.half if t.dtype.is_floating_point else t.dtype, copy=True)
+        memo[id(t)] = nn.Parameter(c, requires_grad=t.requires_grad) if isinstance(t, nn.Parameter) else c
+    return deepcopy(model, memo)
+
+
+def copy_to_cpu(x):
+    """Recursively copy the tensors in nested dicts, lists and tuples to CPU, i.e. to snapshot optimizer state."""
+    if isinstance(x, torch.Tensor):
+        return x.detach().to('cpu', copy=True)
+    if isinstance(x, dict):
+        return {k: copy_to_cpu(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return type(x)(copy_to_cpu(v) for v in x)
+    return x
+
+
 def one_cycle(y1=0.0, y2=1.0, steps=100):
     """Returns a lambda function for sinusoidal ramp from y1 to y2 https://arxiv.org/pdf/1812.01187.pdf."""
     return lambda x: ((1 - math.cos(x * math.pi / steps)) / 2) * (y2 - y1) + y1
@@ -383,33 +409,49 @@ class ModelEMA:
     Keeps a moving average of everything in the model state_dict (parameters and buffers)
     For EMA details see https://www.tensorflow.org/api_docs/python/tf/train/ExponentialMovingAverage
     To disable EMA set the `enabled` attribute to `False`.
+    With `every` > 1 the model is averaged in every `every` updates with the product of their decays.
     """
 
-    def __init__(self, model, decay=0.9999, tau=2000, updates=0):
-        """Create EMA."""
+    def __init__(self, model, decay=0.9999, tau=2000, updates=0, every=1):
+        """Create EMA, averaged every `every` updates with the decay of the skipped updates compounded."""
         self.ema = deepcopy(de_parallel(model)).eval()  # FP32 EMA
         self.updates = updates  # number of EMA updates
         self.decay = lambda x: decay * (1 - math.exp(-x / tau))  # decay exponential ramp (to help early epochs)
         for p in self.ema.parameters():
             p.requires_grad_(False)
         self.enabled = True
+        self.every = max(every, 1)
+        self.pending = 1.0  # decay compounded over the updates not yet averaged in
+        self.model = None  # model the floating point state tensors below were collected from
+        self.ema_tensors, self.model_tensors = [], []
 
     def update(self, model):
         """Update EMA parameters."""
         if self.enabled:
             self.updates += 1
-            d = self.decay(self.updates)
-
-            msd = de_parallel(model).state_dict()  # model state_dict
-            for k, v in self.ema.state_dict().items():
-                if v.dtype.is_floating_point:  # true for FP16 and FP32
-                    v *= d
-                    v += (1 - d) * msd[k].detach()
-                    # assert v.dtype == msd[k].dtype == torch.float32, f'{k}: EMA {v.dtype},  model {msd[k].dtype}'
+            self.pending *= self.decay(self.updates)
+            if self.updates % self.every == 0:
+                self.average(model)
+
+    @torch.no_grad()
+    def average(self, model):
+        """Average the model into the EMA with the compounded decay of the pending updates, in two multi-tensor ops."""
+        if self.pending == 1.0:
+            return
+        model = de_parallel(model)
+        if model is not self.model:  # collect the state tensors once instead of building state_dict() every step
+            msd = model.state_dict(keep_vars=True)
+            esd = self.ema.state_dict(keep_vars=True)
+            keys = [k for k, v in esd.items() if v.dtype.is_floating_point]  # true for FP16 and FP32
+            self.model, self.ema_tensors, self.model_tensors = model, [esd[k] for k in keys], [msd[k] for k in keys]
+        d, self.pending = self.pending, 1.0
+        torch._foreach_mul_(self.ema_tensors, d)
+        torch._foreach_add_(self.ema_tensors, self.model_tensors, alpha=1 - d)
 
     def update_attr(self, model, include=(), exclude=('process_group', 'reducer')):
         """Updates attributes and saves stripped model with optimizer removed."""
         if self.enabled:
+            self.average(model)  # fold in updates pending since the last average before the EMA is used
             copy_attr(self.ema, model, include, exclude)
 
 
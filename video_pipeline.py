@@ -0,0 +1,256 @@
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+
+from ultralytics.utils.torch_utils import smart_inference_mode
+
+STAGES = ('capture', 'preprocess', 'infer', 'render', 'output')
+LIVE_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://')
+END = object()  # 流结束标记，沿各阶段队列向下传递
+
+
+class StageFPS:
+    """单个阶段的滑动窗口帧率计数器（统计最近 window 秒）"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.count = 0  # 累计处理帧数
+        self._times = deque()
+        self._lock = threading.Lock()
+
+    def tick(self):
+        t = time.perf_counter()
+        with self._lock:
+            self.count += 1
+            self._times.append(t)
+            while t - self._times[0] > self.window:
+                self._times.popleft()
+
+    @property
+    def fps(self):
+        with self._lock:
+            if len(self._times) < 2:
+                return 0.0
+            return (len(self._times) - 1) / max(self._times[-1] - self._times[0], 1e-6)
+
+
+@dataclass
+class Frame:
+    """在各阶段之间流转的一帧"""
+    index: int
+    image: np.ndarray  # 原始 BGR 帧
+    im: Any = None  # 预处理后的模型输入张量
+    tiles: Any = None  # 切片推理时各切片的 (图片序号, x, y, w, h)，随帧传递，不经共享的 predictor
+    result: Any = None  # ultralytics Results
+    output: Any = None  # render 的返回值，交给 on_frame
+
+
+class VideoPipeline:
+    """
+    多阶段视频推理流水线：采集 → 预处理 → 推理 → 渲染 → 输出（编码/显示）
+
+    采集、预处理、渲染、输出各占一个线程，阶段之间用有界队列连接；
+    推理阶段由 infer_step() 在调用方线程执行（独占模型的线程，如 InferenceServer 后台线程），
+    因此与其他推理任务共用同一个 predictor 也不会产生竞争。
+    摄像头/网络流在采集端、实时显示在输出端采用丢弃最旧帧策略，画面不会落后于实际。
+    """
+
+    def __init__(self, source, predictor, conf=0.25, render=None, on_frame=None, on_stats=None, stop_event=None,
+                 maxsize=4, drop_output=True, stats_interval=1.0):
+        """
+        source: 视频路径、摄像头编号或网络流地址
+        predictor: 已完成 setup 的 ultralytics predictor（model.predictor）
+        render: Results -> 输出对象，默认 Results.plot()
+        on_frame: 输出线程中对每帧 render 结果的回调（写视频 / 送显示）
+        on_stats: 每 stats_interval 秒回调一次 stats()
+        drop_output: 输出队列满时丢弃最旧帧（实时显示用）；写视频文件时应为 False
+        """
+        self.source = str(source)
+        self.live = self.source.isdigit() or self.source.lower().startswith(LIVE_PREFIXES)
+        self.predictor = predictor
+        self.conf = conf
+        self.render = render or (lambda r: r.plot())
+        self.on_frame = on_frame
+        self.on_stats = on_stats
+        self.stop_event = stop_event or threading.Event()
+        self.drop_output = drop_output
+        self.stats_interval = stats_interval
+        self.queues = {s: queue.Queue(maxsize=maxsize) for s in STAGES[1:]}  # 各阶段的输入队列
+        self.fps = {s: StageFPS() for s in STAGES}
+        self.dropped = 0
+        self.error = None
+        self.cap = None
+        self.info = {}  # 视频源属性：fps / width / height，start() 后可用
+        self._threads = []
+        self._last_stats = 0.0
+
+    # ------------------ 对外接口 ------------------
+
+    def start(self):
+        """打开视频源并启动采集/预处理/渲染/输出线程"""
+        src = self.source
+        self.cap = cv2.VideoCapture(int(src) if src.isdigit() else src)
+        if not self.cap.isOpened():
+            self.cap.release()
+            raise ValueError(f"无法打开视频源: {src}")
+        self.info = {'fps': self.cap.get(cv2.CAP_PROP_FPS),
+                     'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                     'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}
+        workers = ((self._capture, ), (self._stage, 'preprocess', self._preprocess, 'preprocess', 'infer'),
+                   (self._stage, 'render', self._render, 'render', 'output'),
+                   (self._stage, 'output', self._output, 'output', None))
+        self._last_stats = time.perf_counter()
+        for target, *args in workers:
+            t = threading.Thread(target=target, args=args, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    @smart_inference_mode()
+    def infer_step(self, timeout=0.1):
+        """推理阶段处理一帧，必须在独占模型的线程中调用；返回 False 表示流已结束或已停止"""
+        frame = self._get('infer', timeout=timeout)
+        if frame is END or self.stop_event.is_set():
+            self._put('render', END)
+            return False
+        if frame is None:
+            return True  # 暂无可推理的帧
+        p = self.predictor
+        p.args.conf = self.conf
+        p.batch = ([f'{self.source}:{frame.index}'], [frame.image], None, '')
+        if hasattr(p, 'tile_offsets'):  # 预处理线程已在处理后续帧，切片信息以本帧为准
+            p.tile_offsets = frame.tiles
+        preds = p.inference(frame.im)
+        frame.result = p.postprocess(preds, frame.im, [frame.image])[0]
+        self.fps['infer'].tick()
+        return self._put('render', frame)
+
+    def run(self):
+        """在当前线程运行推理阶段直到视频结束，返回最终 stats()"""
+        self.start()
+        try:
+            while self.infer_step():
+                pass
+            return self.join()
+        finally:
+            self.stop()
+
+    def join(self):
+        """等待其余阶段输出完所有帧，阶段内异常在此抛出"""
+        for t in self._threads:
+            t.join()
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+    def stop(self):
+        """停止所有阶段（不等待队列中剩余的帧）"""
+        self.stop_event.set()
+        for t in self._threads:
+            t.join(timeout=1)
+
+    def stats(self):
+        """各阶段实时 FPS 与累计丢帧数"""
+        stats = {s: round(c.fps, 1) for s, c in self.fps.items()}
+        stats['frames'] = self.fps['output'].count
+        stats['dropped'] = self.dropped
+        return stats
+
+    # ------------------ 各阶段 ------------------
+
+    def _capture(self):
+        """采集线程：直播源队列满时丢弃最旧帧，文件源阻塞等待"""
+        index = 0
+        try:
+            while not self.stop_event.is_set():
+                ret, image = self.cap.read()
+                if not ret:
+                    break
+                self.fps['capture'].tick()
+                if not self._put('preprocess', Frame(index, image), drop=self.live):
+                    break
+                index += 1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.cap.release()
+            self._put('preprocess', END)
+
+    def _stage(self, name, fn, src, dst=None):
+        """通用阶段线程：从 src 队列取帧，fn 处理后放入 dst 队列（dst 为 None 时为末级）"""
+        drop = dst == 'output' and self.drop_output
+        try:
+            while True:
+                frame = self._get(src)
+                if frame is END or self.stop_event.is_set():
+                    break
+                if frame is None:
+                    continue
+                fn(frame)
+                self.fps[name].tick()
+                if dst and not self._put(dst, frame, drop=drop):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if dst:
+                self._put(dst, END)
+
+    def _preprocess(self, frame):
+        if hasattr(self.predictor, 'preprocess_tiles'):  # 不写 predictor 状态，与推理线程互不干扰
+            frame.im, frame.tiles = self.predictor.preprocess_tiles([frame.image])
+        else:
+            frame.im = self.predictor.preprocess([frame.image])
+
+    def _render(self, frame):
+        frame.output = self.render(frame.result)
+        frame.image = frame.im = None  # 及时释放，Results 中保留原图
+
+    def _output(self, frame):
+        if self.on_frame:
+            self.on_frame(frame.output)
+        now = time.perf_counter()
+        if self.on_stats and now - self._last_stats >= self.stats_interval:
+            self._last_stats = now
+            self.on_stats(self.stats())
+
+    # ------------------ 队列工具 ------------------
+
+    def _get(self, name, timeout=0.1):
+        """从队列取帧，超时返回 None"""
+        try:
+            return self.queues[name].get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _put(self, name, item, drop=False):
+        """放入有界队列：drop=True 时挤掉最旧的帧（结束标记不丢弃），否则阻塞等待；停止后返回 False"""
+        q = self.queues[name]
+        while not self.stop_event.is_set():
+            if drop and item is not END:
+                try:
+                    q.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+            else:
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+        return False
+
+    def _fail(self, e):
+        self.error = self.error or e
+        self.stop_event.set()
@@ -1,8 +1,10 @@
 from ultralytics import YOLO
+from ultralytics.utils.plotting import Annotator
 import cv2
 import numpy as np
-from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageFont
+
+from video_pipeline import VideoPipeline
 
 
 class VideoPredictor:
@@ -10,69 +12,51 @@ class VideoPredictor:
     def run(model_path, source, output_path="output.mp4"):
         """
         独立运行的视频预测函数
+        采集 → 预处理 → 推理 → 绘制 → 编码 由 VideoPipeline 分阶段并行执行，推理在当前线程
         """
         try:
-            model = YOLO(model_path)
-
-            # 打开视频
-            cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
-            if not cap.isOpened():
-                raise ValueError(f"无法打开视频源: {source}")
-
-            # 获取属性
-            w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = cap.get(cv2.CAP_PROP_FPS) or 25
-
-            # 输出设置
-            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            model = YOLO(model_path, cache=True)  # 预融合推理缓存，冷启动更快
+            model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)  # 构建并预热 predictor
 
-            # 字体加载（带容错）
+            # 字体检查（带容错）：标签位图由 Annotator 按 (类别, 置信度) 缓存，每种标签只用 PIL 光栅化一次
+            font = "simhei.ttf"
             try:
-                font = ImageFont.truetype("simhei.ttf", 20)
+                ImageFont.truetype(font, 20)
             except IOError:
                 print("⚠️ 未找到 simhei.ttf，使用系统默认字体")
-                font = ImageFont.load_default()
-
-            print(f"▶ 开始处理视频，保存至: {output_path}")
 
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret: break
+            # 绘制：整帧一次性画出所有框，中文标签使用缓存的位图直接贴到 numpy 帧上（无整帧 PIL 转换）
+            def render(r):
+                frame = r.orig_img
+                boxes = r.boxes.cpu().numpy()
+                labels = [f"{model.names[int(c)]} {p:.2f}" for c, p in zip(boxes.cls, boxes.conf)]
+                annotator = Annotator(frame, line_width=2, font_size=20, font=font)
+                annotator.box_labels(boxes.xyxy, labels, colors=[(0, 255, 0)] * len(labels), txt_color=(0, 0, 0))
+                return frame
 
-                # 推理
-                results = model(frame, conf=0.25, verbose=False)
+            def on_stats(s):
+                print(f"⏱ FPS 采集 {s['capture']} | 预处理 {s['preprocess']} | 推理 {s['infer']} | "
+                      f"绘制 {s['render']} | 编码 {s['output']}")
 
-                # 绘制 (使用YOLO自带的plot更方便，或者手动绘制)
-                # 这里演示手动绘制以支持中文
-                for r in results:
-                    boxes = r.boxes
-                    for box in boxes:
-                        # 坐标
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        # 类别与置信度
-                        cls_id = int(box.cls[0])
-                        conf = float(box.conf[0])
-                        label = f"{model.names[cls_id]} {conf:.2f}"
+            # 写文件不丢帧（drop_output=False），摄像头源在采集端丢弃最旧帧
+            pipe = VideoPipeline(source, model.predictor, conf=0.25, render=render, on_stats=on_stats,
+                                 drop_output=False)
+            pipe.start()
 
-                        # CV2 画框
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-                        # PIL 画中文
-                        img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                        draw = ImageDraw.Draw(img_pil)
-                        # 文字背景
-                        text_w, text_h = draw.textbbox((0, 0), label, font=font)[2:]
-                        draw.rectangle([x1, y1 - text_h, x1 + text_w, y1], fill=(0, 255, 0))
-                        draw.text((x1, y1 - text_h), label, font=font, fill=(0, 0, 0))
-
-                        frame = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-
-                writer.write(frame)
+            # 输出设置
+            w, h, fps = pipe.info['width'], pipe.info['height'], pipe.info['fps'] or 25
+            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            pipe.on_frame = writer.write
 
-            cap.release()
-            writer.release()
-            print("✅ 视频处理完成")
+            print(f"▶ 开始处理视频，保存至: {output_path}")
+            try:
+                while pipe.infer_step():
+                    pass
+                stats = pipe.join()
+            finally:
+                pipe.stop()
+                writer.release()
+            print(f"✅ 视频处理完成，共 {stats['frames']} 帧")
 
         except Exception as e:
             print(f"❌ 视频处理错误: {e}")
@@ -85,4 +69,4 @@ if __name__ == "__main__":
     if len(sys.argv) > 2:
         VideoPredictor.run(sys.argv[1], sys.argv[2])
     else:
-        print("Usage: python video_predict.py <model.pt> <video.mp4>")
\ No newline at end of file
+        print("Usage: python video_predict.py <model.pt> <video.mp4>")